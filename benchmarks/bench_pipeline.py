@@ -0,0 +1,262 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+# Get the current directory (benchmarks folder)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Move one step back to the parent directory
+parent_dir = os.path.dirname(current_dir)
+
+# Add src directory to sys.path
+sys.path.append(os.path.join(parent_dir, "src"))
+
+from ingest import load_housing_data
+from train import prepare_data, split_indices, fit_preprocessor, train_model
+from score import score_batches
+from forest import FlatForest
+
+OCEAN_PROXIMITY = np.array(["<1H OCEAN", "INLAND", "NEAR OCEAN", "NEAR BAY", "ISLAND"])
+OCEAN_WEIGHTS = np.array([0.443, 0.317, 0.129, 0.111, 0.0002])
+
+
+def make_housing(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    # Synthetic rows with the same columns, rough marginals and ~1% missing
+    # total_bedrooms as the California housing CSV; needs no network access.
+    rng = np.random.default_rng(seed)
+    households = rng.lognormal(6.0, 0.7, n_rows).round() + 1
+    total_rooms = (households * rng.lognormal(1.6, 0.25, n_rows)).round()
+    total_bedrooms = (total_rooms * rng.normal(0.21, 0.05, n_rows).clip(0.05, 0.6)).round()
+    total_bedrooms[rng.random(n_rows) < 0.01] = np.nan
+    median_income = rng.lognormal(1.3, 0.45, n_rows).clip(0.5, 15.0)
+    ocean = rng.choice(len(OCEAN_PROXIMITY), n_rows, p=OCEAN_WEIGHTS / OCEAN_WEIGHTS.sum())
+    value = 45_000 * median_income + 60_000 * (ocean != 1) + rng.normal(0, 40_000, n_rows)
+    return pd.DataFrame({
+        "longitude": rng.uniform(-124.3, -114.3, n_rows).round(2),
+        "latitude": rng.uniform(32.5, 42.0, n_rows).round(2),
+        "housing_median_age": rng.integers(1, 53, n_rows).astype(float),
+        "total_rooms": total_rooms,
+        "total_bedrooms": total_bedrooms,
+        "population": (households * rng.lognormal(1.0, 0.3, n_rows)).round(),
+        "households": households,
+        "median_income": median_income.round(4),
+        "median_house_value": value.clip(14_999, 500_001).round(),
+        "ocean_proximity": OCEAN_PROXIMITY[ocean],
+    })
+
+
+def _current_rss() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return 0
+
+
+def _max_rss() -> int:
+    # High-water mark of the whole process; resource is POSIX-only
+    try:
+        import resource
+    except ImportError:
+        return 0
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class PeakMemory:
+    # Samples RSS in a background thread while a stage runs; rise is the peak minus the RSS
+    # at stage start, so earlier stages' memory does not count against this one. Without
+    # /proc, falls back to how far the stage pushed ru_maxrss, the process's high-water
+    # mark: 0 for a stage that stays below an earlier stage's peak.
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.start = 0
+        self.peak = 0
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, _current_rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._stop = threading.Event()
+        self.start = self.peak = _current_rss() or _max_rss()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _current_rss() or _max_rss())
+
+    @property
+    def rise(self) -> int:
+        return max(0, self.peak - self.start)
+
+
+def measure(results: list, size: int, stage: str, func, *args, rows: int = None, fits: int = None, **kwargs):
+    with PeakMemory() as memory:
+        start = time.perf_counter()
+        value = func(*args, **kwargs)
+        wall = time.perf_counter() - start
+    if callable(fits):
+        fits = fits(value)
+    record = {"size": size, "stage": stage, "wall_s": wall, "peak_rss_mb": memory.peak / 1e6, "rss_rise_mb": memory.rise / 1e6}
+    if rows is not None:
+        record["rows_per_s"] = rows / wall
+    if fits is not None:
+        record["fits_per_s"] = fits / wall
+    results.append(record)
+    print(json.dumps(record), flush=True)
+    return value
+
+
+def _search_fits(model) -> int:
+    results = model.cv_results_
+    return len(results["params"]) * sum(key.startswith("split") and key.endswith("_test_score") for key in results)
+
+
+def _preprocess(data, logger, rows=None):
+    preprocessor = fit_preprocessor(data, logger, rows=rows)
+    return preprocessor, preprocessor.transform(data, rows=rows), preprocessor.transform_target(data, rows=rows)
+
+
+def bench_size(size: int, args, logger: logging.Logger, work_dir: str) -> list:
+    results = []
+    housing = make_housing(size, seed=args.seed)
+    data_dir = os.path.join(work_dir, str(size))
+    os.makedirs(data_dir)
+    housing.to_csv(os.path.join(data_dir, "housing.csv"), index=False)
+    del housing
+
+    housing = measure(results, size, "load_csv", load_housing_data, data_dir, logger, snapshot=False, rows=size)
+    load_housing_data(data_dir, logger)  # writes the snapshot
+    measure(results, size, "load_snapshot", load_housing_data, data_dir, logger, rows=size)
+
+    # Index-based split first: prepare_data adds income_cat to housing
+    train_index, _ = measure(results, size, "split_indices", split_indices, housing, logger, rows=size)
+    measure(results, size, "preprocess_indexed", _preprocess, housing, logger, train_index, rows=len(train_index))
+    train_set, test_set = measure(results, size, "prepare_data", prepare_data, housing, logger, rows=size)
+    preprocessor, train_data, train_labels = measure(
+        results, size, "preprocess", _preprocess, train_set, logger, rows=len(train_set)
+    )
+
+    # The search is capped at --train_rows; its cost grows with fits, not with the input size
+    rows = min(args.train_rows, len(train_data))
+    model = measure(
+        results,
+        size,
+        f"train_{args.search}",
+        train_model,
+        train_data[:rows],
+        train_labels[:rows],
+        logger,
+        n_jobs=args.n_jobs,
+        search=args.search,
+        rows=rows,
+        fits=_search_fits,
+    )
+
+    test_data = preprocessor.transform(test_set)
+    measure(
+        results,
+        size,
+        "score",
+        score_batches,
+        model,
+        (test_data, preprocessor.transform_target(test_set)),
+        logger,
+        n_jobs=args.n_jobs,
+        rows=len(test_set),
+    )
+    flat = FlatForest.from_estimator(model.best_estimator_)
+    measure(results, size, "score_flat", flat.predict, test_data, rows=len(test_set))
+    return results
+
+
+def compare(results: list, baseline: dict, threshold: float) -> list:
+    # Stages whose wall time grew by more than threshold (a fraction) over the baseline
+    previous = {(record["size"], record["stage"]): record for record in baseline["results"]}
+    regressions = []
+    for record in results:
+        before = previous.get((record["size"], record["stage"]))
+        if before is None or before["wall_s"] <= 0:
+            continue
+        ratio = record["wall_s"] / before["wall_s"]
+        if ratio > 1 + threshold:
+            regressions.append({**record, "baseline_wall_s": before["wall_s"], "ratio": ratio})
+    return regressions
+
+
+def main(args) -> int:
+    logger = logging.getLogger("housing_benchmark")
+    logger.setLevel(args.log_level)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "sklearn": sklearn.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "sizes": args.sizes,
+            "search": args.search,
+            "train_rows": args.train_rows,
+            "n_jobs": args.n_jobs,
+        },
+        "results": [],
+    }
+    work_dir = tempfile.mkdtemp(prefix="housing_bench_")
+    try:
+        for size in args.sizes:
+            report["results"] += bench_size(size, args, logger, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report["results"], json.load(f), args.threshold)
+        report["regressions"] = regressions
+        for regression in regressions:
+            print(
+                f"REGRESSION {regression['stage']} @ {regression['size']} rows: "
+                f"{regression['wall_s']:.3f}s vs {regression['baseline_wall_s']:.3f}s ({regression['ratio']:.2f}x)"
+            )
+        exit_code = 1 if regressions else 0
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return exit_code
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark the housing pipeline stages on synthetic data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20_000, 200_000], help="Row counts to benchmark (e.g. 20000 1000000 10000000)")
+    parser.add_argument("--search", default="halving", choices=["random", "cached", "halving"], help="Search strategy benchmarked by the train stage")
+    parser.add_argument("--train_rows", type=int, default=5_000, help="Rows the search is fitted on, whatever the data size")
+    parser.add_argument("--n_jobs", type=int, default=-1, help="Parallel workers for search and scoring")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic data")
+    parser.add_argument("--output", default=None, help="Write the JSON report here")
+    parser.add_argument("--baseline", default=None, help="Earlier JSON report to compare wall times against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown over the baseline before failing (0.2 = 20%%)")
+    parser.add_argument("--log_level", default="WARNING", help="Logging level")
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    sys.exit(main(args))
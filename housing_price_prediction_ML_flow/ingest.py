@@ -1,30 +1,37 @@
 import os
-import tarfile
-from six.moves import urllib
+import sys
+import logging
 import pandas as pd
-import mlflow
+from mlflow_logger import log_param
 
-def fetch_housing_data(housing_url: str, housing_path: str):
-    with mlflow.start_run(run_name="Fetch_Housing_Data", nested=True):
-        # Log the URL and path as parameters
-        mlflow.log_param("housing_url", housing_url)
-        mlflow.log_param("housing_path", housing_path)
+# The cached download is shared with src/ingest.py. It is imported as src.ingest because this
+# module's own name shadows it.
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+sys.path.append(os.path.join(parent_dir, "src"))
+from src import ingest as shared_ingest
 
-        os.makedirs(housing_path, exist_ok=True)
-        tgz_path = os.path.join(housing_path, "housing.tgz")
-        urllib.request.urlretrieve(housing_url, tgz_path)
+logger = logging.getLogger(__name__)
+
+
+def fetch_housing_data(housing_url: str, housing_path: str, force: bool = False):
+    # Log the URL and path as parameters
+    log_param("housing_url", housing_url)
+    log_param("housing_path", housing_path)
+    log_param("tgz_path", os.path.join(housing_path, "housing.tgz"))  # Log the tar file path
+
+    cache_hit = shared_ingest.fetch_housing_data(housing_url, housing_path, logger, force=force)
+    log_param("cache_hit", cache_hit)
+    if not cache_hit:
+        log_param("archive_sha256", shared_ingest.read_manifest(housing_path)["archive"]["sha256"])
 
-        with tarfile.open(tgz_path) as housing_tgz:
-            housing_tgz.extractall(path=housing_path)
-        mlflow.log_param("tgz_path", tgz_path)  # Log the tar file path
 
 def load_housing_data(housing_path: str) -> pd.DataFrame:
-    with mlflow.start_run(run_name="Load_Housing_Data", nested=True):
-        csv_path = os.path.join(housing_path, "housing.csv")
-        housing_data = pd.read_csv(csv_path)
-
-        # Log data shape and path
-        mlflow.log_param("csv_path", csv_path)
-        mlflow.log_param("num_rows", housing_data.shape[0])
-        mlflow.log_param("num_columns", housing_data.shape[1])
-        return housing_data
+    csv_path = os.path.join(housing_path, "housing.csv")
+    housing_data = pd.read_csv(csv_path)
+
+    # Log data shape and path
+    log_param("csv_path", csv_path)
+    log_param("num_rows", housing_data.shape[0])
+    log_param("num_columns", housing_data.shape[1])
+    return housing_data
@@ -1,60 +1,117 @@
 import argparse
+import logging
 import os
 import sys
 sys.path.append(r'C:\Users\vidya.yedurumane\miniforge3\lib\site-packages')
-import mlflow
-import mlflow.sklearn  # If you are using sklearn models
-from ingest import fetch_housing_data, load_housing_data
-from train import prepare_data, preprocess_data, train_model
-from score import evaluate_model
+# Shared serving-artifact code lives in src/
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from instrument import configure, stage, write_trace
 
 def main(args):
+    # mlflow and the pipeline modules take seconds to import; --help should not pay for them
+    import mlflow
+    import mlflow.sklearn  # If you are using sklearn models
+    from ingest import fetch_housing_data, load_housing_data
+    from train import prepare_data, fit_preprocessor, preprocess_data, train_model
+    from score import evaluate_model
+    from artifact import export_artifact
+    from mlflow_logger import BatchLogger, SPOOL_DIR
+
     # Check if there is already an active run
     active_run = mlflow.active_run()
 
     if active_run is None:
         # Start a new run if no active run exists
         with mlflow.start_run(run_name="Housing_ML_Pipeline") as run:
-            # Log parameters
-            mlflow.log_param("housing_url", args.housing_url)
-            mlflow.log_param("housing_path", args.housing_path)
+            # Params and metrics are buffered and sent with log_batch from a background thread
+            with BatchLogger(run.info.run_id, spool_dir=args.spool_dir or SPOOL_DIR) as tracker:
+                # Log parameters
+                tracker.log_param("housing_url", args.housing_url)
+                tracker.log_param("housing_path", args.housing_path)
+
+                # Stage timings (and tracemalloc peaks with --trace_memory) become run metrics
+                configure(memory=args.trace_memory, mlflow=tracker)
 
-            # Fetch and load data
-            fetch_housing_data(args.housing_url, args.housing_path)
-            housing = load_housing_data(args.housing_path)
+                # Fetch and load data
+                # Recorded as a stage by src/ingest.py's fetch_housing_data
+                fetch_housing_data(args.housing_url, args.housing_path)
+                with stage("load_housing_data") as span:
+                    housing = load_housing_data(args.housing_path)
+                    span["rows"] = len(housing)
 
-            # Prepare data
-            strat_train_set, strat_test_set = prepare_data(housing)
-            train_data, train_labels = preprocess_data(strat_train_set)
-            test_data, test_labels = preprocess_data(strat_test_set)
+                # Prepare data
+                with stage("prepare_data", rows=len(housing)):
+                    strat_train_set, strat_test_set = prepare_data(housing)
+                with stage("preprocess_data", rows=len(housing)):
+                    # Imputation medians and dummy columns come from the training set only
+                    preprocessor = fit_preprocessor(strat_train_set)
+                    train_data, train_labels = preprocess_data(strat_train_set, preprocessor)
+                    test_data, test_labels = preprocess_data(strat_test_set, preprocessor)
 
-            # Log some additional parameters
-            mlflow.log_param("num_train_samples", len(train_data))
-            mlflow.log_param("num_test_samples", len(test_data))
+                # Log some additional parameters
+                tracker.log_param("num_train_samples", len(train_data))
+                tracker.log_param("num_test_samples", len(test_data))
 
-            # Train model
-            model = train_model(train_data, train_labels)
+                # Train model
+                with stage("train_model", rows=len(train_data)):
+                    model = train_model(
+                        train_data,
+                        train_labels,
+                        n_jobs=args.n_jobs,
+                        estimator_n_jobs=args.estimator_n_jobs,
+                        backend=args.backend,
+                    )
 
-            # Log model
-            mlflow.sklearn.log_model(model, "model")
+                # Log model: either the full pickled search, or only the slim serving artifact
+                if args.slim_model:
+                    slim_path = os.path.join("artifacts", "compact_model")
+                    manifest = export_artifact(
+                        model,
+                        slim_path,
+                        logging.getLogger(__name__),
+                        preprocessor=preprocessor,
+                        max_depth=args.slim_max_depth,
+                        compress=args.slim_compress,
+                    )
+                    mlflow.log_artifacts(slim_path, artifact_path="compact_model")
+                    tracker.log_param("slim_max_depth", args.slim_max_depth)
+                    tracker.log_metric("compact_model_bytes", manifest["size_bytes"])
+                else:
+                    mlflow.sklearn.log_model(model, "model")
 
-            # Evaluate model and log metrics
-            rmse = evaluate_model(model, test_data, test_labels)
-            mlflow.log_metric("rmse", rmse)
+                # Evaluate model and log metrics
+                with stage("evaluate_model", rows=len(test_data)):
+                    rmse = evaluate_model(model, test_data, test_labels)
+                tracker.log_metric("rmse", rmse)
 
-            # Log any artifacts (e.g., plots, model file)
-            artifact_path = "artifacts"
-            if not os.path.exists(artifact_path):
-                os.makedirs(artifact_path)
+                # Log any artifacts (e.g., plots, model file)
+                artifact_path = "artifacts"
+                if not os.path.exists(artifact_path):
+                    os.makedirs(artifact_path)
+                trace_path = os.path.join(artifact_path, "stage_trace.json")
+                write_trace(trace_path)
+                mlflow.log_artifact(trace_path)
 
 
     else:
         print("An active run already exists.")
 
 
-if __name__ == "__main__":
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser()
     parser.add_argument("--housing_url", default="https://raw.githubusercontent.com/ageron/handson-ml/master/datasets/housing/housing.tgz", help="URL of the housing data")
     parser.add_argument("--housing_path", default="datasets/housing", help="Path to store housing data")
-    args = parser.parse_args()
+    parser.add_argument("--n_jobs", type=int, default=1, help="Parallel workers for the hyperparameter search (-1 for all CPUs)")
+    parser.add_argument("--estimator_n_jobs", type=int, default=1, help="Parallel jobs inside each random forest fit")
+    parser.add_argument("--backend", default="loky", choices=["loky", "multiprocessing", "threading"], help="joblib backend for the search: processes (loky, multiprocessing) or threads")
+    parser.add_argument("--slim_model", action="store_true", help="Log a compact float32 flat-forest artifact instead of the pickled search object")
+    parser.add_argument("--slim_max_depth", type=int, default=None, help="Prune slim artifact trees to this depth (approximate)")
+    parser.add_argument("--slim_compress", action="store_true", help="Compress the slim artifact arrays")
+    parser.add_argument("--trace_memory", action="store_true", help="Record each stage's peak allocations with tracemalloc (slower)")
+    parser.add_argument("--spool_dir", default=None, help="Where params/metrics are spooled when the tracking store is unavailable (default: mlruns_spool)")
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
     main(args)
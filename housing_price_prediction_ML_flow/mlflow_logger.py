@@ -0,0 +1,268 @@
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+import mlflow
+from mlflow.entities import Metric, Param, RunTag
+from mlflow.tracking import MlflowClient
+
+# Per-request limits of the MLflow log_batch API
+MAX_METRICS_PER_BATCH = 1000
+MAX_PARAMS_PER_BATCH = 100
+MAX_TAGS_PER_BATCH = 100
+
+SPOOL_DIR = "mlruns_spool"
+
+# cv_results_ columns logged per candidate as metrics, with the candidate index as the step
+SEARCH_TRACE_METRICS = ("mean_test_score", "std_test_score", "mean_fit_time", "mean_score_time")
+
+logger = logging.getLogger(__name__)
+
+
+class BatchLogger:
+    # Buffers params, metrics and tags for one run and sends them with log_batch from a
+    # background thread, so pipeline stages never wait on the tracking store. Batches the
+    # store rejects after max_retries are appended to <spool_dir>/<run_id>.jsonl and
+    # replayed on the next flush that succeeds (or later with replay_spool).
+    def __init__(
+        self,
+        run_id: str,
+        client: MlflowClient = None,
+        flush_interval: float = 2.0,
+        max_buffer: int = 500,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5,
+        spool_dir: str = SPOOL_DIR,
+    ):
+        self.run_id = run_id
+        self.client = client or MlflowClient()
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.spool_path = os.path.join(spool_dir, f"{run_id}.jsonl")
+        self._metrics = []
+        self._params = {}
+        self._tags = {}
+        self._logged_params = {}
+        self._in_flight = False
+        self._flush_requested = False
+        self._closing = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="mlflow-batch-logger", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        global _ACTIVE
+        _ACTIVE = self
+        return self
+
+    def __exit__(self, *exc):
+        global _ACTIVE
+        _ACTIVE = None
+        self.close()
+
+    def _buffered(self) -> int:
+        return len(self._metrics) + len(self._params) + len(self._tags)
+
+    def log_param(self, key: str, value):
+        value = str(value)
+        with self._condition:
+            # Params are immutable in MLflow; a conflicting value would fail the whole batch
+            previous = self._logged_params.get(key, value)
+            if previous != value:
+                logger.warning(f"Ignoring param {key}={value!r}; it was already logged as {previous!r}")
+                return
+            self._logged_params[key] = value
+            self._params[key] = value
+            self._notify_if_full()
+
+    def log_params(self, params: dict):
+        for key, value in params.items():
+            self.log_param(key, value)
+
+    def log_metric(self, key: str, value: float, step: int = 0):
+        metric = Metric(key, float(value), int(time.time() * 1000), step)
+        with self._condition:
+            self._metrics.append(metric)
+            self._notify_if_full()
+
+    def log_metrics(self, metrics: dict, step: int = 0):
+        for key, value in metrics.items():
+            self.log_metric(key, value, step=step)
+
+    def log_batch(self, metrics: list):
+        # Pre-built Metric entities, e.g. a whole series with explicit steps
+        with self._condition:
+            self._metrics.extend(metrics)
+            self._notify_if_full()
+
+    def set_tag(self, key: str, value):
+        with self._condition:
+            self._tags[key] = str(value)
+            self._notify_if_full()
+
+    def _notify_if_full(self):
+        if self._buffered() >= self.max_buffer:
+            self._condition.notify_all()
+
+    def flush(self, timeout: float = None) -> bool:
+        # Blocks until everything buffered so far has been sent or spooled
+        with self._condition:
+            self._flush_requested = True
+            self._condition.notify_all()
+            return self._condition.wait_for(lambda: not self._buffered() and not self._in_flight, timeout)
+
+    def close(self, timeout: float = 30.0):
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            # The store is hanging: keep what is still buffered on disk instead of losing it
+            with self._condition:
+                batch = self._take()
+            self._spool(*batch)
+            logger.warning(f"MLflow store did not respond within {timeout}s; buffered records spooled to {self.spool_path}")
+
+    def _take(self) -> tuple:
+        batch = (self._metrics, [Param(k, v) for k, v in self._params.items()], [RunTag(k, v) for k, v in self._tags.items()])
+        self._metrics, self._params, self._tags = [], {}, {}
+        return batch
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._closing or self._flush_requested or self._buffered() >= self.max_buffer,
+                    self.flush_interval,
+                )
+                self._flush_requested = False
+                closing = self._closing
+                batch = self._take()
+                self._in_flight = True
+            try:
+                if any(batch) and self._send(*batch):
+                    self.replay_spool()
+            finally:
+                with self._condition:
+                    self._in_flight = False
+                    self._condition.notify_all()
+            if closing:
+                return
+
+    def _send(self, metrics: list, params: list, tags: list) -> bool:
+        # Split into requests within the API limits. When a request gives up, it and
+        # everything after it is spooled and False is returned.
+        while metrics or params or tags:
+            chunk = (metrics[:MAX_METRICS_PER_BATCH], params[:MAX_PARAMS_PER_BATCH], tags[:MAX_TAGS_PER_BATCH])
+            for attempt in range(self.max_retries):
+                try:
+                    self.client.log_batch(self.run_id, metrics=chunk[0], params=chunk[1], tags=chunk[2])
+                    break
+                except Exception as e:
+                    logger.warning(f"log_batch failed (attempt {attempt + 1}/{self.max_retries}): {e}")
+                    time.sleep(self.retry_backoff * 2**attempt)
+            else:
+                self._spool(metrics, params, tags)
+                return False
+            metrics, params, tags = metrics[len(chunk[0]):], params[len(chunk[1]):], tags[len(chunk[2]):]
+        return True
+
+    def _spool(self, metrics: list, params: list, tags: list):
+        if not (metrics or params or tags):
+            return
+        os.makedirs(os.path.dirname(self.spool_path) or ".", exist_ok=True)
+        record = {
+            "metrics": [[m.key, m.value, m.timestamp, m.step] for m in metrics],
+            "params": [[p.key, p.value] for p in params],
+            "tags": [[t.key, t.value] for t in tags],
+        }
+        with open(self.spool_path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def replay_spool(self) -> bool:
+        # Re-sends spooled batches; returns True once the spool file is gone
+        if not os.path.exists(self.spool_path):
+            return True
+        with open(self.spool_path) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        os.remove(self.spool_path)
+        for record in records:
+            self._send(
+                [Metric(*values) for values in record["metrics"]],
+                [Param(*values) for values in record["params"]],
+                [RunTag(*values) for values in record["tags"]],
+            )
+        return not os.path.exists(self.spool_path)
+
+
+_ACTIVE = None
+
+
+def active_logger():
+    return _ACTIVE
+
+
+# Module-level helpers for the pipeline stages: buffered when a BatchLogger is active,
+# otherwise straight to the fluent API as before
+def log_param(key: str, value):
+    if _ACTIVE is not None:
+        _ACTIVE.log_param(key, value)
+    else:
+        mlflow.log_param(key, value)
+
+
+def log_metric(key: str, value: float, step: int = 0):
+    if _ACTIVE is not None:
+        _ACTIVE.log_metric(key, value, step=step)
+    else:
+        mlflow.log_metric(key, value, step=step)
+
+
+def set_tag(key: str, value):
+    if _ACTIVE is not None:
+        _ACTIVE.set_tag(key, value)
+    else:
+        mlflow.set_tag(key, value)
+
+
+def search_trace(cv_results: dict) -> pd.DataFrame:
+    # One row per candidate: param_* values, fit/score times, per-fold scores and rank
+    trace = pd.DataFrame({key: value for key, value in cv_results.items() if key != "params"})
+    trace.index.name = "candidate"
+    return trace
+
+
+def log_search_trace(cv_results: dict, artifact_path: str = "search"):
+    # The whole trace goes out as a single CSV artifact, and the summary columns as one
+    # batch of stepped metrics rather than a log_metric call per candidate and column.
+    trace = search_trace(cv_results)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "search_trace.csv")
+        trace.to_csv(path)
+        mlflow.log_artifact(path, artifact_path=artifact_path)
+
+    timestamp = int(time.time() * 1000)
+    columns = [column for column in SEARCH_TRACE_METRICS if column in trace]
+    metrics = [
+        Metric(f"search_{column}", float(value), timestamp, step)
+        for column in columns
+        for step, value in enumerate(trace[column].to_numpy(dtype=np.float64))
+    ]
+    if "mean_test_score" in trace:
+        rmse = np.sqrt(-trace["mean_test_score"].to_numpy(dtype=np.float64))
+        metrics += [Metric("search_cv_rmse", float(value), timestamp, step) for step, value in enumerate(rmse)]
+
+    if _ACTIVE is not None:
+        _ACTIVE.log_batch(metrics)
+    else:
+        client = MlflowClient()
+        run_id = mlflow.active_run().info.run_id
+        for start in range(0, len(metrics), MAX_METRICS_PER_BATCH):
+            client.log_batch(run_id, metrics=metrics[start:start + MAX_METRICS_PER_BATCH])
+    return trace
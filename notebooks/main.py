@@ -1,4 +1,5 @@
 import argparse
+import contextlib
 import logging
 import os
 import sys
@@ -16,9 +17,14 @@ src_dir = os.path.join(parent_dir, "src")
 # Add src directory to sys.path
 sys.path.append(src_dir)
 
-from ingest import fetch_housing_data, load_housing_data
-from train import prepare_data, preprocess_data, train_model
-from score import evaluate_model
+# Only the standard library is imported up front: pandas, scikit-learn and friends take seconds
+# to load, so each subcommand imports what it needs when it runs and --help stays instant.
+if __package__:
+    # Imported as notebooks.main, e.g. by the `main` console script
+    from . import serve
+else:
+    import serve
+from instrument import configure, profile, write_trace
 
 def initialize_logger(output_dir: str, log_level: str = "INFO") -> logging.Logger:
     logger = logging.getLogger("housing_ml_pipeline")
@@ -28,30 +34,302 @@ def initialize_logger(output_dir: str, log_level: str = "INFO") -> logging.Logge
     logger.addHandler(handler)
     return logger
 
-def main(args):
+def main(args=None):
+    if args is None:
+        # Console script entry point
+        args = build_parser().parse_args()
+    command = getattr(args, "command", None) or "train"
+    if command == "serve":
+        return serve.main(args)
+    if command == "cv_worker":
+        return run_cv_worker(args)
+    os.makedirs(args.output_dir, exist_ok=True)
     logger = initialize_logger(args.output_dir, args.log_level)
+    configure(memory=args.trace_memory)
+    try:
+        with profile(args.profile) if args.profile else contextlib.nullcontext():
+            COMMANDS[command](args, logger)
+    finally:
+        if args.trace_output:
+            write_trace(args.trace_output)
+            logger.info(f"Stage trace written to {args.trace_output}")
+
+def run_ingest(args, logger: logging.Logger):
+    from ingest import fetch_housing_data, load_housing_data
+
+    fetch_housing_data(args.housing_url, args.housing_path, logger, force=args.force_download)
+    # Loading once also writes the binary snapshot later runs read instead of the CSV
+    housing = load_housing_data(args.housing_path, logger, snapshot=not args.no_snapshot)
+    logger.info(f"Ingested {len(housing)} rows into {args.housing_path}")
+
+def run_cv_worker(args):
+    # Serves cross-validation tasks for `train --search cached --cv_workers ...` until killed.
+    # Set HOUSING_CV_AUTHKEY to the same secret here and on the training host.
+    from search import serve_worker
+
+    logging.basicConfig(level=args.log_level, format="%(asctime)s - %(levelname)s - %(message)s")
+    serve_worker(args.bind, logger=logging.getLogger("housing_cv_worker"))
+
+def run_score(args, logger: logging.Logger):
+    # With --artifact nothing below pulls in scikit-learn: the forest is flat numpy arrays
+    if args.artifact:
+        from artifact import load_artifact
+
+        model = load_artifact(args.artifact, logger)
+        preprocessor = model.preprocessor
+    elif args.model:
+        from train import load_model
+
+        model, preprocessor = load_model(args.model, logger)
+    else:
+        raise ValueError("Either --model or --artifact is required.")
+    if preprocessor is None:
+        raise ValueError("The model has no fitted preprocessor; re-train with --model_output or --artifact_output.")
+    from score import score_batches
+
+    cache = serve.build_cache(args, logger)
+    try:
+        return score_batches(
+            model,
+            args.input,
+            logger,
+            preprocessor=preprocessor,
+            output_path=args.predictions_output,
+            chunk_size=args.chunk_size,
+            n_jobs=args.n_jobs,
+            cache=cache,
+        )
+    finally:
+        if cache is not None:
+            cache.close()
+
+def run_pipeline(args, logger: logging.Logger):
+    from ingest import fetch_housing_data, load_housing_data, iter_housing_chunks
+    import numpy as np
+    from train import split_indices, fit_preprocessor, train_model, train_incremental, save_model, load_model
+    from train import stream_training_data
+    from train import supports_category_codes, check_compact_accuracy
+    from score import evaluate_model
+    from forest import FlatForest, can_flatten
+    from artifact import export_artifact
+    from pipeline import Pipeline, StageCache
+
+    # --housing_path holds the data a --previous_model was trained on, --delta_path the new rows:
+    # drift is only meaningful on rows the previous forest has never seen
+    if args.previous_model and not args.delta_path:
+        raise ValueError("--previous_model needs --delta_path: the new rows to measure drift on and train with.")
+    if args.stream_chunk_size and (args.geo or args.previous_model):
+        raise ValueError("--stream_chunk_size cannot be combined with --geo or --previous_model.")
+
+    # With --cache_dir, stages whose code, parameters and inputs are unchanged are loaded, not re-run
+    cache = None
+    if args.cache_dir:
+        max_bytes = None if args.cache_max_mb is None else int(args.cache_max_mb * 1e6)
+        cache = StageCache(args.cache_dir, logger, max_bytes=max_bytes)
+    pipeline = Pipeline(logger, cache)
+
+    encoding = "onehot"
+    if args.compact:
+        if supports_category_codes(args.zoo):
+            encoding = "codes"
+        else:
+            logger.info("Compact mode keeps one-hot categories: not every zoo model is a tree model.")
 
     # Fetch and load data
-    fetch_housing_data(args.housing_url, args.housing_path, logger)
-    housing = load_housing_data(args.housing_path, logger)
+    fetch_housing_data(args.housing_url, args.housing_path, logger, force=args.force_download)
+    housing = None
+    previous_model = None
+    if args.stream_chunk_size:
+        # The raw table is read chunk by chunk, twice, and never held whole
+        preprocessor, train_data, train_labels, test_data, test_labels = stream_training_data(
+            lambda: iter_housing_chunks(args.housing_path, logger, chunksize=args.stream_chunk_size),
+            logger,
+            encoding=encoding,
+        )
+    else:
+        housing = load_housing_data(args.housing_path, logger, snapshot=not args.no_snapshot)
 
-    # Prepare data
-    strat_train_set, strat_test_set = prepare_data(housing, logger)
-    train_data, train_labels = preprocess_data(strat_train_set, logger)
-    test_data, test_labels = preprocess_data(strat_test_set, logger)
+        # Prepare data
+        # Stratified split as row indices; each matrix is gathered from housing exactly once
+        index_dtype = np.int32 if args.compact else np.intp
+        train_index, test_index = pipeline.run("split_indices", split_indices, housing, logger, dtype=index_dtype)
+        if args.previous_model:
+            # Warm starts need the exact feature layout the previous forest was trained on
+            previous_model, preprocessor = load_model(args.previous_model, logger)
+            delta = load_housing_data(args.delta_path, logger, snapshot=not args.no_snapshot)
+            delta_train_index, delta_test_index = pipeline.run("split_delta", split_indices, delta, logger, dtype=index_dtype)
+        else:
+            # Fit imputation medians and dummy columns (and geo features) on the training set only
+            geo = None
+            if args.geo:
+                from geo import GeoFeatures
+
+                geo = GeoFeatures(n_neighbors=args.geo_neighbors, n_clusters=args.geo_clusters)
+            preprocessor = pipeline.run(
+                "fit_preprocessor", fit_preprocessor, housing, logger, rows=train_index, geo=geo, encoding=encoding
+            )
+        # training=True: the training districts' own prices are left out of their neighbour features
+        train_data = preprocessor.transform(housing, rows=train_index, training=previous_model is None)
+        train_labels = preprocessor.transform_target(housing, rows=train_index)
+        test_data = preprocessor.transform(housing, rows=test_index)
+        test_labels = preprocessor.transform_target(housing, rows=test_index)
+        if previous_model is not None:
+            history = (train_data, train_labels)
+            train_data = preprocessor.transform(delta, rows=delta_train_index)
+            train_labels = preprocessor.transform_target(delta, rows=delta_train_index)
+            # Evaluated on the held-out rows of both the history and the delta
+            test_data = np.concatenate([test_data, preprocessor.transform(delta, rows=delta_test_index)])
+            test_labels = np.concatenate([test_labels, preprocessor.transform_target(delta, rows=delta_test_index)])
 
     # Train model
-    model = train_model(train_data, train_labels, logger)
+    search_kwargs = dict(
+        n_jobs=args.n_jobs,
+        estimator_n_jobs=args.estimator_n_jobs,
+        backend=args.backend,
+        search=args.search,
+        resource=args.resource,
+        cv_workers=args.cv_workers,
+    )
+    if previous_model is not None:
+        model = pipeline.run(
+            "train_incremental",
+            train_incremental,
+            previous_model,
+            train_data,
+            train_labels,
+            logger,
+            new_trees=args.new_trees,
+            drift_threshold=args.drift_threshold,
+            history=history,
+            **search_kwargs,
+        )
+    else:
+        model = pipeline.run("train_model", train_model, train_data, train_labels, logger, zoo=args.zoo, **search_kwargs)
+        if args.zoo is not None and args.leaderboard_output:
+            model.leaderboard_.to_csv(args.leaderboard_output)
+            logger.info(f"Leaderboard written to {args.leaderboard_output}")
+
+    if args.model_output:
+        save_model(model, args.model_output, logger, preprocessor=preprocessor)
+
+    # Flat exports hold trees only; with --zoo the winner may be another kind of model
+    flattenable = can_flatten(model.best_estimator_)
+    if not flattenable and (args.forest_output or args.artifact_output):
+        logger.warning(
+            f"The best model ({type(model.best_estimator_).__name__}) is not a tree model; skipping "
+            "--forest_output and --artifact_output. Use --model_output to keep it."
+        )
+
+    predictor = None
+    if args.forest_output and flattenable:
+        logger.info(f"Exporting flattened forest to {args.forest_output}...")
+        predictor = FlatForest.from_estimator(model.best_estimator_)
+        predictor.save(args.forest_output)
+
+    if args.artifact_output and flattenable:
+        export_artifact(
+            model,
+            args.artifact_output,
+            logger,
+            preprocessor=preprocessor,
+            max_depth=args.artifact_max_depth,
+            compress=args.artifact_compress,
+        )
 
     # Evaluate model
-    evaluate_model(model, test_data, test_labels, logger)
+    evaluate_model(model, test_data, test_labels, logger, chunk_size=args.score_chunk_size, predictor=predictor)
+    if args.compact and not args.no_compact_check and housing is not None:
+        check_compact_accuracy(model, preprocessor, housing, train_index, test_index, logger)
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--housing_url", default="https://raw.githubusercontent.com/ageron/handson-ml/master/datasets/housing/housing.tgz", help="URL of the housing data")
+def add_data_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--housing_url", default="https://raw.githubusercontent.com/ageron/handson-ml/master/datasets/housing/housing.tgz", help="URL of the housing data (http(s)://, file:// or a local mirror path)")
     parser.add_argument("--housing_path", default="datasets/housing", help="Path to store housing data")
+    parser.add_argument("--force_download", action="store_true", help="Ignore the dataset cache manifest and re-download")
+    parser.add_argument("--no_snapshot", action="store_true", help="Always parse housing.csv instead of the binary snapshot")
+
+def add_train_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--geo", action="store_true", help="Add nearest-district price and distance-to-cluster features from latitude/longitude")
+    parser.add_argument("--geo_neighbors", type=int, default=10, help="Training districts aggregated per row by --geo")
+    parser.add_argument("--geo_clusters", type=int, default=8, help="KMeans location clusters whose distances --geo adds")
+    parser.add_argument("--compact", action="store_true", help="Compact dtypes: category codes instead of one-hot columns (tree models only) and int32 row indices, on top of the float32 features")
+    parser.add_argument("--no_compact_check", action="store_true", help="Skip --compact's float64 refit that reports the RMSE delta")
+    parser.add_argument("--n_jobs", type=int, default=1, help="Parallel workers for the hyperparameter search (-1 for all CPUs)")
+    parser.add_argument("--estimator_n_jobs", type=int, default=1, help="Parallel jobs inside each random forest fit")
+    parser.add_argument("--backend", default="loky", choices=["loky", "multiprocessing", "threading"], help="joblib backend for the search: processes (loky, multiprocessing) or threads")
+    parser.add_argument("--search", default="random", choices=["random", "cached", "halving", "bayes"], help="Hyperparameter search strategy (cached: random search over precomputed fold matrices)")
+    parser.add_argument("--cv_workers", nargs="+", default=None, help="host:port of CV workers (main.py cv_worker) to run the cached search's fits on")
+    parser.add_argument("--resource", default="n_estimators", choices=["n_estimators", "n_samples"], help="Budget that successive halving grows per round")
+    parser.add_argument("--stream_chunk_size", type=int, default=None, help="Read housing.csv in chunks of this many rows: streamed split, sketched imputation medians and per-chunk feature matrices instead of one in-memory table")
+    parser.add_argument("--zoo", nargs="*", default=None, help="Train these models side by side on the same features and keep the best: linear, tree, forest_random, forest_grid (no names: all of them)")
+    parser.add_argument("--leaderboard_output", default=None, help="Write the --zoo leaderboard to this CSV file")
+    parser.add_argument("--previous_model", default=None, help="Model bundle from an earlier run, trained on --housing_path, to grow incrementally")
+    parser.add_argument("--delta_path", default=None, help="Directory with a housing.csv of new rows for --previous_model: drift is measured and trees are grown on these")
+    parser.add_argument("--new_trees", type=int, default=20, help="Trees to add on warm-start retrains")
+    parser.add_argument("--drift_threshold", type=float, default=0.1, help="Relative RMSE drift above which a full search is run")
+    parser.add_argument("--model_output", default=None, help="Where to save the trained model bundle")
+    parser.add_argument("--score_chunk_size", type=int, default=None, help="Predict the test set in chunks of this many rows")
+    parser.add_argument("--forest_output", default=None, help="Export the best forest as flat node arrays to this directory and evaluate with it")
+    parser.add_argument("--artifact_output", default=None, help="Write a slim float32 serving artifact (flat forest + preprocessor) to this directory")
+    parser.add_argument("--artifact_max_depth", type=int, default=None, help="Prune artifact trees to this depth (approximate; smaller and faster)")
+    parser.add_argument("--artifact_compress", action="store_true", help="Compress the artifact arrays (smaller, but loaded into memory instead of memory-mapped)")
+    parser.add_argument("--cache_dir", default=None, help="Cache stage outputs here and skip stages whose inputs, parameters and code are unchanged")
+    parser.add_argument("--cache_max_mb", type=float, default=None, help="Evict least recently used cache entries beyond this size")
+
+def add_score_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--input", required=True, help="CSV of housing rows to score (read in chunks)")
+    parser.add_argument("--model", default=None, help="Model bundle written by --model_output")
+    parser.add_argument("--artifact", default=None, help="Compact artifact written by --artifact_output (scores without importing scikit-learn)")
+    parser.add_argument("--predictions_output", default=None, help="Write one prediction per input row to this file")
+    parser.add_argument("--chunk_size", type=int, default=50_000, help="Rows scored per chunk")
+    parser.add_argument("--n_jobs", type=int, default=1, help="Chunks scored in parallel (-1 for all CPUs)")
+
+def add_run_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--trace_output", default=None, help="Write per-stage timings as a Chrome trace JSON (open in chrome://tracing or Perfetto)")
+    parser.add_argument("--trace_memory", action="store_true", help="Record each stage's peak allocations with tracemalloc (slower)")
+    parser.add_argument("--profile", default=None, help="Run the pipeline under cProfile and write the stats to this file")
     parser.add_argument("--output_dir", default="logs", help="Directory to store logs")
     parser.add_argument("--log_level", default="INFO", help="Logging level")
 
-    args = parser.parse_args()
-    main(args)
+def build_parser() -> argparse.ArgumentParser:
+    # Without a subcommand the full pipeline runs, as before: fetch, train, evaluate. No abbreviations,
+    # or e.g. `score --artifact` would be taken as a prefix of the top-level --artifact_output.
+    parser = argparse.ArgumentParser(description="Housing price pipeline", allow_abbrev=False)
+    add_data_arguments(parser)
+    add_train_arguments(parser)
+    add_run_arguments(parser)
+
+    commands = parser.add_subparsers(dest="command")
+    ingest = commands.add_parser("ingest", help="Download the housing data and write its binary snapshot")
+    add_data_arguments(ingest)
+    add_run_arguments(ingest)
+
+    train = commands.add_parser("train", help="Train, export and evaluate a model (the default)")
+    add_data_arguments(train)
+    add_train_arguments(train)
+    add_run_arguments(train)
+
+    score = commands.add_parser("score", help="Score a CSV with a saved model bundle or compact artifact")
+    add_score_arguments(score)
+    serve.add_cache_arguments(score)
+    add_run_arguments(score)
+
+    serve.add_arguments(commands.add_parser("serve", help="Serve predictions over HTTP"))
+
+    cv_worker = commands.add_parser("cv_worker", help="Run cross-validation fits for a training host")
+    cv_worker.add_argument("--bind", default="127.0.0.1:6000", help="host:port to listen on (0.0.0.0 to accept other hosts, which requires HOUSING_CV_AUTHKEY)")
+    cv_worker.add_argument("--log_level", default="INFO", help="Logging level")
+
+    # Options accepted both before and after the subcommand keep the value given before it
+    # (`main.py --geo train`) unless repeated after it: argparse would otherwise copy the
+    # subcommand's defaults over them
+    shared = {action.dest for action in parser._actions if action.option_strings}
+    for subparser in commands.choices.values():
+        for action in subparser._actions:
+            if action.dest in shared and action.dest != "help":
+                action.default = argparse.SUPPRESS
+    return parser
+
+COMMANDS = {"ingest": run_ingest, "train": run_pipeline, "score": run_score}
+
+if __name__ == "__main__":
+    main()
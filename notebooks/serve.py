@@ -0,0 +1,100 @@
+import argparse
+import logging
+import os
+import sys
+
+
+# Get the current directory (notebooks folder)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Move one step back to the parent directory
+parent_dir = os.path.dirname(current_dir)
+
+# Construct the path to the src directory
+src_dir = os.path.join(parent_dir, "src")
+
+# Add src directory to sys.path
+sys.path.append(src_dir)
+
+# Heavy modules are imported in main(), once we know which model format is served
+
+def initialize_logger(log_level: str = "INFO") -> logging.Logger:
+    logger = logging.getLogger("housing_scoring_server")
+    logger.setLevel(log_level)
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+    logger.addHandler(handler)
+    return logger
+
+def main(args=None):
+    if args is None:
+        # Console script entry point
+        args = build_parser().parse_args()
+    from server import serve
+
+    logger = initialize_logger(args.log_level)
+    # Model and fitted preprocessing are loaded once and shared by every request
+    if args.artifact:
+        # Already flat and memory-mapped; the node arrays are paged in on first request
+        from artifact import load_artifact
+
+        model = load_artifact(args.artifact, logger)
+        preprocessor, source = model.preprocessor, args.artifact
+    elif args.model:
+        from train import load_model
+        from forest import FlatForest
+
+        model, preprocessor = load_model(args.model, logger)
+        source = args.model
+        if args.forest:
+            # Flattened node arrays, memory-mapped; bypasses sklearn's per-tree dispatch
+            model = FlatForest.load(args.forest)
+        elif args.compile:
+            model = FlatForest.from_estimator(model.best_estimator_)
+    else:
+        raise ValueError("Either --model or --artifact is required.")
+    if preprocessor is None:
+        raise ValueError(f"{source} has no fitted preprocessor; re-train with --model_output or --artifact_output to serve it.")
+    serve(
+        model,
+        preprocessor,
+        logger,
+        host=args.host,
+        port=args.port,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+        cache=build_cache(args, logger),
+    )
+
+def build_cache(args, logger: logging.Logger):
+    # None unless --cache_size or --cache_db asks for a prediction cache
+    if not args.cache_size and not args.cache_db:
+        return None
+    from prediction_cache import PredictionCache
+
+    return PredictionCache(max_entries=args.cache_size or 100_000, ttl=args.cache_ttl, path=args.cache_db, logger=logger)
+
+def add_cache_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--cache_size", type=int, default=0, help="Keep up to this many predictions in memory, keyed by the preprocessed row (0: no cache)")
+    parser.add_argument("--cache_ttl", type=float, default=None, help="Seconds a cached prediction stays valid")
+    parser.add_argument("--cache_db", default=None, help="SQLite file backing the prediction cache across runs and processes")
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--model", default=None, help="Model bundle written by main.py --model_output")
+    parser.add_argument("--artifact", default=None, help="Compact artifact written by main.py --artifact_output (served without sklearn objects)")
+    parser.add_argument("--forest", default=None, help="Directory written by main.py --forest_output to predict with")
+    parser.add_argument("--compile", action="store_true", help="Flatten the model's forest at startup and predict with it")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on")
+    parser.add_argument("--max_batch_size", type=int, default=256, help="Most rows scored in one micro-batch")
+    parser.add_argument("--max_wait_ms", type=float, default=2.0, help="How long a micro-batch waits for more requests")
+    add_cache_arguments(parser)
+    parser.add_argument("--log_level", default="INFO", help="Logging level")
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Serve housing price predictions over HTTP")
+    add_arguments(parser)
+    return parser
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,7 @@ setup(
     entry_points={
         "console_scripts": [
             "main=notebooks.main:main",  
+            "serve=notebooks.serve:main",
         ],
     },
 )
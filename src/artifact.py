@@ -0,0 +1,123 @@
+import os
+import json
+import pickle
+import shutil
+import logging
+import numpy as np
+
+from forest import ARRAYS, FlatForest
+
+ARTIFACT_FORMAT = 1
+ARTIFACT_MANIFEST = "artifact.json"
+PREPROCESSOR_FILE = "preprocessor.pkl"
+COMPRESSED_ARRAYS = "forest.npz"
+
+
+def export_artifact(
+    model,
+    path: str,
+    logger: logging.Logger,
+    preprocessor=None,
+    dtype=np.float32,
+    max_depth: int = None,
+    compress: bool = False,
+) -> dict:
+    # Slim serving artifact: only the best forest as flat node arrays plus the fitted
+    # preprocessor, with no search state, cv_results_ or per-tree Python objects.
+    # The artifact is written to a fresh directory and swapped in whole, so no file of an
+    # earlier export survives and arrays a server has memory-mapped are never rewritten.
+    logger.info(f"Exporting compact model artifact to {path}...")
+    path = os.path.normpath(path)
+    if os.path.isdir(path) and os.listdir(path) and not os.path.exists(os.path.join(path, ARTIFACT_MANIFEST)):
+        raise ValueError(f"{path} exists and is not a model artifact; refusing to replace it.")
+    estimator = getattr(model, "best_estimator_", model)
+    forest = FlatForest.from_estimator(estimator, dtype=dtype, max_depth=max_depth)
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    if compress:
+        # Smaller on disk, but compressed arrays cannot be memory-mapped on load
+        np.savez_compressed(os.path.join(tmp_path, COMPRESSED_ARRAYS), **{name: getattr(forest, name) for name in ARRAYS})
+    else:
+        forest.save(tmp_path)
+    if preprocessor is not None:
+        with open(os.path.join(tmp_path, PREPROCESSOR_FILE), "wb") as f:
+            pickle.dump(preprocessor, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    feature_names = getattr(estimator, "feature_names_in_", None)
+    manifest = {
+        "format": ARTIFACT_FORMAT,
+        "dtype": np.dtype(dtype).name,
+        "max_depth": forest.max_depth,
+        "pruned": max_depth is not None,
+        "compressed": compress,
+        "n_trees": forest.n_trees,
+        "n_nodes": len(forest.feature),
+        "n_features": forest.n_features,
+        "feature_names": None if feature_names is None else [str(name) for name in feature_names],
+        "has_preprocessor": preprocessor is not None,
+    }
+    with open(os.path.join(tmp_path, ARTIFACT_MANIFEST), "w") as f:
+        json.dump(manifest, f)
+    size = sum(os.path.getsize(os.path.join(tmp_path, name)) for name in os.listdir(tmp_path))
+    # The old export is moved aside rather than deleted first, so path is missing only between
+    # two renames; its files stay readable by open mappings until they are unmapped
+    old_path = path + ".old"
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    manifest["size_bytes"] = size
+    logger.info(f"Compact model artifact written: {forest.n_trees} trees, {size / 1e6:.1f} MB")
+    return manifest
+
+
+class CompactModel:
+    # Loaded artifact. Node arrays and the preprocessor are only read on first use, and
+    # uncompressed arrays are memory-mapped so concurrent server processes share pages.
+    def __init__(self, path: str, mmap_mode: str = "r"):
+        self.path = path
+        self.mmap_mode = mmap_mode
+        with open(os.path.join(path, ARTIFACT_MANIFEST)) as f:
+            self.manifest = json.load(f)
+        if self.manifest["format"] != ARTIFACT_FORMAT:
+            raise ValueError(f"Unsupported model artifact format {self.manifest['format']} in {path}")
+        self._forest = None
+        self._preprocessor = None
+
+    @property
+    def forest(self) -> FlatForest:
+        if self._forest is None:
+            if self.manifest["compressed"]:
+                with np.load(os.path.join(self.path, COMPRESSED_ARRAYS)) as arrays:
+                    self._forest = FlatForest(
+                        max_depth=self.manifest["max_depth"],
+                        n_features=self.manifest["n_features"],
+                        **{name: arrays[name] for name in ARRAYS},
+                    )
+            else:
+                self._forest = FlatForest.load(self.path, mmap_mode=self.mmap_mode)
+        return self._forest
+
+    @property
+    def preprocessor(self):
+        if self._preprocessor is None and self.manifest["has_preprocessor"]:
+            with open(os.path.join(self.path, PREPROCESSOR_FILE), "rb") as f:
+                self._preprocessor = pickle.load(f)
+        return self._preprocessor
+
+    @property
+    def best_estimator_(self) -> FlatForest:
+        # Lets evaluate_model / score_batches treat the artifact like a fitted search
+        return self.forest
+
+    def predict(self, data) -> np.ndarray:
+        return self.forest.predict(data)
+
+
+def load_artifact(path: str, logger: logging.Logger = None, mmap_mode: str = "r") -> CompactModel:
+    model = CompactModel(path, mmap_mode=mmap_mode)
+    if logger is not None:
+        logger.info(f"Loaded compact model artifact from {path} ({model.manifest['n_trees']} trees)")
+    return model
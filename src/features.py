@@ -0,0 +1,62 @@
+import numpy as np
+
+# What a ratio becomes when its denominator is zero, for x / 0 and 0 / 0 alike
+ZERO_DIVISION = np.nan
+
+
+class FeatureRegistry:
+    # Derived features declared once by name, then computed straight into the caller's
+    # (typically preallocated) output: no pandas Series or column insert per feature.
+    def __init__(self, zero_division: float = ZERO_DIVISION):
+        self.zero_division = zero_division
+        self._ratios = {}
+
+    def ratio(self, name: str, numerator: str, denominator: str) -> "FeatureRegistry":
+        if name in self._ratios:
+            raise ValueError(f"Feature {name!r} is already registered.")
+        self._ratios[name] = (numerator, denominator)
+        return self
+
+    @property
+    def names(self) -> list:
+        return list(self._ratios)
+
+    @property
+    def inputs(self) -> list:
+        # Source columns, in first-use order
+        return list(dict.fromkeys(column for pair in self._ratios.values() for column in pair))
+
+    def __len__(self) -> int:
+        return len(self._ratios)
+
+    def compute(self, columns, out: np.ndarray = None) -> np.ndarray:
+        # columns maps each input name to a 1-D array (a DataFrame works too); every feature
+        # is one divide over contiguous inputs, written straight into its column of out
+        if out is None:
+            n_rows = len(columns[self.inputs[0]]) if len(self) else 0
+            out = np.empty((n_rows, len(self)), dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for k, (numerator, denominator) in enumerate(self._ratios.values()):
+                denominators = np.asarray(columns[denominator])
+                np.divide(np.asarray(columns[numerator]), denominators, out=out[:, k])
+                zero = denominators == 0
+                if zero.any():
+                    out[zero, k] = self.zero_division
+        return out
+
+    def add_to_frame(self, frame: "pd.DataFrame") -> "pd.DataFrame":
+        # For pandas pipelines: every feature is appended in one concat, not one insert each.
+        # pandas is imported here so that serving through compute() never loads it.
+        import pandas as pd
+
+        columns = {column: frame[column].to_numpy(dtype=np.float64) for column in self.inputs}
+        derived = pd.DataFrame(self.compute(columns), columns=self.names, index=frame.index)
+        return pd.concat([frame, derived], axis=1)
+
+
+HOUSING_FEATURES = (
+    FeatureRegistry()
+    .ratio("rooms_per_household", "total_rooms", "households")
+    .ratio("bedrooms_per_room", "total_bedrooms", "total_rooms")
+    .ratio("population_per_household", "population", "households")
+)
@@ -0,0 +1,149 @@
+import os
+import json
+import numpy as np
+
+ARRAYS = ("feature", "threshold", "left", "right", "value", "missing_left", "roots")
+
+
+def can_flatten(estimator) -> bool:
+    # Regression forests and single regression trees: models that predict the mean of their
+    # trees' leaf values, which is what FlatForest computes. scikit-learn is only imported here,
+    # at export time, so loading and predicting with a FlatForest never needs it.
+    from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+    from sklearn.tree import DecisionTreeRegressor
+
+    return isinstance(estimator, (RandomForestRegressor, ExtraTreesRegressor, DecisionTreeRegressor))
+
+
+class FlatForest:
+    # A fitted RandomForestRegressor packed into flat node arrays. Every (row, tree) pair is
+    # traversed together, one depth level per NumPy step, and pairs drop out of the active
+    # set as soon as they reach a leaf (leaves point at themselves).
+    def __init__(self, feature, threshold, left, right, value, missing_left, roots, max_depth: int, n_features: int):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.missing_left = missing_left
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_features = n_features
+        self.is_leaf = left == np.arange(len(left), dtype=left.dtype)
+
+    @staticmethod
+    def _flatten_tree(tree, max_depth: int = None) -> dict:
+        left, right = tree.children_left, tree.children_right
+        keep = np.ones(tree.node_count, dtype=bool)
+        is_leaf = left == -1
+        if max_depth is not None and tree.max_depth > max_depth:
+            # Prune: nodes at max_depth become leaves carrying their mean, deeper nodes are dropped
+            depth = np.zeros(tree.node_count, dtype=np.int32)
+            frontier = np.array([0])
+            while frontier.size:
+                frontier = frontier[~is_leaf[frontier]]
+                children = np.concatenate([left[frontier], right[frontier]])
+                depth[children] = np.concatenate([depth[frontier], depth[frontier]]) + 1
+                frontier = children
+            keep = depth <= max_depth
+            is_leaf = is_leaf | (depth == max_depth)
+        new_index = np.cumsum(keep) - 1
+        nodes = np.arange(tree.node_count)
+        missing = getattr(tree, "missing_go_to_left", None)
+        return {
+            "feature": np.where(is_leaf, 0, tree.feature)[keep],
+            "threshold": np.where(is_leaf, np.inf, tree.threshold)[keep],
+            "left": new_index[np.where(is_leaf, nodes, left)][keep],
+            "right": new_index[np.where(is_leaf, nodes, right)][keep],
+            "value": tree.value[keep, 0, 0],
+            # Trees fitted on data with NaNs record which side missing values take
+            "missing_left": (np.zeros(tree.node_count, dtype=bool) if missing is None else missing.astype(bool))[keep],
+        }
+
+    @classmethod
+    def from_estimator(cls, forest, dtype=np.float64, max_depth: int = None):
+        if not can_flatten(forest):
+            raise TypeError(
+                f"Only random forests and decision trees can be flattened, not {type(forest).__name__}; "
+                "save the model bundle (--model_output) instead."
+            )
+        # A single tree is a forest of one
+        trees = [estimator.tree_ for estimator in getattr(forest, "estimators_", [forest])]
+        if trees[0].n_outputs != 1:
+            raise ValueError("FlatForest only supports single-output regression forests.")
+        flat_trees = [cls._flatten_tree(tree, max_depth) for tree in trees]
+        sizes = np.array([len(flat["feature"]) for flat in flat_trees])
+        roots = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int32)
+        arrays = {name: np.concatenate([flat[name] for flat in flat_trees]) for name in flat_trees[0]}
+        for name in ("left", "right"):
+            arrays[name] = (arrays[name] + np.repeat(roots, sizes)).astype(np.int32)
+
+        threshold = arrays["threshold"].astype(dtype)
+        if np.dtype(dtype).itemsize < 8:
+            # Inputs are float32, so rounding every threshold down to the nearest representable
+            # value keeps x <= threshold exact for every possible input.
+            rounded_up = threshold.astype(np.float64) > arrays["threshold"]
+            threshold[rounded_up] = np.nextafter(threshold[rounded_up], dtype(-np.inf))
+
+        depths = [tree.max_depth for tree in trees]
+        return cls(
+            feature=arrays["feature"].astype(np.int32),
+            threshold=threshold,
+            left=arrays["left"],
+            right=arrays["right"],
+            value=arrays["value"].astype(dtype),
+            missing_left=arrays["missing_left"],
+            roots=roots,
+            max_depth=int(max(depths) if max_depth is None else min(max(depths), max_depth)),
+            n_features=int(forest.n_features_in_),
+        )
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def apply(self, data) -> np.ndarray:
+        # Like RandomForestRegressor.apply, but with global node ids: shape (n_rows, n_trees)
+        data = np.ascontiguousarray(data, dtype=np.float32)
+        n_rows = len(data)
+        flat_data = data.ravel()
+        node = np.tile(self.roots, n_rows)
+        row_offset = np.repeat(np.arange(n_rows, dtype=np.int64) * data.shape[1], self.n_trees)
+        has_missing = bool(np.isnan(flat_data).any())
+        active = np.flatnonzero(~self.is_leaf[node])
+        while active.size:
+            current = node[active]
+            values = flat_data[row_offset[active] + self.feature[current]]
+            go_left = values <= self.threshold[current]
+            if has_missing:
+                go_left |= np.isnan(values) & self.missing_left[current]
+            following = np.where(go_left, self.left[current], self.right[current])
+            node[active] = following
+            active = active[~self.is_leaf[following]]
+        return node.reshape(n_rows, self.n_trees)
+
+    def predict(self, data, chunk_size: int = 4096) -> np.ndarray:
+        data = np.asarray(data, dtype=np.float32)
+        predictions = np.empty(len(data), dtype=np.float64)
+        for start in range(0, len(data), chunk_size):
+            leaves = self.value[self.apply(data[start:start + chunk_size])]
+            # Sum tree by tree, in order, exactly as RandomForestRegressor.predict does
+            total = np.zeros(len(leaves), dtype=np.float64)
+            for tree in range(self.n_trees):
+                total += leaves[:, tree]
+            predictions[start:start + chunk_size] = total / self.n_trees
+        return predictions
+
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        for name in ARRAYS:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(path, "forest.json"), "w") as f:
+            json.dump({"max_depth": self.max_depth, "n_features": self.n_features, "n_trees": self.n_trees}, f)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: str = "r"):
+        with open(os.path.join(path, "forest.json")) as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode) for name in ARRAYS}
+        return cls(max_depth=meta["max_depth"], n_features=meta["n_features"], **arrays)
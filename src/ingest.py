@@ -1,19 +1,236 @@
 import os
+import json
+import shutil
+import hashlib
 import tarfile
 import logging
+import numpy as np
 import pandas as pd
 from six.moves import urllib
 
-def fetch_housing_data(housing_url: str, housing_path: str, logger: logging.Logger):
+from instrument import traced
+
+MANIFEST_NAME = "manifest.json"
+CHUNK_SIZE = 1 << 20
+SNAPSHOT_DIR = "snapshot"
+SNAPSHOT_SCHEMA = "schema.json"
+
+HOUSING_DTYPES = {
+    "longitude": "float32",
+    "latitude": "float32",
+    "housing_median_age": "float32",
+    "total_rooms": "float32",
+    "total_bedrooms": "float32",
+    "population": "float32",
+    "households": "float32",
+    "median_income": "float32",
+    "median_house_value": "float32",
+    "ocean_proximity": "category",
+}
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_manifest(housing_path: str) -> dict:
+    manifest_path = os.path.join(housing_path, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except ValueError:
+        return {}
+
+
+def write_manifest(housing_path: str, manifest: dict):
+    manifest_path = os.path.join(housing_path, MANIFEST_NAME)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def _file_entry(path: str) -> dict:
+    stat = os.stat(path)
+    return {"sha256": file_sha256(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _entry_is_valid(path: str, entry: dict) -> bool:
+    if not entry or not os.path.isfile(path):
+        return False
+    stat = os.stat(path)
+    if stat.st_size != entry["size"]:
+        return False
+    # Size and mtime unchanged since we hashed it: trust the recorded hash
+    if stat.st_mtime_ns == entry.get("mtime_ns"):
+        return True
+    return file_sha256(path) == entry["sha256"]
+
+
+def _local_source(housing_url: str):
+    parsed = urllib.parse.urlparse(housing_url)
+    if parsed.scheme == "file":
+        return urllib.request.url2pathname(parsed.path)
+    if parsed.scheme == "" or os.path.exists(housing_url):
+        return housing_url
+    return None
+
+
+def download_archive(housing_url: str, tgz_path: str, logger: logging.Logger):
+    local_source = _local_source(housing_url)
+    if local_source is not None:
+        logger.info(f"Copying housing archive from local mirror {local_source}")
+        shutil.copyfile(local_source, tgz_path)
+        return
+
+    part_path = tgz_path + ".part"
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    request = urllib.request.Request(housing_url)
+    if offset:
+        request.add_header("Range", f"bytes={offset}-")
+    with urllib.request.urlopen(request) as response:
+        # Servers that ignore the Range header send the full body again
+        if offset and getattr(response, "status", 200) != 206:
+            offset = 0
+        if offset:
+            logger.info(f"Resuming download of {housing_url} at byte {offset}")
+        with open(part_path, "ab" if offset else "wb") as f:
+            shutil.copyfileobj(response, f, CHUNK_SIZE)
+    os.replace(part_path, tgz_path)
+
+
+@traced()
+def fetch_housing_data(housing_url: str, housing_path: str, logger: logging.Logger, force: bool = False) -> bool:
+    # Returns True when the cached archive and extracted files were valid and nothing was fetched
     logger.info("Fetching housing data...")
     os.makedirs(housing_path, exist_ok=True)
     tgz_path = os.path.join(housing_path, "housing.tgz")
-    urllib.request.urlretrieve(housing_url, tgz_path)
-    with tarfile.open(tgz_path) as housing_tgz:
-        housing_tgz.extractall(path=housing_path)
+    manifest = {} if force else read_manifest(housing_path)
+    if manifest.get("url") != housing_url:
+        manifest = {}
+
+    archive = manifest.get("archive", {})
+    files = manifest.get("files", {})
+    archive_valid = _entry_is_valid(tgz_path, archive)
+    files_valid = bool(files) and all(
+        _entry_is_valid(os.path.join(housing_path, name), entry) for name, entry in files.items()
+    )
+    if archive_valid and files_valid:
+        logger.info("Housing data cache is up to date, skipping download and extraction.")
+        return True
+
+    if not archive_valid:
+        download_archive(housing_url, tgz_path, logger)
+        archive_entry = _file_entry(tgz_path)
+        if archive_entry["sha256"] != archive.get("sha256"):
+            files = {}
+        archive = archive_entry
+
+    files_valid = bool(files) and all(
+        _entry_is_valid(os.path.join(housing_path, name), entry) for name, entry in files.items()
+    )
+    if not files_valid:
+        with tarfile.open(tgz_path) as housing_tgz:
+            members = [member.name for member in housing_tgz.getmembers() if member.isfile()]
+            housing_tgz.extractall(path=housing_path)
+        files = {name: _file_entry(os.path.join(housing_path, name)) for name in members}
+
+    write_manifest(housing_path, {"url": housing_url, "archive": archive, "files": files})
     logger.info("Housing data fetched and extracted.")
+    return False
+
+
+def _snapshot_is_fresh(snapshot_path: str, csv_path: str) -> bool:
+    schema_path = os.path.join(snapshot_path, SNAPSHOT_SCHEMA)
+    if not os.path.exists(schema_path) or not os.path.exists(csv_path):
+        return False
+    csv_stat = os.stat(csv_path)
+    if os.stat(schema_path).st_mtime_ns <= csv_stat.st_mtime_ns:
+        return False
+    with open(schema_path) as f:
+        source = json.load(f).get("source", {})
+    # Extraction restores archive mtimes, so also pin the exact CSV we were built from
+    return source.get("size") == csv_stat.st_size and source.get("mtime_ns") == csv_stat.st_mtime_ns
+
+
+def write_housing_snapshot(housing: pd.DataFrame, snapshot_path: str, csv_path: str):
+    tmp_path = snapshot_path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    columns = []
+    for i, (name, series) in enumerate(housing.items()):
+        file_name = f"{i:03d}.npy"
+        column = {"name": name, "file": file_name}
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            column["dtype"] = "category"
+            column["categories"] = series.cat.categories.tolist()
+            np.save(os.path.join(tmp_path, file_name), series.cat.codes.to_numpy())
+        else:
+            column["dtype"] = str(series.dtype)
+            np.save(os.path.join(tmp_path, file_name), series.to_numpy())
+        columns.append(column)
+
+    csv_stat = os.stat(csv_path)
+    schema = {
+        "num_rows": len(housing),
+        "columns": columns,
+        "source": {"file": os.path.basename(csv_path), "size": csv_stat.st_size, "mtime_ns": csv_stat.st_mtime_ns},
+    }
+    # schema.json is written last and marks the snapshot as complete
+    with open(os.path.join(tmp_path, SNAPSHOT_SCHEMA), "w") as f:
+        json.dump(schema, f, indent=2)
+    shutil.rmtree(snapshot_path, ignore_errors=True)
+    os.replace(tmp_path, snapshot_path)
 
-def load_housing_data(housing_path: str, logger: logging.Logger) -> pd.DataFrame:
+
+def read_housing_snapshot(snapshot_path: str) -> pd.DataFrame:
+    with open(os.path.join(snapshot_path, SNAPSHOT_SCHEMA)) as f:
+        schema = json.load(f)
+    data = {}
+    for column in schema["columns"]:
+        # Copy-on-write mapping: pages are shared with the file until a caller writes to them
+        values = np.load(os.path.join(snapshot_path, column["file"]), mmap_mode="c")
+        if column["dtype"] == "category":
+            values = pd.Categorical.from_codes(values, categories=column["categories"])
+        data[column["name"]] = values
+    return pd.DataFrame(data, copy=False)
+
+
+@traced(rows=len)
+def load_housing_data(housing_path: str, logger: logging.Logger, snapshot: bool = True) -> pd.DataFrame:
     logger.info("Loading housing data...")
     csv_path = os.path.join(housing_path, "housing.csv")
-    return pd.read_csv(csv_path)
+    if not snapshot:
+        return pd.read_csv(csv_path, dtype=HOUSING_DTYPES)
+
+    snapshot_path = os.path.join(housing_path, SNAPSHOT_DIR)
+    if _snapshot_is_fresh(snapshot_path, csv_path):
+        logger.info(f"Loading housing data from snapshot {snapshot_path}")
+        return read_housing_snapshot(snapshot_path)
+
+    housing = pd.read_csv(csv_path, dtype=HOUSING_DTYPES)
+    write_housing_snapshot(housing, snapshot_path, csv_path)
+    logger.info(f"Wrote housing data snapshot to {snapshot_path}")
+    return housing
+
+
+def iter_housing_chunks(housing_path: str, logger: logging.Logger, chunksize: int = 100_000):
+    logger.info(f"Streaming housing data in chunks of {chunksize} rows...")
+    csv_path = os.path.join(housing_path, "housing.csv")
+    snapshot_path = os.path.join(housing_path, SNAPSHOT_DIR)
+    if _snapshot_is_fresh(snapshot_path, csv_path):
+        # Slices of the memory-mapped snapshot only touch the pages of the current chunk
+        housing = read_housing_snapshot(snapshot_path)
+        for start in range(0, len(housing), chunksize):
+            yield housing.iloc[start:start + chunksize]
+        return
+
+    with pd.read_csv(csv_path, dtype=HOUSING_DTYPES, chunksize=chunksize) as reader:
+        for chunk in reader:
+            yield chunk
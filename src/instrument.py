@@ -0,0 +1,156 @@
+import os
+import json
+import time
+import inspect
+import logging
+import cProfile
+import functools
+import threading
+import contextlib
+import tracemalloc
+from collections import deque
+
+DEFAULT_LOGGER = logging.getLogger("housing_ml_pipeline")
+
+
+class Tracer:
+    # Times nested stages per thread and keeps them as Chrome trace events (load the JSON in
+    # chrome://tracing or Perfetto for a flame chart). With memory=True, tracemalloc records
+    # each stage's allocation high-water mark above what was live when it started.
+    def __init__(self, memory: bool = False, mlflow=False, max_events: int = 100_000):
+        self.memory = memory
+        self.mlflow = mlflow
+        self.events = deque(maxlen=max_events)
+        self._local = threading.local()
+        self._origin = time.perf_counter()
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _stack(self) -> list:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextlib.contextmanager
+    def stage(self, name: str, logger: logging.Logger = None, rows: int = None):
+        # Yields a dict; set span["rows"] inside the block if the count is only known later
+        span = {"name": name, "rows": rows}
+        stack = self._stack()
+        track_memory = self.memory and tracemalloc.is_tracing()
+        if track_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # tracemalloc keeps one global peak: hand the enclosing stage its peak so far
+            # before resetting, and give it ours back on exit
+            if stack:
+                stack[-1]["_peak"] = max(stack[-1]["_peak"], peak)
+            tracemalloc.reset_peak()
+            span["_start_memory"] = span["_peak"] = current
+        stack.append(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            duration = time.perf_counter() - start
+            stack.pop()
+            args = {} if span["rows"] is None else {"rows": int(span["rows"])}
+            if track_memory:
+                peak = max(span["_peak"], tracemalloc.get_traced_memory()[1])
+                args["peak_mb"] = (peak - span["_start_memory"]) / 1e6
+                if stack:
+                    stack[-1]["_peak"] = max(stack[-1]["_peak"], peak)
+                tracemalloc.reset_peak()
+            self._record(name, start, duration, args, logger or DEFAULT_LOGGER)
+
+    def _record(self, name: str, start: float, duration: float, args: dict, logger: logging.Logger):
+        self.events.append({
+            "name": name,
+            "ph": "X",
+            "ts": (start - self._origin) * 1e6,
+            "dur": duration * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args,
+        })
+        details = "".join(
+            [f", {args['rows']} rows ({args['rows'] / duration:,.0f} rows/s)" if "rows" in args and duration > 0 else ""]
+            + [f", peak +{args['peak_mb']:.1f} MB" if "peak_mb" in args else ""]
+        )
+        logger.info(f"Stage '{name}' took {duration:.3f}s{details}")
+        if self.mlflow:
+            metrics = {f"{name}_seconds": duration}
+            metrics.update({f"{name}_{key}": value for key, value in args.items()})
+            if hasattr(self.mlflow, "log_metrics"):
+                # e.g. a buffered logger bound to the run
+                self.mlflow.log_metrics(metrics)
+            else:
+                import mlflow
+
+                if mlflow.active_run() is not None:
+                    mlflow.log_metrics(metrics)
+
+    def write(self, path: str):
+        with open(path, "w") as f:
+            json.dump({"traceEvents": list(self.events), "displayTimeUnit": "ms"}, f)
+
+
+TRACER = Tracer()
+
+
+def configure(memory: bool = False, mlflow=False) -> Tracer:
+    # Replaces the process-wide tracer used by stage() and @traced. mlflow is True for the
+    # active run, or any object with log_metrics(dict).
+    global TRACER
+    if TRACER.memory and not memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    TRACER = Tracer(memory=memory, mlflow=mlflow)
+    return TRACER
+
+
+def stage(name: str, logger: logging.Logger = None, rows: int = None):
+    return TRACER.stage(name, logger=logger, rows=rows)
+
+
+def write_trace(path: str):
+    TRACER.write(path)
+
+
+def _row_count(value):
+    try:
+        return len(value)
+    except TypeError:
+        return None
+
+
+def traced(name: str = None, rows=None):
+    # Runs the decorated function as a stage, logging to its `logger` argument. rows is the
+    # name of an argument whose len() is the row count, or a callable applied to the result.
+    def decorate(func):
+        signature = inspect.signature(func)
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            arguments = signature.bind_partial(*args, **kwargs).arguments
+            count = _row_count(arguments.get(rows)) if isinstance(rows, str) else None
+            with TRACER.stage(stage_name, logger=arguments.get("logger"), rows=count) as span:
+                result = func(*args, **kwargs)
+                if callable(rows):
+                    span["rows"] = rows(result)
+                return result
+
+        return wrapper
+
+    return decorate
+
+
+@contextlib.contextmanager
+def profile(path: str = None):
+    # cProfile over the block; the stats file opens in snakeviz or `python -m pstats`
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if path:
+            profiler.dump_stats(path)
@@ -0,0 +1,164 @@
+import os
+import ast
+import sys
+import time
+import hashlib
+import logging
+import joblib
+
+CACHE_VERSION = 1
+CACHE_SUFFIX = ".joblib"
+
+
+def _module_path(name: str) -> str:
+    path = getattr(sys.modules.get(name), "__file__", None)
+    return os.path.abspath(path) if path is not None and os.path.exists(path) else None
+
+
+def _imported_names(path: str) -> set:
+    # Every module the file imports, including imports inside functions
+    with open(path, "rb") as f:
+        tree = ast.parse(f.read(), path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.add(node.module)
+    return names
+
+
+def local_sources(paths, root: str) -> list:
+    # The given source files plus, transitively, every module they import from root (the
+    # stage's own directory), whether at the top of a file or inside a function
+    sources, queue = set(), list(paths)
+    while queue:
+        path = queue.pop()
+        if path in sources:
+            continue
+        sources.add(path)
+        for name in _imported_names(path):
+            base = os.path.join(root, *name.split("."))
+            queue += [p for p in (base + ".py", os.path.join(base, "__init__.py")) if os.path.exists(p)]
+    return sorted(sources)
+
+
+def code_version(func, objects=()) -> str:
+    # Hash of the stage's module and every local module it depends on, so edits to the code the
+    # stage runs count, not only edits to the stage's own file. objects are the stage's inputs:
+    # the modules defining their classes (e.g. a geo.GeoFeatures passed in) count as well.
+    path = _module_path(func.__module__)
+    if path is None:
+        return f"{func.__module__}.{func.__qualname__}"
+    root = os.path.dirname(path)
+    paths = {path}
+    for value in objects:
+        value_path = _module_path(type(value).__module__)
+        if value_path is not None and os.path.dirname(value_path) == root:
+            paths.add(value_path)
+    digest = hashlib.sha256()
+    for source in local_sources(paths, root):
+        with open(source, "rb") as f:
+            digest.update(os.path.relpath(source, root).encode() + b"\0" + f.read())
+    return digest.hexdigest()
+
+
+class StageCache:
+    # Stage outputs persisted as <key>.joblib under cache_dir. A read refreshes the file's
+    # mtime, and writes evict least recently used entries beyond max_bytes.
+    def __init__(self, cache_dir: str, logger: logging.Logger, max_bytes: int = None):
+        self.cache_dir = cache_dir
+        self.logger = logger
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + CACHE_SUFFIX)
+
+    def get(self, key: str):
+        # Returns (hit, value)
+        path = self._path(key)
+        if not os.path.exists(path):
+            return False, None
+        try:
+            value = joblib.load(path)
+        except Exception as e:
+            self.logger.warning(f"Discarding unreadable cache entry {path}: {e}")
+            os.remove(path)
+            return False, None
+        os.utime(path)
+        return True, value
+
+    def put(self, key: str, value):
+        path = self._path(key)
+        partial = f"{path}.{os.getpid()}.part"
+        joblib.dump(value, partial)
+        os.replace(partial, path)
+        self.evict()
+
+    def entries(self) -> list:
+        # (mtime, size, path), least recently used first
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(CACHE_SUFFIX):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime, stat.st_size, os.path.join(self.cache_dir, name)))
+        return sorted(entries)
+
+    def evict(self):
+        if self.max_bytes is None:
+            return
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        # The newest entry is always kept, even if it alone exceeds the budget
+        for _, size, path in entries[:-1]:
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            self.logger.info(f"Evicted cache entry {os.path.basename(path)} ({size / 1e6:.1f} MB)")
+
+
+class Pipeline:
+    # Runs stages through a StageCache. A stage's key hashes its name, its code version, its
+    # parameters and its inputs; inputs that are outputs of earlier stages contribute those
+    # stages' keys instead of their contents, so the keys chain like a DAG.
+    def __init__(self, logger: logging.Logger, cache: StageCache = None):
+        self.logger = logger
+        self.cache = cache
+        self._produced = {}
+
+    def _fingerprint(self, value) -> str:
+        if id(value) in self._produced:
+            return self._produced[id(value)][1]
+        if isinstance(value, logging.Logger):
+            return "logger"
+        return joblib.hash(value)
+
+    def stage_key(self, name: str, func, args: tuple, kwargs: dict) -> str:
+        parts = [str(CACHE_VERSION), name, code_version(func, [*args, *kwargs.values()])]
+        parts += [self._fingerprint(arg) for arg in args]
+        parts += [f"{key}={self._fingerprint(kwargs[key])}" for key in sorted(kwargs)]
+        return f"{name}-" + hashlib.sha256("\x1f".join(parts).encode()).hexdigest()[:32]
+
+    def _register(self, value, key: str):
+        # Keep a reference so ids stay unique while the pipeline is alive
+        self._produced[id(value)] = (value, key)
+        if isinstance(value, tuple):
+            for i, item in enumerate(value):
+                self._produced[id(item)] = (item, f"{key}[{i}]")
+
+    def run(self, name: str, func, *args, **kwargs):
+        if self.cache is None:
+            return func(*args, **kwargs)
+        key = self.stage_key(name, func, args, kwargs)
+        hit, value = self.cache.get(key)
+        if hit:
+            self.logger.info(f"Stage '{name}' is cached ({key}), skipping.")
+        else:
+            start = time.perf_counter()
+            value = func(*args, **kwargs)
+            self.cache.put(key, value)
+            self.logger.info(f"Stage '{name}' ran in {time.perf_counter() - start:.2f}s and was cached ({key}).")
+        self._register(value, key)
+        return value
@@ -0,0 +1,196 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+import numpy as np
+
+from forest import ARRAYS
+
+# Multiply-xorshift constants (MurmurHash3's 64-bit finaliser)
+_SEED = np.uint64(0x9E3779B97F4A7C15)
+_MIX_1 = np.uint64(0xFF51AFD7ED558CCD)
+_MIX_2 = np.uint64(0xC4CEB9FE1A85EC53)
+_SHIFT = np.uint64(33)
+
+# SQLite's default limit on bound parameters per statement is 999
+_SQL_CHUNK = 900
+
+
+def row_keys(matrix) -> np.ndarray:
+    # A 64-bit hash of every row's bytes, vectorised over rows: one multiply-xorshift round per
+    # 8 bytes of row. Rows whose bytes differ (even -0.0 vs 0.0) get different keys.
+    matrix = np.ascontiguousarray(matrix)
+    raw = matrix.reshape(len(matrix), -1).view(np.uint8)
+    padding = -raw.shape[1] % 8
+    if padding:
+        raw = np.pad(raw, ((0, 0), (0, padding)))
+    words = raw.view(np.uint64)
+    keys = np.full(len(matrix), _SEED, dtype=np.uint64)
+    for j in range(words.shape[1]):
+        keys ^= words[:, j]
+        keys *= _MIX_1
+        keys ^= keys >> _SHIFT
+    keys *= _MIX_2
+    keys ^= keys >> _SHIFT
+    return keys
+
+
+def model_fingerprint(model) -> str:
+    # Changes whenever the model's predictions may: a compact artifact directory by its files'
+    # names, sizes and mtimes, a FlatForest by its node arrays, anything else by joblib.hash
+    path = getattr(model, "path", None)
+    if isinstance(path, str) and os.path.isdir(path):
+        digest = hashlib.blake2b(digest_size=16)
+        for name in sorted(os.listdir(path)):
+            stat = os.stat(os.path.join(path, name))
+            digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+        return digest.hexdigest()
+    predictor = getattr(model, "best_estimator_", model)
+    if all(hasattr(predictor, name) for name in ARRAYS):
+        digest = hashlib.blake2b(digest_size=16)
+        for name in ARRAYS:
+            digest.update(np.ascontiguousarray(getattr(predictor, name)).data)
+        return digest.hexdigest()
+    import joblib
+
+    return joblib.hash(predictor)
+
+
+class PredictionCache:
+    # Predictions keyed by a hash of the preprocessed row: a bounded in-process LRU with an
+    # optional time-to-live, backed by an optional SQLite file shared across runs and processes.
+    # bind(model) drops everything cached for a different model.
+    def __init__(self, max_entries: int = 100_000, ttl: float = None, path: str = None, logger: logging.Logger = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.logger = logger or logging.getLogger(__name__)
+        self.fingerprint = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                "fingerprint TEXT, key INTEGER, value REAL, expires REAL, PRIMARY KEY (fingerprint, key)"
+                ") WITHOUT ROWID"
+            )
+            self._db.commit()
+
+    def bind(self, model) -> "PredictionCache":
+        fingerprint = model_fingerprint(model)
+        with self._lock:
+            if fingerprint != self.fingerprint:
+                if self.fingerprint is not None:
+                    self.logger.info("Model changed; prediction cache cleared.")
+                self._entries.clear()
+                self.fingerprint = fingerprint
+            if self._db is not None:
+                self._db.execute(
+                    "DELETE FROM predictions WHERE fingerprint != ? OR expires <= ?", (fingerprint, time.time())
+                )
+                self._db.commit()
+        return self
+
+    def get(self, keys: np.ndarray) -> tuple:
+        # Returns (values, found); values are NaN where found is False
+        values = np.full(len(keys), np.nan)
+        found = np.zeros(len(keys), dtype=bool)
+        now = time.time()
+        with self._lock:
+            for i, key in enumerate(keys.tolist()):
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if entry[1] is not None and entry[1] <= now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                values[i], found[i] = entry[0], True
+            if self._db is not None and not found.all():
+                missing = np.flatnonzero(~found)
+                on_disk = self._read_disk(keys[missing], now)
+                for i in missing:
+                    entry = on_disk.get(int(keys[i]))
+                    if entry is not None:
+                        values[i], found[i] = entry[0], True
+                        self._remember(int(keys[i]), *entry)
+            self.hits += int(found.sum())
+            self.misses += int((~found).sum())
+        return values, found
+
+    def put(self, keys: np.ndarray, values: np.ndarray):
+        expires = None if self.ttl is None else time.time() + self.ttl
+        with self._lock:
+            for key, value in zip(keys.tolist(), np.asarray(values, dtype=np.float64).tolist()):
+                self._remember(key, value, expires)
+            if self._db is not None:
+                signed = keys.view(np.int64).tolist()
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?)",
+                    [(self.fingerprint, key, value, expires) for key, value in zip(signed, np.asarray(values).tolist())],
+                )
+                self._db.commit()
+
+    def _remember(self, key: int, value: float, expires: float):
+        self._entries[key] = (value, expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read_disk(self, keys: np.ndarray, now: float) -> dict:
+        # SQLite stores signed 64-bit integers; keys go in as int64 and come back as uint64
+        found = {}
+        signed = keys.view(np.int64).tolist()
+        for start in range(0, len(signed), _SQL_CHUNK):
+            chunk = signed[start:start + _SQL_CHUNK]
+            rows = self._db.execute(
+                "SELECT key, value, expires FROM predictions WHERE fingerprint = ? AND key IN "
+                f"({', '.join('?' * len(chunk))}) AND (expires IS NULL OR expires > ?)",
+                [self.fingerprint, *chunk, now],
+            )
+            for key, value, expires in rows:
+                found[key % 2**64] = (value, expires)
+        return found
+
+    def predict(self, predictor, features) -> np.ndarray:
+        # Only rows not seen before reach the predictor, and each distinct row only once
+        keys = row_keys(np.asarray(features))
+        values, found = self.get(keys)
+        missing = np.flatnonzero(~found)
+        if missing.size:
+            unique_keys, first, inverse = np.unique(keys[missing], return_index=True, return_inverse=True)
+            rows = missing[first]
+            computed = predictor.predict(features.iloc[rows] if hasattr(features, "iloc") else features[rows])
+            values[missing] = computed[inverse.ravel()]
+            self.put(unique_keys, computed)
+        return values
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "entries": len(self._entries),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM predictions")
+                self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
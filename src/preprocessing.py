@@ -0,0 +1,135 @@
+import numpy as np
+
+from features import HOUSING_FEATURES
+
+
+class HousingPreprocessor:
+    # Fit once on the training set, then turn any batch (DataFrame or mapping of
+    # column name -> array) into a C-contiguous matrix with a fixed column layout.
+    # rows= restricts fit/transform to those positional rows, gathered column by column
+    # straight into the output instead of slicing the whole frame first. geo is an optional
+    # geo.GeoFeatures stage, fitted on the training districts and pickled along with the rest.
+    # encoding="codes" replaces the one-hot columns with a single column of category codes
+    # (-1 for unseen categories): fewer, denser columns, but only tree models can split on it.
+    geo = None
+    encoding = "onehot"
+
+    def __init__(
+        self,
+        categorical: str = "ocean_proximity",
+        target: str = "median_house_value",
+        dtype=np.float32,
+        features=HOUSING_FEATURES,
+        geo=None,
+        encoding: str = "onehot",
+    ):
+        self.categorical = categorical
+        self.target = target
+        self.dtype = dtype
+        self.features = features
+        self.geo = geo
+        self.encoding = encoding
+
+    @staticmethod
+    def _column(data, name: str, rows=None) -> np.ndarray:
+        values = np.asarray(data[name])
+        return values if rows is None else values[rows]
+
+    def fit(self, data, medians=None, rows=None):
+        if self.encoding not in ("onehot", "codes"):
+            raise ValueError(f"Unknown encoding '{self.encoding}', expected 'onehot' or 'codes'.")
+        excluded = {self.categorical, self.target, "income_cat"}
+        self.numeric_columns_ = [column for column in data.keys() if column not in excluded]
+        if medians is None:
+            self.medians_ = np.array(
+                [
+                    np.nanmedian(self._column(data, column, rows).astype(np.float64, copy=False))
+                    for column in self.numeric_columns_
+                ]
+            )
+        else:
+            self.medians_ = np.array([medians[column] for column in self.numeric_columns_], dtype=np.float64)
+
+        column = data[self.categorical]
+        if hasattr(column, "cat"):
+            categories = [str(category) for category in column.cat.categories]
+        else:
+            values = self._column(data, self.categorical, rows).astype(object, copy=False)
+            categories = sorted({str(value) for value in values if isinstance(value, str)})
+        self.categories_ = categories
+        self._sorted_categories = np.array(sorted(categories), dtype=str)
+        self._category_codes = np.array([categories.index(c) for c in self._sorted_categories], dtype=np.intp)
+
+        inputs = self.features.inputs + ([] if self.geo is None else self.geo.inputs)
+        missing = [column for column in inputs if column not in self.numeric_columns_]
+        if missing:
+            raise KeyError(f"Columns required by derived features are missing: {missing}")
+        if self.geo is not None:
+            # Same imputed, dtype-cast coordinates that transform() will look up
+            medians = self.medians_.astype(self.dtype)
+            columns = {}
+            for column in self.geo.inputs:
+                values = self._column(data, column, rows).astype(self.dtype, copy=False)
+                columns[column] = np.where(np.isnan(values), medians[self.numeric_columns_.index(column)], values)
+            self.geo.fit(columns, self._column(data, self.target, rows))
+        if self.encoding == "codes":
+            encoded = [self.categorical]
+        else:
+            # drop_first, as pd.get_dummies(..., drop_first=True) did
+            encoded = [f"{self.categorical}_{category}" for category in categories[1:]]
+        self.feature_names_ = (
+            self.numeric_columns_
+            + self.features.names
+            + ([] if self.geo is None else self.geo.names)
+            + encoded
+        )
+        return self
+
+    def _category_codes_of(self, column, rows=None) -> np.ndarray:
+        if hasattr(column, "cat"):
+            codes = column.cat.set_categories(self.categories_).cat.codes.to_numpy()
+            return codes if rows is None else codes[rows]
+        values = np.asarray(column)
+        values = (values if rows is None else values[rows]).astype(str)
+        if self._sorted_categories.size == 0:
+            return np.full(values.shape, -1, dtype=np.intp)
+        position = np.searchsorted(self._sorted_categories, values).clip(max=self._sorted_categories.size - 1)
+        return np.where(self._sorted_categories[position] == values, self._category_codes[position], -1)
+
+    def transform(self, data, rows=None, training: bool = False) -> np.ndarray:
+        # training=True marks the rows the preprocessor was fitted on, in the same order: their
+        # nearest-district prices then leave out the district's own price.
+        n_rows = len(data[self.categorical]) if rows is None else len(rows)
+        n_numeric = len(self.numeric_columns_)
+        out = np.empty((n_rows, len(self.feature_names_)), dtype=self.dtype)
+
+        # Impute each column while it is still contiguous, then derive features from the
+        # same arrays rather than from strided columns of out
+        columns = {}
+        medians = self.medians_.astype(self.dtype)
+        for j, column in enumerate(self.numeric_columns_):
+            values = self._column(data, column, rows).astype(self.dtype, copy=False)
+            missing = np.isnan(values)
+            if missing.any():
+                values = np.where(missing, medians[j], values)
+            out[:, j] = values
+            columns[column] = values
+        offset = n_numeric + len(self.features)
+        self.features.compute(columns, out=out[:, n_numeric:offset])
+        if self.geo is not None:
+            self.geo.compute(columns, out=out[:, offset:offset + len(self.geo)], exclude_self=training)
+            offset += len(self.geo)
+        codes = self._category_codes_of(data[self.categorical], rows)
+        if self.encoding == "codes":
+            out[:, offset] = codes
+            return out
+        out[:, offset:] = 0
+        encoded = np.flatnonzero(codes > 0)
+        out[encoded, offset + codes[encoded] - 1] = 1
+        return out
+
+    def fit_transform(self, data, medians=None, rows=None) -> np.ndarray:
+        return self.fit(data, medians=medians, rows=rows).transform(data, rows=rows, training=True)
+
+    def transform_target(self, data, rows=None) -> np.ndarray:
+        return self._column(data, self.target, rows).astype(np.float64, copy=False)
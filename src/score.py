@@ -1,12 +1,158 @@
-from sklearn.metrics import mean_squared_error
+import os
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
 import numpy as np
 import logging
 import pandas as pd
 
-def evaluate_model(model, test_data: pd.DataFrame, test_labels: pd.Series, logger: logging.Logger):
+from ingest import HOUSING_DTYPES
+from instrument import traced
+
+
+class RunningMetrics:
+    # RMSE / MAE / R^2 accumulated batch by batch (Chan's parallel variance update
+    # for the label spread), so predictions never have to be held all at once.
+    def __init__(self):
+        self.count = 0
+        self.sum_squared_error = 0.0
+        self.sum_absolute_error = 0.0
+        self.label_mean = 0.0
+        self.label_m2 = 0.0
+
+    def update(self, labels, predictions):
+        labels = np.asarray(labels, dtype=np.float64)
+        errors = labels - np.asarray(predictions, dtype=np.float64)
+        n = labels.size
+        if n == 0:
+            return
+        self.sum_squared_error += float(errors @ errors)
+        self.sum_absolute_error += float(np.abs(errors).sum())
+        batch_mean = labels.mean()
+        batch_m2 = float(((labels - batch_mean) ** 2).sum())
+        total = self.count + n
+        delta = batch_mean - self.label_mean
+        self.label_m2 += batch_m2 + delta * delta * self.count * n / total
+        self.label_mean += delta * n / total
+        self.count = total
+
+    def result(self) -> dict:
+        if self.count == 0:
+            return {"rows": 0, "rmse": np.nan, "mae": np.nan, "r2": np.nan}
+        return {
+            "rows": self.count,
+            "rmse": float(np.sqrt(self.sum_squared_error / self.count)),
+            "mae": self.sum_absolute_error / self.count,
+            "r2": 1.0 - self.sum_squared_error / self.label_m2 if self.label_m2 > 0 else np.nan,
+        }
+
+
+def iter_batches(batches, chunk_size: int, target: str = "median_house_value"):
+    # Accepts a DataFrame, an array, a CSV path, an (X, y) tuple, or an iterable of those,
+    # and yields (features, labels or None) pieces of at most chunk_size rows.
+    if isinstance(batches, (pd.DataFrame, np.ndarray, str, tuple)):
+        batches = [batches]
+    for batch in batches:
+        if isinstance(batch, str):
+            with pd.read_csv(batch, dtype=HOUSING_DTYPES, chunksize=chunk_size) as reader:
+                for chunk in reader:
+                    yield chunk, chunk[target] if target in chunk else None
+            continue
+        features, labels = batch if isinstance(batch, tuple) else (batch, None)
+        if labels is None and isinstance(features, pd.DataFrame) and target in features:
+            labels = features[target]
+        labels = None if labels is None else np.asarray(labels)
+        for start in range(0, len(features), chunk_size):
+            stop = start + chunk_size
+            chunk = features.iloc[start:stop] if isinstance(features, pd.DataFrame) else features[start:stop]
+            yield chunk, None if labels is None else labels[start:stop]
+
+
+def effective_n_jobs(n_jobs: int, n_cpus: int = None) -> int:
+    # joblib convention, as train.resolve_worker_layout reads it: -1 means all CPUs, -2 all but one, ...
+    n_cpus = n_cpus or os.cpu_count() or 1
+    return max(1, n_cpus + 1 + n_jobs) if n_jobs < 0 else max(1, n_jobs)
+
+
+@traced(rows=lambda result: result["rows"])
+def score_batches(
+    model,
+    batches,
+    logger: logging.Logger,
+    preprocessor=None,
+    output_path: str = None,
+    chunk_size: int = 50_000,
+    n_jobs: int = 1,
+    cache=None,
+) -> dict:
+    logger.info("Scoring batches...")
+    n_jobs = effective_n_jobs(n_jobs)
+    predictor = getattr(model, "best_estimator_", model)
+    metrics = RunningMetrics()
+    if cache is not None:
+        # A prediction_cache.PredictionCache: rows scored before (by this model) skip the trees
+        cache.bind(model)
+
+    def _predict(features):
+        if preprocessor is not None and not isinstance(features, np.ndarray):
+            features = preprocessor.transform(features)
+        if cache is not None:
+            return cache.predict(predictor, features)
+        return predictor.predict(features)
+
+    output = open(output_path, "w") if output_path else None
+    try:
+        if output:
+            output.write("prediction\n")
+        # Tree traversal releases the GIL, so a thread per chunk scales across cores;
+        # the bounded queue keeps only a few chunks in flight and preserves output order.
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            pending = deque()
+
+            def _drain_one():
+                future, labels = pending.popleft()
+                predictions = future.result()
+                if labels is not None:
+                    metrics.update(labels, predictions)
+                if output:
+                    np.savetxt(output, predictions, fmt="%.6f")
+
+            for features, labels in iter_batches(batches, chunk_size):
+                pending.append((executor.submit(_predict, features), labels))
+                if len(pending) >= 2 * n_jobs:
+                    _drain_one()
+            while pending:
+                _drain_one()
+    finally:
+        if output:
+            output.close()
+
+    result = metrics.result()
+    if cache is not None:
+        result["cache"] = cache.stats()
+    logger.info(f"Batch scoring completed: {result}")
+    return result
+
+
+@traced(rows="test_data")
+def evaluate_model(
+    model,
+    test_data: pd.DataFrame,
+    test_labels: pd.Series,
+    logger: logging.Logger,
+    chunk_size: int = None,
+    predictor=None,
+):
     logger.info("Evaluating model...")
-    predictions = model.best_estimator_.predict(test_data)
-    mse = mean_squared_error(test_labels, predictions)
+    # predictor can replace the fitted forest, e.g. with its FlatForest export
+    if chunk_size is not None:
+        batches = [(test_data, test_labels)]
+        rmse = score_batches(model if predictor is None else predictor, batches, logger, chunk_size=chunk_size)["rmse"]
+        logger.info(f"Model evaluation completed. RMSE: {rmse}")
+        return rmse
+    predictor = model.best_estimator_ if predictor is None else predictor
+    predictions = predictor.predict(test_data)
+    # Plain numpy rather than sklearn.metrics, so scoring never has to import scikit-learn
+    mse = np.mean((np.asarray(test_labels, dtype=np.float64) - predictions) ** 2)
     rmse = np.sqrt(mse)
     logger.info(f"Model evaluation completed. RMSE: {rmse}")
     return rmse
@@ -0,0 +1,333 @@
+import os
+import time
+import shutil
+import socket
+import logging
+import ipaddress
+import tempfile
+import traceback
+import multiprocessing
+from collections import deque
+from multiprocessing.connection import Client, Listener, wait
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import KFold, ParameterSampler
+
+
+class FoldCache:
+    # Fold indices and per-fold train/validation matrices, computed once and then
+    # shared read-only by every search candidate (and every worker process).
+    def __init__(self, data, labels, cv: int = 5, dtype=np.float32, mmap_dir: str = None):
+        data = np.ascontiguousarray(data, dtype=dtype)
+        labels = np.ascontiguousarray(labels, dtype=np.float64)
+        self.splits = list(KFold(n_splits=cv).split(data))
+        self.folds = []
+        for i, (train_index, test_index) in enumerate(self.splits):
+            fold = (data[train_index], labels[train_index], data[test_index], labels[test_index])
+            if mmap_dir is not None:
+                fold = tuple(
+                    self._to_memmap(array, os.path.join(mmap_dir, f"fold{i}_{j}.npy")) for j, array in enumerate(fold)
+                )
+            self.folds.append(fold)
+
+    @staticmethod
+    def _to_memmap(array: np.ndarray, path: str) -> np.ndarray:
+        np.save(path, array)
+        # joblib pickles memmaps by file name, so workers map the same pages
+        return np.load(path, mmap_mode="r")
+
+    @property
+    def n_splits(self) -> int:
+        return len(self.splits)
+
+
+def _fit_and_score(estimator, params: dict, fold: tuple):
+    train_data, train_labels, test_data, test_labels = fold
+    estimator = clone(estimator).set_params(**params)
+    start = time.perf_counter()
+    estimator.fit(train_data, train_labels)
+    fit_time = time.perf_counter() - start
+    start = time.perf_counter()
+    predictions = estimator.predict(test_data)
+    score = -np.mean((test_labels - predictions) ** 2)
+    return score, fit_time, time.perf_counter() - start
+
+
+def build_cv_results(candidates: list, scores: np.ndarray, fit_times: np.ndarray, score_times: np.ndarray) -> dict:
+    # Same layout as sklearn's cv_results_; arrays are (n_candidates, n_splits)
+    mean_scores = scores.mean(axis=1)
+    results = {
+        "params": candidates,
+        "mean_fit_time": fit_times.mean(axis=1),
+        "std_fit_time": fit_times.std(axis=1),
+        "mean_score_time": score_times.mean(axis=1),
+        "std_score_time": score_times.std(axis=1),
+        "mean_test_score": mean_scores,
+        "std_test_score": scores.std(axis=1),
+        "rank_test_score": (np.argsort(np.argsort(-mean_scores, kind="stable")) + 1).astype(np.int32),
+    }
+    for name in candidates[0]:
+        results[f"param_{name}"] = np.ma.MaskedArray([params[name] for params in candidates], dtype=object)
+    for split in range(scores.shape[1]):
+        results[f"split{split}_test_score"] = scores[:, split]
+    return results
+
+
+class CachedRandomSearch:
+    # Drop-in for RandomizedSearchCV(scoring='neg_mean_squared_error'): it samples the same
+    # candidates and KFold splits, but slices the data into folds once instead of per candidate.
+    def __init__(
+        self,
+        estimator,
+        param_distributions: dict,
+        n_iter: int = 20,
+        cv: int = 5,
+        random_state: int = 42,
+        n_jobs: int = 1,
+        mmap_dir: str = None,
+        executor=None,
+    ):
+        self.estimator = estimator
+        self.param_distributions = param_distributions
+        self.n_iter = n_iter
+        self.cv = cv
+        self.random_state = random_state
+        self.n_jobs = n_jobs
+        self.mmap_dir = mmap_dir
+        self.executor = executor
+
+    def fit(self, data, labels):
+        candidates = list(ParameterSampler(self.param_distributions, self.n_iter, random_state=self.random_state))
+        if self.executor is not None:
+            # Workers build their own FoldCache from one copy of the data, then run the tasks
+            n_splits = self.cv
+            tasks = [(params, fold) for params in candidates for fold in range(n_splits)]
+            outputs = self.executor.run(self.estimator, data, labels, self.cv, tasks)
+        else:
+            outputs, n_splits = self._run_local(candidates, data, labels)
+        scores, fit_times, score_times = (
+            np.array(values, dtype=np.float64).reshape(len(candidates), n_splits) for values in zip(*outputs)
+        )
+        self.cv_results_ = build_cv_results(candidates, scores, fit_times, score_times)
+        self.best_index_ = int(np.argmax(self.cv_results_["mean_test_score"]))
+        self.best_params_ = candidates[self.best_index_]
+        self.best_score_ = float(self.cv_results_["mean_test_score"][self.best_index_])
+        self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_)
+        self.best_estimator_.fit(np.ascontiguousarray(data, dtype=np.float32), labels)
+        return self
+
+    def _run_local(self, candidates: list, data, labels) -> tuple:
+        # Memory-map the folds whenever they are shipped to other processes
+        mmap_dir = self.mmap_dir
+        owns_mmap_dir = mmap_dir is None and self.n_jobs != 1
+        if owns_mmap_dir:
+            mmap_dir = tempfile.mkdtemp(prefix="housing_folds_")
+        try:
+            fold_cache = FoldCache(data, labels, cv=self.cv, mmap_dir=mmap_dir)
+            tasks = [(params, fold) for params in candidates for fold in fold_cache.folds]
+            outputs = Parallel(n_jobs=self.n_jobs)(
+                delayed(_fit_and_score)(self.estimator, params, fold) for params, fold in tasks
+            )
+        finally:
+            if owns_mmap_dir:
+                shutil.rmtree(mmap_dir, ignore_errors=True)
+        return outputs, fold_cache.n_splits
+
+
+# Shared secret for the CV worker protocol. Tasks and results are pickled, so anyone holding
+# the key can run code on the other end: the public default is only accepted on loopback, and
+# HOUSING_CV_AUTHKEY (or an explicit authkey) must be set for any other host.
+AUTHKEY_ENV = "HOUSING_CV_AUTHKEY"
+DEFAULT_AUTHKEY = "housing-cv"
+
+
+def _is_loopback(host: str) -> bool:
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+
+def _authkey(authkey=None, host: str = "127.0.0.1") -> bytes:
+    authkey = authkey or os.environ.get(AUTHKEY_ENV)
+    if not authkey:
+        if not _is_loopback(host):
+            raise ValueError(
+                f"Refusing to use the default CV authkey with {host or 'all interfaces'}: "
+                f"set {AUTHKEY_ENV} to a shared secret on the workers and the training host."
+            )
+        authkey = DEFAULT_AUTHKEY
+    return authkey.encode() if isinstance(authkey, str) else authkey
+
+
+def parse_address(address) -> tuple:
+    # "host:port" -> (host, port); tuples pass through
+    if isinstance(address, str):
+        host, _, port = address.rpartition(":")
+        return host or "127.0.0.1", int(port)
+    return tuple(address)
+
+
+def _serve_connection(conn, logger: logging.Logger):
+    # One coordinator session: a "setup" with the estimator and data, then any number of
+    # (candidate, fold) tasks, each answered with its score and timings.
+    estimator, fold_cache = None, None
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            return
+        if message[0] == "setup":
+            estimator, data, labels, cv = message[1:]
+            fold_cache = FoldCache(data, labels, cv=cv)
+            logger.info(f"CV worker received {len(fold_cache.folds)} folds of {len(data)} rows")
+        elif message[0] == "task":
+            task_id, params, fold = message[1:]
+            try:
+                reply = ("result", task_id) + _fit_and_score(estimator, params, fold_cache.folds[fold])
+            except Exception:
+                reply = ("error", task_id, traceback.format_exc())
+            try:
+                conn.send(reply)
+            except OSError:
+                # The coordinator went away (e.g. it stopped on another task's error)
+                return
+        elif message[0] == "close":
+            return
+
+
+def serve_worker(address, authkey=None, logger: logging.Logger = None, ready=None):
+    # Runs a CV worker until killed, serving one coordinator at a time. Bind to port 0 and pass
+    # a connection as ready to be sent the address actually bound.
+    logger = logger or logging.getLogger(__name__)
+    address = parse_address(address)
+    with Listener(address, authkey=_authkey(authkey, address[0])) as listener:
+        logger.info(f"CV worker listening on {listener.address}")
+        if ready is not None:
+            ready.send(listener.address)
+            ready.close()
+        while True:
+            try:
+                conn = listener.accept()
+            except (OSError, multiprocessing.AuthenticationError) as e:
+                logger.warning(f"Rejected CV coordinator connection: {e}")
+                continue
+            with conn:
+                _serve_connection(conn, logger)
+
+
+class SocketExecutor:
+    # Runs CachedRandomSearch tasks on CV workers (serve_worker) over multiprocessing.connection,
+    # on this host or others. The data goes to each worker once, not once per task; results are
+    # collected as they arrive, and the tasks of a worker that dies are handed to the others.
+    def __init__(self, addresses: list, authkey=None, tasks_in_flight: int = 2, logger: logging.Logger = None):
+        self.addresses = [parse_address(address) for address in addresses]
+        self.authkey = authkey
+        for host, _ in self.addresses:
+            # Fails early when a remote worker would be reached with the public default key
+            _authkey(authkey, host)
+        self.tasks_in_flight = tasks_in_flight
+        self.logger = logger or logging.getLogger(__name__)
+
+    def _connect(self) -> list:
+        connections = []
+        for address in self.addresses:
+            try:
+                connections.append(Client(address, authkey=_authkey(self.authkey, address[0])))
+            except (OSError, multiprocessing.AuthenticationError) as e:
+                self.logger.warning(f"Skipping CV worker {address}: {e}")
+        if not connections:
+            raise RuntimeError(f"No CV worker reachable at {self.addresses}.")
+        return connections
+
+    def run(self, estimator, data, labels, cv: int, tasks: list) -> list:
+        data = np.ascontiguousarray(data, dtype=np.float32)
+        labels = np.ascontiguousarray(labels, dtype=np.float64)
+        results = [None] * len(tasks)
+        pending = deque(range(len(tasks)))
+        in_flight = {}
+        connections = self._connect()
+
+        def _lost(conn, error):
+            # Requeue the worker's unfinished tasks at the front, for the next free worker
+            self.logger.warning(f"CV worker lost ({error}); requeueing {len(in_flight[conn])} tasks")
+            pending.extendleft(in_flight.pop(conn))
+            conn.close()
+
+        try:
+            for conn in connections:
+                try:
+                    conn.send(("setup", estimator, data, labels, cv))
+                    in_flight[conn] = []
+                except OSError as e:
+                    self.logger.warning(f"CV worker lost during setup ({e})")
+                    conn.close()
+            remaining = len(tasks)
+            while remaining:
+                for conn in list(in_flight):
+                    while pending and len(in_flight[conn]) < self.tasks_in_flight:
+                        task_id = pending.popleft()
+                        try:
+                            conn.send(("task", task_id) + tuple(tasks[task_id]))
+                        except OSError as e:
+                            pending.appendleft(task_id)
+                            _lost(conn, e)
+                            break
+                        in_flight[conn].append(task_id)
+                # Checked after dispatching too: a failed send can drop the last worker, and
+                # wait([]) would block forever
+                if not in_flight:
+                    raise RuntimeError(f"All CV workers were lost with {remaining} of {len(tasks)} tasks left.")
+                for conn in wait(list(in_flight)):
+                    try:
+                        message = conn.recv()
+                    except (EOFError, OSError) as e:
+                        _lost(conn, e)
+                        continue
+                    if message[0] == "error":
+                        raise RuntimeError(f"CV task {message[1]} failed on a worker:\n{message[2]}")
+                    task_id = message[1]
+                    in_flight[conn].remove(task_id)
+                    if results[task_id] is None:
+                        results[task_id] = message[2:]
+                        remaining -= 1
+        finally:
+            for conn in in_flight:
+                try:
+                    conn.send(("close",))
+                except OSError:
+                    pass
+                conn.close()
+        return results
+
+
+def _start_worker(authkey, ready):
+    serve_worker(("127.0.0.1", 0), authkey=authkey, ready=ready)
+
+
+class LocalCluster:
+    # n CV worker processes on this machine, standing in for nodes; a context manager whose
+    # addresses go straight to SocketExecutor.
+    def __init__(self, n_workers: int, authkey=None):
+        self.n_workers = n_workers
+        self.authkey = authkey
+        self.processes = []
+        self.addresses = []
+
+    def __enter__(self):
+        for _ in range(self.n_workers):
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=_start_worker, args=(self.authkey, sender), daemon=True)
+            process.start()
+            sender.close()
+            self.processes.append(process)
+            self.addresses.append(receiver.recv())
+            receiver.close()
+        return self
+
+    def __exit__(self, *exc):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join()
@@ -0,0 +1,246 @@
+import json
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+
+class LatencyTracker:
+    def __init__(self, window: int = 10_000):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.rows = 0
+
+    def record(self, seconds: float, rows: int):
+        with self._lock:
+            self._samples.append(seconds)
+            self.requests += 1
+            self.rows += rows
+
+    def summary(self) -> dict:
+        with self._lock:
+            samples = np.array(self._samples)
+            requests, rows = self.requests, self.rows
+        if samples.size == 0:
+            return {"requests": requests, "rows": rows, "p50_ms": None, "p99_ms": None}
+        p50, p99 = np.percentile(samples, [50, 99]) * 1000.0
+        return {"requests": requests, "rows": rows, "p50_ms": float(p50), "p99_ms": float(p99)}
+
+
+class _Pending:
+    __slots__ = ("records", "done", "predictions", "error")
+
+    def __init__(self, records: list):
+        self.records = records
+        self.done = threading.Event()
+        self.predictions = None
+        self.error = None
+
+
+class MicroBatcher:
+    # Concurrent requests are queued and scored together: one preprocessing pass and one
+    # vectorised predict per micro-batch, built straight from the JSON records (no DataFrame).
+    def __init__(self, model, preprocessor, max_batch_size: int = 256, max_wait_ms: float = 2.0, cache=None):
+        self.predictor = getattr(model, "best_estimator_", model)
+        self.preprocessor = preprocessor
+        # Optional prediction_cache.PredictionCache for rows the server has already scored
+        self.cache = None if cache is None else cache.bind(model)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.batches = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def predict(self, records: list) -> list:
+        pending = _Pending(records)
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.predictions
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch, rows = [first], len(first.records)
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                pending = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if pending is None:
+                self._queue.put(None)
+                break
+            batch.append(pending)
+            rows += len(pending.records)
+        return batch
+
+    def check(self, records: list) -> str:
+        # The reason records cannot be scored, or None; caught per request so a bad record is
+        # the sender's 400 rather than an error for every request batched with it
+        categorical = self.preprocessor.categorical
+        for i, record in enumerate(records):
+            if not isinstance(record, dict):
+                return f"Record {i} is not a JSON object"
+            for column in self.preprocessor.numeric_columns_:
+                value = record.get(column)
+                if value is None or (isinstance(value, (int, float)) and not isinstance(value, bool)):
+                    continue
+                try:
+                    float(value)
+                except (TypeError, ValueError):
+                    return f"Record {i}: '{column}' must be a number or null, got {json.dumps(value)}"
+            if not isinstance(record.get(categorical) or "", str):
+                return f"Record {i}: '{categorical}' must be a string or null"
+        return None
+
+    def _columns_of(self, records: list) -> dict:
+        nan = float("nan")
+        columns = {
+            column: [nan if (value := record.get(column)) is None else value for record in records]
+            for column in self.preprocessor.numeric_columns_
+        }
+        categorical = self.preprocessor.categorical
+        columns[categorical] = np.array([record.get(categorical) or "" for record in records], dtype=str)
+        return columns
+
+    def _score(self, records: list) -> list:
+        features = self.preprocessor.transform(self._columns_of(records))
+        if self.cache is not None:
+            return self.cache.predict(self.predictor, features).tolist()
+        return self.predictor.predict(features).tolist()
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            try:
+                predictions = self._score([record for pending in batch for record in pending.records])
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0].error = e
+                    batch[0].done.set()
+                    continue
+                # Score each request on its own, so an error stays with the request that caused it
+                for pending in batch:
+                    try:
+                        pending.predictions = self._score(pending.records)
+                    except Exception as error:
+                        pending.error = error
+                    pending.done.set()
+                continue
+            self.batches += 1
+            start = 0
+            for pending in batch:
+                pending.predictions = predictions[start:start + len(pending.records)]
+                start += len(pending.records)
+                pending.done.set()
+
+
+class ScoringRequestHandler(BaseHTTPRequestHandler):
+    server_version = "HousingScoring/0.1"
+    # Keep-alive connections; every response carries a Content-Length
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/metrics":
+            metrics = dict(self.server.latency.summary(), batches=self.server.batcher.batches)
+            if self.server.batcher.cache is not None:
+                metrics["cache"] = self.server.batcher.cache.stats()
+            self._send_json(200, metrics)
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        start = time.perf_counter()
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        except ValueError:
+            self._send_json(400, {"error": "Request body is not valid JSON"})
+            return
+        # Accept a single record, a list of records, or {"records": [...]}
+        single = isinstance(payload, dict) and "records" not in payload
+        records = [payload] if single else payload["records"] if isinstance(payload, dict) else payload
+        if not isinstance(records, list):
+            self._send_json(400, {"error": "Expected a JSON object or a list of objects"})
+            return
+        error = self.server.batcher.check(records)
+        if error is not None:
+            self._send_json(400, {"error": error})
+            return
+        try:
+            predictions = self.server.batcher.predict(records) if records else []
+        except Exception as e:
+            self.server.logger.exception("Prediction failed")
+            self._send_json(500, {"error": str(e)})
+            return
+        self._send_json(200, {"prediction": predictions[0]} if single else {"predictions": predictions})
+        self.server.latency.record(time.perf_counter() - start, len(records))
+
+    def log_message(self, format, *args):
+        self.server.logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class ScoringServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address,
+        model,
+        preprocessor,
+        logger: logging.Logger,
+        max_batch_size: int = 256,
+        max_wait_ms: float = 2.0,
+        cache=None,
+    ):
+        super().__init__(address, ScoringRequestHandler)
+        self.logger = logger
+        self.latency = LatencyTracker()
+        self.batcher = MicroBatcher(
+            model, preprocessor, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms, cache=cache
+        )
+
+    def server_close(self):
+        super().server_close()
+        self.batcher.close()
+        self.logger.info(f"Scoring server stopped: {self.latency.summary()}")
+
+
+def serve(model, preprocessor, logger: logging.Logger, host: str = "127.0.0.1", port: int = 8080, **batch_kwargs):
+    server = ScoringServer((host, port), model, preprocessor, logger, **batch_kwargs)
+    logger.info(f"Scoring server listening on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -1,11 +1,51 @@
+import os
+import copy
+import time
+import shutil
+import tempfile
+import joblib
 import pandas as pd
 import numpy as np
-from sklearn.impute import SimpleImputer
-from sklearn.model_selection import StratifiedShuffleSplit, RandomizedSearchCV
+from joblib import Parallel, delayed, parallel_config
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedShuffleSplit, RandomizedSearchCV, GridSearchCV, cross_validate
 from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.tree import DecisionTreeRegressor
 from scipy.stats import randint
 import logging
 
+from preprocessing import HousingPreprocessor
+from instrument import traced
+from search import build_cv_results
+
+# Upper edges of the income strata, as pd.cut(bins=[0.0, 1.5, 3.0, 4.5, 6.0, inf]) used them
+INCOME_BINS = np.array([1.5, 3.0, 4.5, 6.0])
+
+
+def income_category(median_income) -> np.ndarray:
+    # Stratum codes 0-4 (right-inclusive bins, like pd.cut); missing incomes get stratum 5
+    values = np.asarray(median_income, dtype=np.float64)
+    return np.where(np.isnan(values), len(INCOME_BINS) + 1, np.digitize(values, INCOME_BINS, right=True))
+
+
+@traced(rows="housing")
+def split_indices(housing, logger: logging.Logger, test_size: float = 0.2, random_state: int = 42, dtype=np.intp):
+    # Same stratified split as prepare_data, as positional row indices: nothing is copied
+    # and the input is left untouched. Pass the indices as rows= to the preprocessor so
+    # each training matrix is gathered straight from the source columns, once.
+    # dtype=np.int32 halves the index arrays (for inputs under 2**31 rows).
+    logger.info("Splitting data by index...")
+    income_cat = income_category(housing["median_income"])
+    if len(income_cat) > np.iinfo(dtype).max:
+        raise ValueError(f"{len(income_cat)} rows cannot be indexed with {np.dtype(dtype).name}.")
+    split = StratifiedShuffleSplit(n_splits=1, test_size=test_size, random_state=random_state)
+    train_index, test_index = next(split.split(np.empty((len(income_cat), 0)), income_cat))
+    logger.info(f"Split {len(train_index)} training and {len(test_index)} test rows.")
+    return train_index.astype(dtype, copy=False), test_index.astype(dtype, copy=False)
+
+
+@traced(rows="housing")
 def prepare_data(housing: pd.DataFrame, logger: logging.Logger):
     logger.info("Preparing data...")
     housing["income_cat"] = pd.cut(
@@ -31,39 +71,584 @@ def prepare_data(housing: pd.DataFrame, logger: logging.Logger):
     return strat_train_set, strat_test_set
 
 
-def preprocess_data(data: pd.DataFrame, logger: logging.Logger) -> (pd.DataFrame, pd.Series):
-    logger.info("Preprocessing data...")
-    data_num = data.drop(["ocean_proximity", "median_house_value"], axis=1)
-    imputer = SimpleImputer(strategy="median")
-    imputer.fit(data_num)
-    data_prepared = pd.DataFrame(imputer.transform(data_num), columns=data_num.columns, index=data.index)
+def stream_split(chunks, logger: logging.Logger, test_size: float = 0.2, random_state: int = 42):
+    logger.info("Preparing data in streaming mode...")
+    rng = np.random.default_rng(random_state)
+    seen = {}
+    assigned_test = {}
+    for chunk in chunks:
+        income_cat = pd.cut(
+            chunk["median_income"],
+            bins=[0.0, 1.5, 3.0, 4.5, 6.0, np.inf],
+            labels=[1, 2, 3, 4, 5],
+        ).cat.codes.to_numpy()
+        is_test = np.zeros(len(chunk), dtype=bool)
+        for category in np.unique(income_cat):
+            rows = np.flatnonzero(income_cat == category)
+            # Keep the running test share of every stratum at test_size, one chunk at a time
+            seen[category] = seen.get(category, 0) + len(rows)
+            n_test = int(round(seen[category] * test_size)) - assigned_test.get(category, 0)
+            assigned_test[category] = assigned_test.get(category, 0) + n_test
+            is_test[rng.permutation(rows)[:n_test]] = True
+        yield chunk[~is_test], chunk[is_test]
+    logger.info("Streaming data preparation completed.")
+
+
+class QuantileSketch:
+    # Mergeable compactor sketch: level i holds samples that each stand for 2**i values,
+    # so memory stays around k * log2(n / k) whatever the stream length.
+    def __init__(self, k: int = 4096, random_state: int = 42):
+        self.k = k
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(random_state)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self.count += values.size
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: "QuantileSketch"):
+        self.count += other.count
+        for level, values in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], values])
+        self._compress()
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            values = self.levels[level]
+            if values.size >= 2 * self.k:
+                values = np.sort(values)
+                n_pairs = values.size // 2
+                kept = values[self._rng.integers(2):2 * n_pairs:2]
+                self.levels[level] = values[2 * n_pairs:]
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], kept])
+            level += 1
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return np.nan
+        if len(self.levels) == 1 or all(values.size == 0 for values in self.levels[1:]):
+            # Nothing has been compacted yet, so the answer is exact
+            return float(np.quantile(self.levels[0], q))
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(v.size, 2.0 ** level) for level, v in enumerate(self.levels)])
+        order = np.argsort(values)
+        cumulative = np.cumsum(weights[order])
+        position = np.searchsorted(cumulative, q * cumulative[-1])
+        return float(values[order][min(position, values.size - 1)])
+
+
+def compute_imputation_medians(chunks, logger: logging.Logger, k: int = 4096) -> pd.Series:
+    logger.info("Computing imputation medians from streamed chunks...")
+    sketches = {}
+    for chunk in chunks:
+        data_num = chunk.drop(["ocean_proximity", "median_house_value"], axis=1)
+        for column in data_num.columns:
+            sketches.setdefault(column, QuantileSketch(k=k)).update(data_num[column].to_numpy())
+    medians = pd.Series({column: sketch.quantile(0.5) for column, sketch in sketches.items()})
+    logger.info("Imputation medians computed.")
+    return medians
+
+
+def stream_training_data(
+    read_chunks, logger: logging.Logger, encoding: str = "onehot", test_size: float = 0.2, random_state: int = 42
+):
+    # Chunked stand-in for load + split_indices + fit_preprocessor + transform when the raw table
+    # should never be held whole. read_chunks() returns a fresh iterator of DataFrame chunks
+    # (ingest.iter_housing_chunks) and is read twice with the same streamed split: once for the
+    # sketch medians and categories of the training rows, once to turn each chunk into feature
+    # matrices. Only the float32 matrices and one raw chunk are in memory at a time.
+    categories = set()
+    columns = []
+
+    def training_parts():
+        for train_part, _ in stream_split(read_chunks(), logger, test_size=test_size, random_state=random_state):
+            categories.update(train_part["ocean_proximity"].dropna().astype(str))
+            columns[:] = train_part.columns
+            yield train_part
+
+    medians = compute_imputation_medians(training_parts(), logger)
+    # An empty frame carrying every training category is all fit() needs once medians are given
+    template = pd.DataFrame({column: np.empty(0, dtype=np.float32) for column in columns})
+    template["ocean_proximity"] = pd.Categorical([], categories=sorted(categories))
+    preprocessor = fit_preprocessor(template, logger, medians=medians, encoding=encoding)
+
+    parts = {"train_data": [], "train_labels": [], "test_data": [], "test_labels": []}
+    for train_part, test_part in stream_split(read_chunks(), logger, test_size=test_size, random_state=random_state):
+        parts["train_data"].append(preprocessor.transform(train_part))
+        parts["train_labels"].append(preprocessor.transform_target(train_part))
+        parts["test_data"].append(preprocessor.transform(test_part))
+        parts["test_labels"].append(preprocessor.transform_target(test_part))
+    logger.info(f"Streamed {sum(map(len, parts['train_labels']))} training and {sum(map(len, parts['test_labels']))} test rows.")
+    train_data, train_labels, test_data, test_labels = (np.concatenate(parts[name]) for name in parts)
+    # The CSV is in geographic order and cv=5 folds are unshuffled: without this the search
+    # would cross-validate on blocks of the map
+    order = np.random.default_rng(random_state).permutation(len(train_labels))
+    return preprocessor, train_data[order], train_labels[order], test_data, test_labels
 
-    data_prepared["rooms_per_household"] = data_prepared["total_rooms"] / data_prepared["households"]
-    data_prepared["bedrooms_per_room"] = data_prepared["total_bedrooms"] / data_prepared["total_rooms"]
-    data_prepared["population_per_household"] = data_prepared["population"] / data_prepared["households"]
 
-    data_cat = pd.get_dummies(data[["ocean_proximity"]], drop_first=True)
+@traced(rows="data")
+def fit_preprocessor(
+    data: pd.DataFrame,
+    logger: logging.Logger,
+    medians: pd.Series = None,
+    rows: np.ndarray = None,
+    geo=None,
+    encoding: str = "onehot",
+) -> HousingPreprocessor:
+    logger.info("Fitting preprocessor...")
+    preprocessor = HousingPreprocessor(geo=geo, encoding=encoding).fit(data, medians=medians, rows=rows)
+    logger.info(f"Preprocessor fitted with {len(preprocessor.feature_names_)} features.")
+    return preprocessor
+
+
+def preprocess_data(
+    data: pd.DataFrame, logger: logging.Logger, medians: pd.Series = None, preprocessor: HousingPreprocessor = None
+) -> (pd.DataFrame, pd.Series):
+    logger.info("Preprocessing data...")
+    if preprocessor is None:
+        preprocessor = HousingPreprocessor().fit(data, medians=medians)
+    data_prepared = pd.DataFrame(preprocessor.transform(data), columns=preprocessor.feature_names_, index=data.index)
     logger.info("Preprocessing completed.")
-    return data_prepared.join(data_cat), data["median_house_value"].copy()
+    return data_prepared, data["median_house_value"].copy()
+
+
+def resolve_worker_layout(n_jobs: int, estimator_n_jobs: int, logger: logging.Logger, n_cpus: int = None) -> (int, int):
+    n_cpus = n_cpus or os.cpu_count() or 1
+
+    def _effective(jobs):
+        # joblib convention: -1 means all CPUs, -2 all but one, ...
+        return max(1, n_cpus + 1 + jobs) if jobs < 0 else max(1, jobs)
+
+    search_jobs, forest_jobs = min(_effective(n_jobs), n_cpus), _effective(estimator_n_jobs)
+    if search_jobs * forest_jobs > n_cpus:
+        capped = max(1, n_cpus // search_jobs)
+        logger.warning(
+            f"{search_jobs} search workers x {forest_jobs} forest jobs oversubscribes {n_cpus} CPUs; "
+            f"capping forest jobs at {capped}."
+        )
+        forest_jobs = capped
+    return search_jobs, forest_jobs
+
+
+def build_search(strategy: str, estimator, n_jobs: int, resource: str = "n_estimators", executor=None):
+    if strategy == "random":
+        param_distribs = {
+            'n_estimators': randint(low=1, high=200),
+            'max_features': randint(low=1, high=8),
+        }
+        return RandomizedSearchCV(
+            estimator,
+            param_distributions=param_distribs,
+            n_iter=20,
+            cv=5,
+            scoring='neg_mean_squared_error',
+            random_state=42,
+            n_jobs=n_jobs,
+        )
+
+    if strategy == "cached":
+        from search import CachedRandomSearch
 
+        param_distribs = {
+            'n_estimators': randint(low=1, high=200),
+            'max_features': randint(low=1, high=8),
+        }
+        return CachedRandomSearch(
+            estimator,
+            param_distributions=param_distribs,
+            n_iter=20,
+            cv=5,
+            random_state=42,
+            n_jobs=n_jobs,
+            executor=executor,
+        )
 
-def train_model(data: pd.DataFrame, labels: pd.Series, logger: logging.Logger):
+    if strategy == "halving":
+        from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+        from sklearn.model_selection import HalvingRandomSearchCV
+
+        if resource == "n_estimators":
+            # Trees are the budget: 20 candidates get 22 trees, then 7 get 66 and 3 get 198.
+            # min_resources is chosen so that factor=3 lands the last round on max_resources.
+            param_distribs = {'max_features': randint(low=1, high=8)}
+            budget = {'resource': 'n_estimators', 'min_resources': 22, 'max_resources': 199}
+        elif resource == "n_samples":
+            param_distribs = {
+                'n_estimators': randint(low=1, high=200),
+                'max_features': randint(low=1, high=8),
+            }
+            budget = {'resource': 'n_samples', 'min_resources': 'exhaust'}
+        else:
+            raise ValueError(f"Unknown halving resource '{resource}', expected 'n_estimators' or 'n_samples'.")
+        return HalvingRandomSearchCV(
+            estimator,
+            param_distributions=param_distribs,
+            n_candidates=20,
+            factor=3,
+            cv=5,
+            scoring='neg_mean_squared_error',
+            random_state=42,
+            n_jobs=n_jobs,
+            **budget,
+        )
+
+    if strategy == "bayes":
+        try:
+            from skopt import BayesSearchCV
+            from skopt.space import Integer
+        except ImportError as e:
+            raise ImportError("The 'bayes' search strategy requires scikit-optimize (pip install scikit-optimize).") from e
+        return BayesSearchCV(
+            estimator,
+            search_spaces={'n_estimators': Integer(1, 199), 'max_features': Integer(1, 7)},
+            n_iter=20,
+            cv=5,
+            scoring='neg_mean_squared_error',
+            random_state=42,
+            n_jobs=n_jobs,
+        )
+
+    raise ValueError(f"Unknown search strategy '{strategy}', expected 'random', 'cached', 'halving' or 'bayes'.")
+
+
+@traced(rows="data")
+def train_model(
+    data: pd.DataFrame,
+    labels: pd.Series,
+    logger: logging.Logger,
+    n_jobs: int = 1,
+    estimator_n_jobs: int = 1,
+    backend: str = "loky",
+    search: str = "random",
+    resource: str = "n_estimators",
+    zoo=None,
+    cv_workers: list = None,
+):
+    if zoo is not None:
+        return train_model_zoo(
+            data, labels, logger, zoo=zoo, n_jobs=n_jobs, estimator_n_jobs=estimator_n_jobs, backend=backend
+        )
     logger.info("Training model...")
-    param_distribs = {
-        'n_estimators': randint(low=1, high=200),
-        'max_features': randint(low=1, high=8),
-    }
+    search_jobs, forest_jobs = resolve_worker_layout(n_jobs, estimator_n_jobs, logger)
+    logger.info(f"Worker layout: backend={backend}, search n_jobs={search_jobs}, forest n_jobs={forest_jobs}")
 
-    forest_reg = RandomForestRegressor(random_state=42)
-    rnd_search = RandomizedSearchCV(
-        forest_reg,
-        param_distributions=param_distribs,
-        n_iter=20,
-        cv=5,
-        scoring='neg_mean_squared_error',
-        random_state=42,
-    )
+    executor = None
+    if cv_workers:
+        # (candidate, fold) tasks go to CV worker processes, on this host or others
+        if search != "cached":
+            raise ValueError(f"cv_workers needs the 'cached' search strategy, got '{search}'.")
+        from search import SocketExecutor
+
+        executor = SocketExecutor(cv_workers, logger=logger)
+        logger.info(f"CV workers: {', '.join(map(str, cv_workers))}")
 
-    rnd_search.fit(data, labels)
+    forest_reg = RandomForestRegressor(random_state=42, n_jobs=forest_jobs)
+    rnd_search = build_search(search, forest_reg, search_jobs, resource=resource, executor=executor)
+    logger.info(f"Search strategy: {search}")
+
+    with parallel_config(backend=backend):
+        rnd_search.fit(data, labels)
     logger.info("Model training completed.")
     return rnd_search
+
+
+# Grid nonstandardcode.py searched: 3x4 combinations, then 2x3 without bootstrap
+FOREST_PARAM_GRID = [
+    {'n_estimators': [3, 10, 30], 'max_features': [2, 4, 6, 8]},
+    {'bootstrap': [False], 'n_estimators': [3, 10], 'max_features': [2, 3, 4]},
+]
+
+# Model zoo specs: (name, estimator, search), where search is None for an estimator scored by plain
+# cross-validation, a build_search strategy, or a parameter grid searched exhaustively. These are
+# the models nonstandardcode.py compares.
+DEFAULT_ZOO = (
+    ("linear", LinearRegression(), None),
+    ("tree", DecisionTreeRegressor(random_state=42), None),
+    ("forest_random", RandomForestRegressor(random_state=42), "random"),
+    ("forest_grid", RandomForestRegressor(random_state=42), FOREST_PARAM_GRID),
+)
+
+
+def resolve_zoo(zoo) -> list:
+    # Specs may be given whole or by their name in DEFAULT_ZOO
+    known = {spec[0]: spec for spec in DEFAULT_ZOO}
+    specs = []
+    for spec in zoo or DEFAULT_ZOO:
+        if isinstance(spec, str):
+            if spec not in known:
+                raise ValueError(f"Unknown zoo model '{spec}', expected one of {sorted(known)}.")
+            spec = known[spec]
+        specs.append(tuple(spec))
+    names = [spec[0] for spec in specs]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Zoo model names must be unique, got {names}.")
+    return specs
+
+
+# Estimators that split on one feature at a time, so an ordinal column of category codes
+# separates the categories as well as one-hot columns do
+TREE_MODELS = (DecisionTreeRegressor, RandomForestRegressor)
+
+
+def supports_category_codes(zoo=None) -> bool:
+    # Whether every model train_model would fit (the forest search, or each zoo model) is a tree model
+    if zoo is None:
+        return True
+    return all(isinstance(spec[1], TREE_MODELS) for spec in resolve_zoo(zoo))
+
+
+def _share(array: np.ndarray, path: str) -> np.ndarray:
+    np.save(path, array)
+    # joblib pickles memmaps by file name, so every worker maps the same pages
+    return np.load(path, mmap_mode="r")
+
+
+def _fit_zoo_model(name: str, estimator, search: str, data, labels, estimator_n_jobs: int) -> dict:
+    start = time.perf_counter()
+    estimator = clone(estimator)
+    if "n_jobs" in estimator.get_params():
+        estimator.set_params(n_jobs=estimator_n_jobs)
+    if search is None:
+        folds = cross_validate(estimator, data, labels, cv=5, scoring="neg_mean_squared_error")
+        cv_results = build_cv_results(
+            [{}], folds["test_score"][None, :], folds["fit_time"][None, :], folds["score_time"][None, :]
+        )
+        model, best_index, best_params = estimator.fit(data, labels), 0, {}
+    else:
+        # The pool already runs one model per worker; the search itself stays sequential
+        if isinstance(search, str):
+            search = build_search(search, estimator, n_jobs=1)
+        else:
+            search = GridSearchCV(estimator, search, cv=5, scoring='neg_mean_squared_error', n_jobs=1)
+        search.fit(data, labels)
+        cv_results, best_index, best_params = search.cv_results_, search.best_index_, search.best_params_
+        model = search.best_estimator_
+    return {
+        "name": name,
+        "model": model,
+        "best_params": best_params,
+        "cv_results": cv_results,
+        "best_index": best_index,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+class ModelZoo:
+    # Several models trained on one feature matrix. Exposes the winner through the same contract
+    # as a fitted search (best_estimator_, best_params_, best_score_, cv_results_), so scoring,
+    # saving and export work unchanged; leaderboard_ ranks every model by CV RMSE.
+    def __init__(self, results: list):
+        rows = []
+        for result in results:
+            cv_results, best = result["cv_results"], result["best_index"]
+            fold_scores = [cv_results[key][best] for key in cv_results if key.startswith("split") and key.endswith("_test_score")]
+            fold_rmse = np.sqrt(-np.array(fold_scores, dtype=np.float64))
+            rows.append({
+                "model": result["name"],
+                "cv_rmse": float(np.sqrt(-cv_results["mean_test_score"][best])),
+                "cv_rmse_std": float(fold_rmse.std()),
+                "candidates": len(cv_results["params"]),
+                "seconds": result["seconds"],
+                "params": result["best_params"],
+            })
+        self.leaderboard_ = pd.DataFrame(rows).sort_values("cv_rmse", kind="stable").reset_index(drop=True)
+        self.leaderboard_.index += 1
+        self.leaderboard_.index.name = "rank"
+        self.models_ = {result["name"]: result["model"] for result in results}
+        winner = next(result for result in results if result["name"] == self.leaderboard_["model"].iloc[0])
+        self.best_name_ = winner["name"]
+        self.best_estimator_ = winner["model"]
+        self.best_params_ = winner["best_params"]
+        self.best_index_ = winner["best_index"]
+        self.cv_results_ = winner["cv_results"]
+        self.best_score_ = float(self.cv_results_["mean_test_score"][self.best_index_])
+
+
+@traced(rows="data")
+def train_model_zoo(
+    data,
+    labels,
+    logger: logging.Logger,
+    zoo=None,
+    n_jobs: int = -1,
+    estimator_n_jobs: int = 1,
+    backend: str = "loky",
+    mmap_dir: str = None,
+) -> ModelZoo:
+    # Trains every model of the zoo concurrently, one per worker, on a single prepared matrix.
+    # With a process backend the matrix is memory-mapped once and shared by all workers, so the
+    # wall time is roughly that of the slowest model rather than the sum.
+    specs = resolve_zoo(zoo)
+    logger.info(f"Training model zoo: {', '.join(spec[0] for spec in specs)}")
+    pool_jobs, forest_jobs = resolve_worker_layout(n_jobs, estimator_n_jobs, logger)
+    pool_jobs = min(pool_jobs, len(specs))
+    logger.info(f"Worker layout: backend={backend}, zoo n_jobs={pool_jobs}, estimator n_jobs={forest_jobs}")
+
+    data = np.ascontiguousarray(data, dtype=np.float32)
+    labels = np.ascontiguousarray(labels, dtype=np.float64)
+    owns_mmap_dir = mmap_dir is None and pool_jobs > 1 and backend != "threading"
+    if owns_mmap_dir:
+        mmap_dir = tempfile.mkdtemp(prefix="housing_zoo_")
+    try:
+        if mmap_dir is not None:
+            data = _share(data, os.path.join(mmap_dir, "data.npy"))
+            labels = _share(labels, os.path.join(mmap_dir, "labels.npy"))
+        # Slowest models first, so they never queue behind the quick ones
+        order = sorted(range(len(specs)), key=lambda i: specs[i][2] is None)
+        results = Parallel(n_jobs=pool_jobs, backend=backend)(
+            delayed(_fit_zoo_model)(*specs[i], data, labels, forest_jobs) for i in order
+        )
+    finally:
+        if owns_mmap_dir:
+            shutil.rmtree(mmap_dir, ignore_errors=True)
+
+    zoo_model = ModelZoo(sorted(results, key=lambda result: [spec[0] for spec in specs].index(result["name"])))
+    for rank, row in zoo_model.leaderboard_.iterrows():
+        logger.info(f"#{rank} {row['model']}: CV RMSE {row['cv_rmse']:.1f} (+/- {row['cv_rmse_std']:.1f}) in {row['seconds']:.1f}s")
+    logger.info(f"Model zoo completed; best model: {zoo_model.best_name_}")
+    return zoo_model
+
+
+@traced()
+def save_model(model, path: str, logger: logging.Logger, preprocessor: HousingPreprocessor = None):
+    logger.info(f"Saving model to {path}...")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    joblib.dump({"model": model, "preprocessor": preprocessor}, path)
+
+
+@traced()
+def load_model(path: str, logger: logging.Logger):
+    logger.info(f"Loading model from {path}...")
+    bundle = joblib.load(path)
+    return bundle["model"], bundle["preprocessor"]
+
+
+class IncrementalModel:
+    # Same contract as a fitted search (best_estimator_, best_params_, cv_results_)
+    # for a forest that was grown from a previous run (or another model refitted with the
+    # previous run's hyperparameters) instead of searched again.
+    def __init__(self, best_estimator_, best_params_, best_score_, cv_results_, drift_, mode_):
+        self.best_estimator_ = best_estimator_
+        self.best_params_ = best_params_
+        self.best_score_ = best_score_
+        self.cv_results_ = cv_results_
+        self.drift_ = drift_
+        self.mode_ = mode_
+
+
+def measure_drift(model, data, labels) -> float:
+    # Relative RMSE increase of the previous model on the new data over its own CV RMSE
+    predictions = model.best_estimator_.predict(data)
+    rmse = np.sqrt(np.mean((np.asarray(labels, dtype=np.float64) - predictions) ** 2))
+    return rmse / np.sqrt(-model.best_score_) - 1.0
+
+
+@traced(rows="data")
+def train_incremental(
+    previous_model,
+    data,
+    labels,
+    logger: logging.Logger,
+    new_trees: int = 20,
+    drift_threshold: float = 0.1,
+    history: tuple = None,
+    **train_kwargs,
+):
+    # data/labels are the new rows only, none of which the previous model was trained on (its
+    # in-sample error is far below its CV RMSE, so old rows would hide any drift). history is
+    # the previous training data, which a full refit trains on together with the new rows.
+    logger.info("Training model incrementally...")
+    drift = measure_drift(previous_model, data, labels)
+    logger.info(f"Drift against previous model: {drift:.4f} (threshold {drift_threshold})")
+
+    if drift > drift_threshold:
+        logger.info("Drift above threshold, running a full search.")
+        if history is not None:
+            data = np.concatenate([np.asarray(history[0]), np.asarray(data)])
+            labels = np.concatenate([np.asarray(history[1]), np.asarray(labels)])
+        model = train_model(data, labels, logger, **train_kwargs)
+        model.drift_, model.mode_ = drift, "refit"
+        return model
+
+    estimator = previous_model.best_estimator_
+    params = estimator.get_params()
+    if "warm_start" not in params or "n_estimators" not in params:
+        # e.g. a --zoo winner that is a single tree or a linear model: nothing to grow
+        if history is None:
+            raise ValueError(
+                f"The previous model ({type(estimator).__name__}) cannot be warm-started with more trees, "
+                "and without its training data it cannot be refitted either."
+            )
+        logger.warning(
+            f"The previous model ({type(estimator).__name__}) cannot be warm-started with more trees; "
+            "refitting it with the same hyperparameters on the previous and new rows."
+        )
+        data = np.concatenate([np.asarray(history[0]), np.asarray(data)])
+        labels = np.concatenate([np.asarray(history[1]), np.asarray(labels)])
+        refitted = clone(estimator).fit(data, labels)
+        return IncrementalModel(
+            refitted, previous_model.best_params_, previous_model.best_score_, previous_model.cv_results_, drift, "refit"
+        )
+
+    # Small drift: keep the previous hyperparameters and grow extra trees on the delta only
+    forest = copy.deepcopy(estimator)
+    forest.set_params(warm_start=True, n_estimators=forest.n_estimators + new_trees)
+    forest.fit(data, labels)
+    forest.set_params(warm_start=False)
+    best_params = dict(previous_model.best_params_, n_estimators=forest.n_estimators)
+    logger.info(f"Grew forest to {forest.n_estimators} trees with warm start.")
+    return IncrementalModel(
+        forest, best_params, previous_model.best_score_, previous_model.cv_results_, drift, "warm_start"
+    )
+
+
+def _rmse(estimator, data, labels) -> float:
+    return float(np.sqrt(np.mean((np.asarray(labels, dtype=np.float64) - estimator.predict(data)) ** 2)))
+
+
+@traced(rows="train_index")
+def check_compact_accuracy(model, preprocessor: HousingPreprocessor, housing, train_index, test_index, logger: logging.Logger) -> dict:
+    # Accuracy check for compact mode: refits the winning estimator, hyperparameters and all, on
+    # float64 one-hot features of the same rows and compares test RMSE. Bytes count the training
+    # and test matrices plus their row indices in each layout.
+    logger.info("Checking compact mode against float64...")
+    reference = HousingPreprocessor(
+        categorical=preprocessor.categorical,
+        target=preprocessor.target,
+        dtype=np.float64,
+        features=preprocessor.features,
+        geo=copy.deepcopy(preprocessor.geo),
+    ).fit(housing, medians=dict(zip(preprocessor.numeric_columns_, preprocessor.medians_)), rows=train_index)
+    train_labels = preprocessor.transform_target(housing, rows=train_index)
+    test_labels = preprocessor.transform_target(housing, rows=test_index)
+
+    compact_train = preprocessor.transform(housing, rows=train_index, training=True)
+    compact_test = preprocessor.transform(housing, rows=test_index)
+    reference_train = reference.transform(housing, rows=train_index, training=True)
+    reference_test = reference.transform(housing, rows=test_index)
+    reference_estimator = clone(model.best_estimator_).fit(reference_train, train_labels)
+
+    n_indices = len(train_index) + len(test_index)
+    result = {
+        "compact_rmse": _rmse(model.best_estimator_, compact_test, test_labels),
+        "reference_rmse": _rmse(reference_estimator, reference_test, test_labels),
+        "compact_bytes": compact_train.nbytes + compact_test.nbytes + n_indices * np.asarray(train_index).itemsize,
+        "reference_bytes": reference_train.nbytes + reference_test.nbytes + n_indices * np.dtype(np.intp).itemsize,
+    }
+    result["rmse_delta"] = result["compact_rmse"] - result["reference_rmse"]
+    result["relative_rmse_delta"] = result["rmse_delta"] / result["reference_rmse"]
+    logger.info(
+        f"Compact RMSE {result['compact_rmse']:.1f} vs float64 {result['reference_rmse']:.1f} "
+        f"(delta {result['rmse_delta']:+.1f}, {result['relative_rmse_delta']:+.2%}); "
+        f"features {result['compact_bytes'] / 1e6:.2f} MB vs {result['reference_bytes'] / 1e6:.2f} MB"
+    )
+    return result
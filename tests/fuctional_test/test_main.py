@@ -1,6 +1,5 @@
 import os
 import shutil
-import argparse
 import subprocess
 
 import sys
@@ -9,7 +8,7 @@ parent_dir = os.path.dirname(os.path.dirname(current_dir))
 src_dir = os.path.join(parent_dir, "notebooks")
 sys.path.append(src_dir)
 
-def test_housing_pipeline():
+def run_housing_pipeline(extra_args=()):
     # Define test arguments
     housing_url = "https://raw.githubusercontent.com/ageron/handson-ml/master/datasets/housing/housing.tgz"
     housing_path = "C:/Users/vidya.yedurumane/Desktop/mle-training/datasets/housing"
@@ -28,15 +27,15 @@ def test_housing_pipeline():
     # Run the main pipeline script
     try:
         # Simulate command-line arguments
-        parser = argparse.ArgumentParser()
-        parser.add_argument("--housing_url", default=housing_url)
-        parser.add_argument("--housing_path", default=housing_path)
-        parser.add_argument("--output_dir", default=output_dir)
-        parser.add_argument("--log_level", default="INFO")
-        args = parser.parse_args([])  
+        import main
+        args = main.build_parser().parse_args([
+            "--housing_url", housing_url,
+            "--housing_path", housing_path,
+            "--output_dir", output_dir,
+            *extra_args,
+        ])
 
         # Execute the pipeline
-        import main  
         main.main(args)
 
         # Check if log file exists and contains relevant information
@@ -64,5 +63,13 @@ def test_housing_pipeline():
         shutil.rmtree(housing_path, ignore_errors=True)
         shutil.rmtree(output_dir, ignore_errors=True)
 
+def test_housing_pipeline():
+    # The CLI defaults: random search, one worker
+    run_housing_pipeline()
+
+def test_housing_pipeline_halving():
+    run_housing_pipeline(["--n_jobs", "-1", "--search", "halving"])
+
 if __name__ == "__main__":
     test_housing_pipeline()
+    test_housing_pipeline_halving()
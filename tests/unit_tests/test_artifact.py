@@ -0,0 +1,89 @@
+import os
+import unittest
+import logging
+import tempfile
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+import sys
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(os.path.dirname(current_dir))
+src_dir = os.path.join(parent_dir, "src")
+sys.path.append(src_dir)
+
+from artifact import export_artifact, load_artifact
+from preprocessing import HousingPreprocessor
+from score import evaluate_model
+
+
+class TestCompactArtifact(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n = 300
+        self.housing = pd.DataFrame({
+            "median_income": rng.uniform(0.5, 10, n),
+            "total_rooms": rng.uniform(100, 5000, n),
+            "total_bedrooms": rng.uniform(10, 1000, n),
+            "population": rng.uniform(50, 3000, n),
+            "households": rng.uniform(10, 1000, n),
+            "ocean_proximity": rng.choice(["INLAND", "NEAR BAY", "<1H OCEAN"], n),
+        })
+        self.preprocessor = HousingPreprocessor().fit(self.housing)
+        self.data = self.preprocessor.transform(self.housing)
+        self.labels = self.housing["median_income"].to_numpy() * 50_000 + rng.normal(scale=1000, size=n)
+        self.forest = RandomForestRegressor(n_estimators=10, random_state=42).fit(self.data, self.labels)
+        self.logger = logging.getLogger("test_artifact")
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "artifact")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_roundtrip_is_lazy_and_memory_mapped(self):
+        manifest = export_artifact(self.forest, self.path, self.logger, preprocessor=self.preprocessor)
+        self.assertEqual(manifest["dtype"], "float32")
+        model = load_artifact(self.path)
+        self.assertIsNone(model._forest)
+        predictions = model.predict(model.preprocessor.transform(self.housing))
+        self.assertIsInstance(model.forest.threshold, np.memmap)
+        # float32 leaf values are the only approximation
+        np.testing.assert_allclose(predictions, self.forest.predict(self.data), rtol=1e-6)
+        self.assertEqual(model.preprocessor.feature_names_, self.preprocessor.feature_names_)
+
+    def test_compressed_and_pruned(self):
+        export_artifact(self.forest, self.path, self.logger, max_depth=4, compress=True)
+        model = load_artifact(self.path)
+        self.assertTrue(model.manifest["pruned"])
+        self.assertIsNone(model.preprocessor)
+        self.assertLessEqual(model.forest.max_depth, 4)
+        self.assertEqual(len(model.predict(self.data)), len(self.data))
+
+    def test_reexport_replaces_the_whole_directory(self):
+        export_artifact(self.forest, self.path, self.logger, preprocessor=self.preprocessor)
+        served = load_artifact(self.path)
+        expected = served.predict(self.data)
+        manifest = export_artifact(self.forest, self.path, self.logger, max_depth=3, compress=True)
+
+        # No arrays or preprocessor of the first export are left behind or counted
+        self.assertEqual(sorted(os.listdir(self.path)), ["artifact.json", "forest.npz"])
+        self.assertEqual(manifest["size_bytes"], sum(os.path.getsize(os.path.join(self.path, name)) for name in os.listdir(self.path)))
+        self.assertEqual(sorted(os.listdir(self.tmp_dir.name)), ["artifact"])
+        # Arrays mapped before the re-export are unchanged
+        np.testing.assert_array_equal(served.predict(self.data), expected)
+
+        other = os.path.join(self.tmp_dir.name, "other")
+        os.makedirs(other)
+        open(os.path.join(other, "notes.txt"), "w").close()
+        with self.assertRaises(ValueError):
+            export_artifact(self.forest, other, self.logger)
+
+    def test_evaluate_with_artifact(self):
+        export_artifact(self.forest, self.path, self.logger)
+        rmse = evaluate_model(load_artifact(self.path), self.data, self.labels, self.logger)
+        expected = np.sqrt(np.mean((self.forest.predict(self.data) - self.labels) ** 2))
+        self.assertAlmostEqual(rmse, expected, delta=1e-3 * expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
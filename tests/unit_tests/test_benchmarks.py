@@ -0,0 +1,59 @@
+import unittest
+import logging
+import numpy as np
+
+import os
+import sys
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.append(os.path.join(parent_dir, "benchmarks"))
+
+from bench_pipeline import make_housing, compare, measure
+from train import fit_preprocessor
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_synthetic_housing_fits_the_preprocessor(self):
+        housing = make_housing(5000, seed=1)
+        self.assertTrue(housing["total_bedrooms"].isna().any())
+        preprocessor = fit_preprocessor(housing, logging.getLogger("test_benchmarks"))
+        data = preprocessor.transform(housing)
+        self.assertEqual(data.shape[0], 5000)
+        self.assertFalse(np.isnan(data[:, :len(preprocessor.numeric_columns_)]).any())
+
+    def test_measure_records_throughput(self):
+        results = []
+        self.assertEqual(measure(results, 10, "sum", sum, [1, 2], rows=10), 3)
+        self.assertEqual(results[0]["stage"], "sum")
+        self.assertGreater(results[0]["rows_per_s"], 0)
+        self.assertGreater(results[0]["peak_rss_mb"], 0)
+        self.assertGreaterEqual(results[0]["rss_rise_mb"], 0)
+
+    def test_rss_rise_is_measured_within_the_stage(self):
+        results = []
+        # Memory held by earlier stages (here, ballast) is not reported again
+        ballast = np.ones(25_000_000)
+        measure(results, 10, "small", sum, [1, 2])
+        measure(results, 10, "large", np.ones, 25_000_000)
+        del ballast
+        small, large = (record["rss_rise_mb"] for record in results)
+        self.assertLess(small, 50)
+        self.assertGreater(large, 150)
+
+    def test_compare_flags_slowdowns_beyond_threshold(self):
+        baseline = {"results": [
+            {"size": 10, "stage": "train", "wall_s": 1.0},
+            {"size": 10, "stage": "score", "wall_s": 1.0},
+        ]}
+        results = [
+            {"size": 10, "stage": "train", "wall_s": 1.1},
+            {"size": 10, "stage": "score", "wall_s": 1.5},
+            {"size": 20, "stage": "score", "wall_s": 9.0},
+        ]
+        regressions = compare(results, baseline, threshold=0.2)
+        self.assertEqual([(r["stage"], r["size"]) for r in regressions], [("score", 10)])
+        self.assertAlmostEqual(regressions[0]["ratio"], 1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import os
+import sys
+import json
+import time
+import logging
+import tempfile
+import unittest
+import subprocess
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(os.path.dirname(current_dir))
+src_dir = os.path.join(parent_dir, "src")
+sys.path.append(src_dir)
+
+from artifact import export_artifact
+from preprocessing import HousingPreprocessor
+
+MAIN = os.path.join(parent_dir, "notebooks", "main.py")
+MLFLOW_MAIN = os.path.join(parent_dir, "housing_price_prediction_ML_flow", "main.py")
+
+# Modules that each cost hundreds of milliseconds to seconds to import
+HEAVY_MODULES = ("numpy", "pandas", "sklearn", "scipy", "joblib", "mlflow")
+
+# Wall-clock budget for `main.py --help`, interpreter start-up included. Parsing needs only the
+# standard library (~0.2s); importing scikit-learn alone takes several seconds.
+HELP_BUDGET_S = 1.5
+
+
+def _run(code: str) -> list:
+    # Runs code in a fresh interpreter and returns which heavy modules it left imported
+    script = code + f"\nimport json; print(json.dumps(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules)))"
+    output = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True, cwd=parent_dir
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+class TestCommandLineStartup(unittest.TestCase):
+    def test_parsing_imports_only_the_standard_library(self):
+        loaded = _run(
+            "import sys\n"
+            f"sys.path.insert(0, {os.path.dirname(MAIN)!r})\n"
+            "import main\n"
+            "for argv in ([], ['train'], ['ingest'], ['score', '--input', 'x.csv'], ['serve', '--artifact', 'a'], ['cv_worker']):\n"
+            "    main.build_parser().parse_args(argv)\n"
+        )
+        self.assertEqual(loaded, [])
+
+    def test_imports_as_package_module(self):
+        # The console scripts import notebooks.main, without notebooks/ on sys.path
+        loaded = _run(
+            "import sys\n"
+            f"sys.path.insert(0, {parent_dir!r})\n"
+            "import notebooks.main\n"
+            "notebooks.main.build_parser().parse_args(['serve', '--artifact', 'a'])\n"
+        )
+        self.assertEqual(loaded, [])
+
+    def test_options_before_the_subcommand_are_kept(self):
+        sys.path.insert(0, os.path.dirname(MAIN))
+        try:
+            import main
+        finally:
+            sys.path.remove(os.path.dirname(MAIN))
+        parser = main.build_parser()
+
+        args = parser.parse_args(["--geo", "--n_jobs", "4", "train"])
+        self.assertEqual((args.geo, args.n_jobs), (True, 4))
+        args = parser.parse_args(["--n_jobs", "4", "train", "--n_jobs", "2"])
+        self.assertEqual(args.n_jobs, 2)
+        # Unset options still get their defaults, before or after the subcommand
+        args = parser.parse_args(["score", "--input", "x.csv"])
+        self.assertEqual((args.n_jobs, args.chunk_size, args.output_dir), (1, 50_000, "logs"))
+
+    def test_previous_model_needs_delta_rows(self):
+        sys.path.insert(0, os.path.dirname(MAIN))
+        try:
+            import main
+        finally:
+            sys.path.remove(os.path.dirname(MAIN))
+        args = main.build_parser().parse_args(["train", "--previous_model", "model.joblib"])
+        # Rejected before anything is fetched: drift on the rows it was trained on means nothing
+        with self.assertRaises(ValueError):
+            main.run_pipeline(args, logging.getLogger("test_cli"))
+
+    def test_help_within_budget(self):
+        for script in (MAIN, MLFLOW_MAIN):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, script, "--help"], capture_output=True, check=True)
+            elapsed = time.perf_counter() - start
+            self.assertLess(elapsed, HELP_BUDGET_S, f"{script} --help took {elapsed:.2f}s")
+
+    def test_score_artifact_without_scikit_learn(self):
+        rng = np.random.default_rng(0)
+        n = 200
+        housing = pd.DataFrame({
+            "median_income": rng.uniform(0.5, 10, n),
+            "total_rooms": rng.uniform(100, 5000, n),
+            "total_bedrooms": rng.uniform(10, 1000, n),
+            "population": rng.uniform(50, 3000, n),
+            "households": rng.uniform(10, 1000, n),
+            "ocean_proximity": rng.choice(["INLAND", "NEAR BAY", "<1H OCEAN"], n),
+        })
+        housing["median_house_value"] = housing["median_income"] * 50_000 + rng.normal(scale=1000, size=n)
+        preprocessor = HousingPreprocessor().fit(housing)
+        data = preprocessor.transform(housing)
+        forest = RandomForestRegressor(n_estimators=5, random_state=42).fit(data, housing["median_house_value"])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            artifact_path = os.path.join(tmp_dir, "artifact")
+            export_artifact(forest, artifact_path, logging.getLogger("test_cli"), preprocessor=preprocessor)
+            input_path = os.path.join(tmp_dir, "housing.csv")
+            housing.to_csv(input_path, index=False)
+            predictions_path = os.path.join(tmp_dir, "predictions.csv")
+            argv = [
+                MAIN, "score", "--artifact", artifact_path, "--input", input_path,
+                "--predictions_output", predictions_path, "--output_dir", os.path.join(tmp_dir, "logs"),
+            ]
+            loaded = _run(
+                "import sys, runpy\n"
+                f"sys.path.insert(0, {os.path.dirname(MAIN)!r})\n"
+                f"sys.argv = {argv!r}\n"
+                f"runpy.run_path({MAIN!r}, run_name='__main__')\n"
+            )
+            predictions = np.loadtxt(predictions_path, skiprows=1)
+
+        self.assertNotIn("sklearn", loaded)
+        self.assertNotIn("scipy", loaded)
+        self.assertNotIn("mlflow", loaded)
+        np.testing.assert_allclose(predictions, forest.predict(data), rtol=1e-5)
+
+
+if __name__ == '__main__':
+    unittest.main()
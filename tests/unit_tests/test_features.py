@@ -0,0 +1,63 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+import os
+import sys
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(os.path.dirname(current_dir))
+src_dir = os.path.join(parent_dir, "src")
+sys.path.append(src_dir)
+
+from features import FeatureRegistry, HOUSING_FEATURES
+from preprocessing import HousingPreprocessor
+
+
+class TestFeatureRegistry(unittest.TestCase):
+    def setUp(self):
+        self.housing = pd.DataFrame({
+            "total_rooms": [800.0, 1200.0, 0.0, 900.0],
+            "total_bedrooms": [200.0, np.nan, 0.0, 300.0],
+            "population": [1000.0, 1500.0, 30.0, 0.0],
+            "households": [300.0, 0.0, 0.0, 250.0],
+            "ocean_proximity": ["INLAND", "NEAR BAY", "INLAND", "NEAR BAY"],
+        })
+
+    def test_matches_pandas_division(self):
+        frame = HOUSING_FEATURES.add_to_frame(self.housing.iloc[[0, 3]])
+        expected = self.housing.iloc[[0, 3]]
+        np.testing.assert_allclose(frame["rooms_per_household"], expected["total_rooms"] / expected["households"])
+        np.testing.assert_allclose(frame["bedrooms_per_room"], expected["total_bedrooms"] / expected["total_rooms"])
+        self.assertEqual(list(frame.columns[-3:]), HOUSING_FEATURES.names)
+
+    def test_zero_denominators_are_nan(self):
+        frame = HOUSING_FEATURES.add_to_frame(self.housing)
+        # x / 0 and 0 / 0 alike, never inf
+        self.assertTrue(np.isnan(frame["rooms_per_household"].iloc[1]))
+        self.assertTrue(np.isnan(frame["bedrooms_per_room"].iloc[2]))
+        self.assertFalse(np.isinf(frame[HOUSING_FEATURES.names].to_numpy()).any())
+        self.assertEqual(frame["population_per_household"].iloc[3], 0.0)
+
+    def test_preprocessor_writes_into_its_output(self):
+        housing = self.housing.assign(median_house_value=[1.0, 2.0, 3.0, 4.0])
+        preprocessor = HousingPreprocessor().fit(housing)
+        out = preprocessor.transform(housing)
+        start = len(preprocessor.numeric_columns_)
+        derived = out[:, start:start + len(HOUSING_FEATURES)]
+        self.assertTrue(np.isnan(derived[2, 0]))
+        self.assertAlmostEqual(derived[0, 0], 800.0 / 300.0, places=5)
+        # total_bedrooms was imputed with its median before the ratios were taken
+        self.assertAlmostEqual(derived[1, 1], 200.0 / 1200.0, places=5)
+
+    def test_registration_errors(self):
+        registry = FeatureRegistry(zero_division=0.0).ratio("a_per_b", "a", "b")
+        with self.assertRaises(ValueError):
+            registry.ratio("a_per_b", "a", "c")
+        with self.assertRaises(KeyError):
+            registry.compute({"a": np.ones(2)})
+        out = registry.compute({"a": np.array([1.0, 3.0]), "b": np.array([0.0, 2.0])})
+        np.testing.assert_array_equal(out, [[0.0], [1.5]])
+
+
+if __name__ == '__main__':
+    unittest.main()
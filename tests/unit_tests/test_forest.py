@@ -0,0 +1,78 @@
+import unittest
+import tempfile
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.tree import DecisionTreeRegressor
+
+import os
+import sys
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(os.path.dirname(current_dir))
+src_dir = os.path.join(parent_dir, "src")
+sys.path.append(src_dir)
+
+from forest import FlatForest
+
+
+class TestFlatForest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.data = rng.uniform(size=(400, 5)).astype(np.float32)
+        labels = self.data[:, 0] * 10 + rng.normal(size=400)
+        self.forest = RandomForestRegressor(n_estimators=15, max_features=3, random_state=42).fit(self.data, labels)
+        self.test_data = rng.uniform(size=(300, 5))
+
+    def test_identical_predictions(self):
+        flat = FlatForest.from_estimator(self.forest)
+        np.testing.assert_array_equal(flat.predict(self.test_data, chunk_size=64), self.forest.predict(self.test_data))
+
+    def test_single_tree_and_non_tree_models(self):
+        labels = self.forest.predict(self.data)
+        tree = DecisionTreeRegressor(max_depth=6, random_state=42).fit(self.data, labels)
+        flat = FlatForest.from_estimator(tree)
+        self.assertEqual(flat.n_trees, 1)
+        np.testing.assert_array_equal(flat.predict(self.test_data), tree.predict(self.test_data))
+        with self.assertRaises(TypeError):
+            FlatForest.from_estimator(LinearRegression().fit(self.data, labels))
+
+    def test_apply_matches_leaves(self):
+        flat = FlatForest.from_estimator(self.forest)
+        leaves = flat.apply(self.test_data) - flat.roots
+        np.testing.assert_array_equal(leaves, self.forest.apply(self.test_data))
+
+    def test_missing_values(self):
+        test_data = self.test_data.copy()
+        test_data[::7, 0] = np.nan
+        flat = FlatForest.from_estimator(self.forest)
+        np.testing.assert_array_equal(flat.predict(test_data), self.forest.predict(test_data))
+
+    def test_float32_thresholds_route_identically(self):
+        flat = FlatForest.from_estimator(self.forest, dtype=np.float32)
+        self.assertEqual(flat.threshold.dtype, np.float32)
+        leaves = flat.apply(self.test_data) - flat.roots
+        np.testing.assert_array_equal(leaves, self.forest.apply(self.test_data))
+
+    def test_pruned_depth(self):
+        flat = FlatForest.from_estimator(self.forest, max_depth=3)
+        full = FlatForest.from_estimator(self.forest)
+        self.assertEqual(flat.max_depth, 3)
+        self.assertLess(len(flat.feature), len(full.feature))
+        # Depth-3 trees have at most 15 nodes, and every leaf is reached in three steps
+        self.assertTrue(np.all(np.diff(np.append(flat.roots, len(flat.feature))) <= 15))
+        predictions = flat.predict(self.test_data)
+        self.assertTrue(np.all(np.isfinite(predictions)))
+        np.testing.assert_allclose(predictions.mean(), self.forest.predict(self.test_data).mean(), rtol=0.1)
+
+    def test_save_and_memory_mapped_load(self):
+        flat = FlatForest.from_estimator(self.forest)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            flat.save(tmp_dir)
+            loaded = FlatForest.load(tmp_dir)
+            self.assertIsInstance(loaded.threshold, np.memmap)
+            np.testing.assert_array_equal(loaded.predict(self.test_data), self.forest.predict(self.test_data))
+            del loaded
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import pickle
+import numpy as np
+import pandas as pd
+
+import os
+import sys
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(os.path.dirname(current_dir))
+src_dir = os.path.join(parent_dir, "src")
+sys.path.append(src_dir)
+
+from geo import GeoFeatures, haversine_km
+from preprocessing import HousingPreprocessor
+
+
+class TestGeoFeatures(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n = 300
+        self.housing = pd.DataFrame({
+            "longitude": rng.uniform(-124.0, -114.5, n),
+            "latitude": rng.uniform(32.6, 41.9, n),
+            "total_rooms": rng.uniform(100, 5000, n),
+            "total_bedrooms": rng.uniform(10, 1000, n),
+            "population": rng.uniform(50, 3000, n),
+            "households": rng.uniform(10, 1000, n),
+            "median_income": rng.uniform(0.5, 10, n),
+            "ocean_proximity": rng.choice(["INLAND", "NEAR BAY", "<1H OCEAN"], n),
+            "median_house_value": rng.uniform(50_000, 500_000, n),
+        })
+        self.train, self.test = self.housing.iloc[:250], self.housing.iloc[250:]
+        self.prices = self.train["median_house_value"].to_numpy()
+
+    def _brute_force(self, frame, k, exclude_self=False):
+        # Every training district's distance, then the k closest: the scan the tree replaces
+        distances = haversine_km(
+            frame["latitude"].to_numpy()[:, None],
+            frame["longitude"].to_numpy()[:, None],
+            self.train["latitude"].to_numpy(),
+            self.train["longitude"].to_numpy(),
+        )
+        if exclude_self:
+            np.fill_diagonal(distances, np.inf)
+        nearest = np.argsort(distances, axis=1)[:, :k]
+        return self.prices[nearest].mean(axis=1), np.take_along_axis(distances, nearest, axis=1).mean(axis=1)
+
+    def test_haversine(self):
+        # San Francisco to Los Angeles
+        self.assertAlmostEqual(float(haversine_km(37.7749, -122.4194, 34.0522, -118.2437)), 559.1, delta=1.0)
+
+    def test_matches_brute_force(self):
+        geo = GeoFeatures(n_neighbors=5, n_clusters=3).fit(self.train, self.prices)
+        features = geo.compute(self.test)
+        mean_price, mean_distance = self._brute_force(self.test, 5)
+
+        self.assertEqual(features.shape, (len(self.test), len(geo.names)))
+        np.testing.assert_allclose(features[:, 0], mean_price)
+        np.testing.assert_allclose(features[:, 2], mean_distance)
+        np.testing.assert_allclose(
+            features[:, 3:],
+            haversine_km(
+                self.test["latitude"].to_numpy()[:, None],
+                self.test["longitude"].to_numpy()[:, None],
+                geo.centers_[:, 0],
+                geo.centers_[:, 1],
+            ),
+        )
+
+    def test_training_rows_leave_themselves_out(self):
+        geo = GeoFeatures(n_neighbors=5, n_clusters=3, batch_size=64).fit(self.train, self.prices)
+        features = geo.compute(self.train, exclude_self=True)
+        mean_price, mean_distance = self._brute_force(self.train, 5, exclude_self=True)
+
+        np.testing.assert_allclose(features[:, 0], mean_price)
+        np.testing.assert_allclose(features[:, 2], mean_distance)
+        with self.assertRaises(ValueError):
+            geo.compute(self.train.iloc[::-1], exclude_self=True)
+
+    def test_preprocessor_integration(self):
+        preprocessor = HousingPreprocessor(geo=GeoFeatures(n_neighbors=5, n_clusters=3))
+        train_data = preprocessor.fit_transform(self.train)
+        geo_columns = [preprocessor.feature_names_.index(name) for name in preprocessor.geo.names]
+
+        self.assertEqual(train_data.shape[1], len(preprocessor.feature_names_))
+        np.testing.assert_allclose(train_data[:, geo_columns[0]], self._brute_force(self.train, 5, exclude_self=True)[0], rtol=1e-6)
+        # Test rows are looked up in the tree fitted with the model, which survives pickling
+        restored = pickle.loads(pickle.dumps(preprocessor))
+        np.testing.assert_array_equal(restored.transform(self.test), preprocessor.transform(self.test))
+        np.testing.assert_allclose(
+            preprocessor.transform(self.test)[:, geo_columns[0]], self._brute_force(self.test, 5)[0], rtol=1e-6
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
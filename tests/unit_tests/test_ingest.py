@@ -1,7 +1,13 @@
 import unittest
 from unittest.mock import patch, MagicMock
+import io
 import os
+import shutil
+import pathlib
+import tarfile
+import tempfile
 import logging
+import numpy as np
 import pandas as pd
 import sys
 
@@ -11,39 +17,87 @@ src_dir = os.path.join(parent_dir, "src")
 sys.path.append(src_dir)
 
 # Import the functions to be tested
-from ingest import fetch_housing_data, load_housing_data 
+from ingest import fetch_housing_data, load_housing_data, download_archive, read_manifest, file_sha256, iter_housing_chunks, HOUSING_DTYPES
 
 class TestHousingDataFunctions(unittest.TestCase):
 
-    @patch("ingest.urllib.request.urlretrieve")
-    @patch("ingest.tarfile.open")
-    @patch("ingest.os.makedirs")
-    def test_fetch_housing_data(self, mock_makedirs, mock_tarfile_open, mock_urlretrieve):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.mirror_dir = os.path.join(self.tmp_dir, "mirror")
+        self.housing_path = os.path.join(self.tmp_dir, "housing")
+        os.makedirs(self.mirror_dir)
+        csv_path = os.path.join(self.mirror_dir, "housing.csv")
+        pd.DataFrame({"column1": [1, 2], "column2": [3, 4]}).to_csv(csv_path, index=False)
+        self.archive_path = os.path.join(self.mirror_dir, "housing.tgz")
+        with tarfile.open(self.archive_path, "w:gz") as tgz:
+            tgz.add(csv_path, arcname="housing.csv")
+        self.archive_url = pathlib.Path(self.archive_path).as_uri()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_fetch_housing_data(self):
         # Arrange
-        housing_url = "https://raw.githubusercontent.com/ageron/handson-ml/master/datasets/housing/housing.tgz"
-        housing_path = "datasets/housing"
         logger = MagicMock()
 
-        mock_urlretrieve.return_value = None  # Simulate successful download
-        mock_tarfile = MagicMock()
-        mock_tarfile_open.return_value.__enter__.return_value = mock_tarfile  # Mock context manager behavior
-
         # Act
-        fetch_housing_data(housing_url, housing_path, logger)
+        cache_hit = fetch_housing_data(self.archive_url, self.housing_path, logger)
 
         # Assert
-        mock_makedirs.assert_called_once_with(housing_path, exist_ok=True)
-        mock_urlretrieve.assert_called_once_with(housing_url, os.path.join(housing_path, "housing.tgz"))
-        mock_tarfile_open.assert_called_once_with(os.path.join(housing_path, "housing.tgz"))
-
-        # Ensure extractall was called with the correct path
-        mock_tarfile.extractall.assert_called_once_with(path=housing_path)
+        self.assertFalse(cache_hit)
+        self.assertTrue(os.path.exists(os.path.join(self.housing_path, "housing.csv")))
+        manifest = read_manifest(self.housing_path)
+        self.assertEqual(manifest["url"], self.archive_url)
+        self.assertEqual(manifest["archive"]["sha256"], file_sha256(self.archive_path))
+        self.assertIn("housing.csv", manifest["files"])
 
         # Verify logger calls
-        logger.info.assert_has_calls([
-            unittest.mock.call("Fetching housing data..."),
-            unittest.mock.call("Housing data fetched and extracted.")
-        ])
+        logger.info.assert_any_call("Fetching housing data...")
+        logger.info.assert_any_call("Housing data fetched and extracted.")
+
+    def test_fetch_housing_data_uses_cache(self):
+        fetch_housing_data(self.archive_url, self.housing_path, MagicMock())
+        logger = MagicMock()
+
+        with patch("ingest.download_archive") as mock_download, patch("ingest.tarfile.open") as mock_tarfile_open:
+            cache_hit = fetch_housing_data(self.archive_url, self.housing_path, logger)
+
+        self.assertTrue(cache_hit)
+        mock_download.assert_not_called()
+        mock_tarfile_open.assert_not_called()
+        logger.info.assert_any_call("Housing data cache is up to date, skipping download and extraction.")
+
+    def test_fetch_housing_data_reextracts_modified_file(self):
+        fetch_housing_data(self.archive_url, self.housing_path, MagicMock())
+        csv_path = os.path.join(self.housing_path, "housing.csv")
+        with open(csv_path, "a") as f:
+            f.write("5,6\n")
+
+        with patch("ingest.download_archive") as mock_download:
+            fetch_housing_data(self.archive_url, self.housing_path, MagicMock())
+
+        mock_download.assert_not_called()
+        self.assertEqual(len(pd.read_csv(csv_path)), 2)
+
+    @patch("ingest.urllib.request.urlopen")
+    def test_download_archive_resumes_partial_file(self, mock_urlopen):
+        with open(self.archive_path, "rb") as f:
+            payload = f.read()
+        os.makedirs(self.housing_path)
+        tgz_path = os.path.join(self.housing_path, "housing.tgz")
+        with open(tgz_path + ".part", "wb") as f:
+            f.write(payload[:10])
+
+        response = io.BytesIO(payload[10:])
+        response.status = 206
+        mock_urlopen.return_value.__enter__.return_value = response
+
+        download_archive("https://example.com/housing.tgz", tgz_path, MagicMock())
+
+        request = mock_urlopen.call_args[0][0]
+        self.assertEqual(request.get_header("Range"), "bytes=10-")
+        self.assertEqual(file_sha256(tgz_path), file_sha256(self.archive_path))
+        self.assertFalse(os.path.exists(tgz_path + ".part"))
 
     @patch("ingest.pd.read_csv")
     def test_load_housing_data(self, mock_read_csv):
@@ -55,12 +109,57 @@ class TestHousingDataFunctions(unittest.TestCase):
         mock_read_csv.return_value = fake_dataframe
 
         # Act
-        result = load_housing_data(housing_path, logger)
+        result = load_housing_data(housing_path, logger, snapshot=False)
 
         # Assert
-        mock_read_csv.assert_called_once_with(mock_csv_path)
+        mock_read_csv.assert_called_once_with(mock_csv_path, dtype=HOUSING_DTYPES)
         self.assertTrue(result.equals(fake_dataframe))
         logger.info.assert_any_call("Loading housing data...")
 
+    def test_load_housing_data_snapshot(self):
+        housing_path = os.path.join(self.tmp_dir, "snapshot_housing")
+        os.makedirs(housing_path)
+        csv_path = os.path.join(housing_path, "housing.csv")
+        pd.DataFrame({
+            "median_income": [1.5, None, 4.2],
+            "median_house_value": [100000.0, 200000.0, 300000.0],
+            "ocean_proximity": ["INLAND", "NEAR BAY", "INLAND"],
+        }).to_csv(csv_path, index=False)
+
+        first = load_housing_data(housing_path, MagicMock())
+        self.assertTrue(os.path.isdir(os.path.join(housing_path, "snapshot")))
+
+        with patch("ingest.pd.read_csv") as mock_read_csv:
+            second = load_housing_data(housing_path, MagicMock())
+        mock_read_csv.assert_not_called()
+
+        self.assertEqual(second["median_income"].dtype, np.float32)
+        self.assertIsInstance(second["ocean_proximity"].dtype, pd.CategoricalDtype)
+        pd.testing.assert_frame_equal(first, second)
+
+        # A rewritten CSV invalidates the snapshot
+        pd.DataFrame({
+            "median_income": [2.0],
+            "median_house_value": [1.0],
+            "ocean_proximity": ["ISLAND"],
+        }).to_csv(csv_path, index=False)
+        third = load_housing_data(housing_path, MagicMock())
+        self.assertEqual(len(third), 1)
+
+    def test_iter_housing_chunks(self):
+        housing_path = os.path.join(self.tmp_dir, "chunked_housing")
+        os.makedirs(housing_path)
+        pd.DataFrame({
+            "median_income": np.arange(10, dtype=float),
+            "ocean_proximity": ["INLAND", "NEAR BAY"] * 5,
+        }).to_csv(os.path.join(housing_path, "housing.csv"), index=False)
+
+        for snapshot in (False, True):
+            if snapshot:
+                load_housing_data(housing_path, MagicMock())
+            chunks = list(iter_housing_chunks(housing_path, MagicMock(), chunksize=4))
+            self.assertEqual([len(chunk) for chunk in chunks], [4, 4, 2])
+            self.assertTrue(all(chunk["median_income"].dtype == np.float32 for chunk in chunks))
+
 if __name__ == "__main__":
     unittest.main()
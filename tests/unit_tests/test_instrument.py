@@ -0,0 +1,84 @@
+import os
+import json
+import unittest
+import logging
+import tempfile
+from unittest.mock import MagicMock, patch
+import numpy as np
+
+import sys
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(os.path.dirname(current_dir))
+src_dir = os.path.join(parent_dir, "src")
+sys.path.append(src_dir)
+
+import instrument
+from instrument import configure, stage, traced, profile, write_trace
+
+
+@traced(rows="data")
+def double(data, logger):
+    return data * 2
+
+
+class TestInstrument(unittest.TestCase):
+    def setUp(self):
+        self.logger = MagicMock(spec=logging.Logger)
+
+    def tearDown(self):
+        configure()
+
+    def test_nested_stage_memory_peaks(self):
+        tracer = configure(memory=True)
+        with stage("outer", logger=self.logger):
+            with stage("inner", logger=self.logger):
+                block = np.ones(2_000_000)  # 16 MB
+                del block
+            small = np.ones(1000)
+        inner, outer = tracer.events
+        self.assertEqual((inner["name"], outer["name"]), ("inner", "outer"))
+        self.assertGreater(inner["args"]["peak_mb"], 15)
+        # The outer stage's peak includes what happened inside the inner one
+        self.assertGreaterEqual(outer["args"]["peak_mb"], inner["args"]["peak_mb"])
+        self.assertLessEqual(outer["ts"], inner["ts"])
+        del small
+
+    def test_traced_rows_and_log(self):
+        tracer = configure()
+        np.testing.assert_array_equal(double(np.arange(3), self.logger), [0, 2, 4])
+        event = tracer.events[-1]
+        self.assertEqual(event["name"], "double")
+        self.assertEqual(event["args"], {"rows": 3})
+        self.assertTrue(self.logger.info.call_args[0][0].startswith("Stage 'double' took"))
+
+    def test_write_chrome_trace(self):
+        configure()
+        with stage("work", logger=self.logger, rows=10):
+            pass
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "trace.json")
+            write_trace(path)
+            with open(path) as f:
+                trace = json.load(f)
+        self.assertEqual(trace["traceEvents"][0]["ph"], "X")
+        self.assertEqual(trace["traceEvents"][0]["args"]["rows"], 10)
+
+    def test_mlflow_metrics(self):
+        mock_mlflow = MagicMock()
+        configure(mlflow=True)
+        with patch.dict(sys.modules, {"mlflow": mock_mlflow}):
+            with stage("train", logger=self.logger, rows=5):
+                pass
+        metrics = mock_mlflow.log_metrics.call_args[0][0]
+        self.assertEqual(set(metrics), {"train_seconds", "train_rows"})
+
+    def test_profile_writes_stats(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "run.prof")
+            with profile(path):
+                sum(range(1000))
+            self.assertGreater(os.path.getsize(path), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import unittest
+import tempfile
+from unittest.mock import MagicMock, patch
+
+import sys
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.append(os.path.join(parent_dir, "housing_price_prediction_ML_flow"))
+
+try:
+    import mlflow
+    from mlflow.tracking import MlflowClient
+    import mlflow_logger
+    from mlflow_logger import BatchLogger, log_search_trace
+except ImportError:
+    MlflowClient = None
+
+
+@unittest.skipIf(MlflowClient is None, "mlflow is not installed")
+class TestBatchLogger(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        # Local file-based store, as under mlruns/ (MLflow 3 needs an explicit opt-in for it)
+        environ = patch.dict(os.environ, {"MLFLOW_ALLOW_FILE_STORE": "true"})
+        environ.start()
+        self.addCleanup(environ.stop)
+        self.client = MlflowClient(tracking_uri="file:" + os.path.join(self.tmp_dir.name, "mlruns"))
+        experiment_id = self.client.create_experiment("batch_logger_test")
+        self.run_id = self.client.create_run(experiment_id).info.run_id
+        self.spool_dir = os.path.join(self.tmp_dir.name, "spool")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _logger(self, client=None, **kwargs):
+        return BatchLogger(self.run_id, client=client or self.client, spool_dir=self.spool_dir, **kwargs)
+
+    def test_batches_reach_the_store(self):
+        with self._logger(flush_interval=60) as tracker:
+            self.assertIs(mlflow_logger.active_logger(), tracker)
+            mlflow_logger.log_param("housing_path", "datasets/housing")
+            tracker.log_params({f"p{i}": i for i in range(250)})
+            tracker.log_metric("rmse", 48000.5)
+            tracker.set_tag("stage", "train")
+            # Params are immutable: a different value for an existing key is dropped
+            tracker.log_param("p0", "changed")
+        self.assertIsNone(mlflow_logger.active_logger())
+        data = self.client.get_run(self.run_id).data
+        self.assertEqual(len(data.params), 251)
+        self.assertEqual(data.params["p0"], "0")
+        self.assertEqual(data.metrics["rmse"], 48000.5)
+        self.assertEqual(data.tags["stage"], "train")
+
+    def test_unavailable_store_spools_and_replays(self):
+        broken = MagicMock()
+        broken.log_batch.side_effect = ConnectionError("tracking store unavailable")
+        tracker = self._logger(client=broken, max_retries=2, retry_backoff=0)
+        tracker.log_param("n_estimators", 150)
+        tracker.log_metric("rmse", 47000.0)
+        self.assertTrue(tracker.flush(timeout=10))
+        tracker.close()
+        self.assertEqual(broken.log_batch.call_count, 2)
+        self.assertTrue(os.path.exists(tracker.spool_path))
+
+        recovered = self._logger()
+        self.assertTrue(recovered.replay_spool())
+        recovered.close()
+        data = self.client.get_run(self.run_id).data
+        self.assertEqual(data.params["n_estimators"], "150")
+        self.assertEqual(data.metrics["rmse"], 47000.0)
+
+    def test_hanging_store_does_not_block_close(self):
+        hanging = MagicMock()
+        hanging.log_batch.side_effect = lambda *args, **kwargs: __import__("time").sleep(5)
+        tracker = self._logger(client=hanging, flush_interval=0.01)
+        tracker.log_metric("rmse", 1.0)
+        __import__("time").sleep(0.1)
+        tracker.log_metric("mae", 2.0)
+        tracker.close(timeout=0.2)
+        with open(tracker.spool_path) as f:
+            self.assertIn("mae", f.read())
+
+    def test_search_trace_is_one_artifact_and_one_batch(self):
+        cv_results = {
+            "params": [{"n_estimators": 10}, {"n_estimators": 50}, {"n_estimators": 90}],
+            "param_n_estimators": [10, 50, 90],
+            "mean_fit_time": [0.1, 0.5, 0.9],
+            "mean_score_time": [0.01, 0.02, 0.03],
+            "mean_test_score": [-4.0, -1.0, -2.25],
+            "std_test_score": [0.1, 0.2, 0.3],
+            "split0_test_score": [-4.0, -1.0, -2.0],
+            "rank_test_score": [3, 1, 2],
+        }
+        client = MagicMock(wraps=self.client)
+        self.addCleanup(mlflow.set_tracking_uri, mlflow.get_tracking_uri())
+        mlflow.set_tracking_uri(self.client.tracking_uri)
+        with mlflow.start_run(run_id=self.run_id), self._logger(client=client, flush_interval=60):
+            trace = log_search_trace(cv_results)
+        self.assertEqual(client.log_batch.call_count, 1)
+        self.assertEqual(list(trace["param_n_estimators"]), [10, 50, 90])
+        history = self.client.get_metric_history(self.run_id, "search_cv_rmse")
+        self.assertEqual(sorted((m.step, m.value) for m in history), [(0, 2.0), (1, 1.0), (2, 1.5)])
+        artifacts = [a.path for a in self.client.list_artifacts(self.run_id, "search")]
+        self.assertEqual(artifacts, ["search/search_trace.csv"])
+
+
+if __name__ == '__main__':
+    unittest.main()
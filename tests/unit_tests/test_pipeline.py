@@ -0,0 +1,106 @@
+import os
+import unittest
+import logging
+import tempfile
+import numpy as np
+
+import sys
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(os.path.dirname(current_dir))
+src_dir = os.path.join(parent_dir, "src")
+sys.path.append(src_dir)
+
+from pipeline import Pipeline, StageCache
+
+CALLS = []
+
+
+def split(values, logger, fraction=0.5):
+    CALLS.append("split")
+    cut = int(len(values) * fraction)
+    return values[:cut], values[cut:]
+
+
+def total(values, logger, scale=1.0):
+    CALLS.append("total")
+    return float(np.sum(values) * scale)
+
+
+class TestStageCache(unittest.TestCase):
+    def setUp(self):
+        CALLS.clear()
+        self.logger = logging.getLogger("test_pipeline")
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.values = np.arange(10.0)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _run(self, values, fraction=0.5, scale=1.0):
+        pipeline = Pipeline(self.logger, StageCache(self.tmp_dir.name, self.logger))
+        first, _ = pipeline.run("split", split, values, self.logger, fraction=fraction)
+        return pipeline.run("total", total, first, self.logger, scale=scale)
+
+    def test_second_run_is_served_from_cache(self):
+        self.assertEqual(self._run(self.values), 10.0)
+        self.assertEqual(self._run(self.values), 10.0)
+        self.assertEqual(CALLS, ["split", "total"])
+
+    def test_changes_invalidate_downstream_stages(self):
+        self._run(self.values)
+        CALLS.clear()
+        self._run(self.values, scale=2.0)
+        self.assertEqual(CALLS, ["total"])
+        CALLS.clear()
+        self.assertEqual(self._run(self.values + 1), 15.0)
+        self.assertEqual(CALLS, ["split", "total"])
+
+    def test_editing_an_imported_module_invalidates_the_stage(self):
+        code_dir = os.path.join(self.tmp_dir.name, "code")
+        os.makedirs(code_dir)
+        with open(os.path.join(code_dir, "stage_module.py"), "w") as f:
+            f.write("def scaled(values, logger):\n    from stage_helper import FACTOR\n    return float(sum(values)) * FACTOR\n")
+
+        def run(factor):
+            with open(os.path.join(code_dir, "stage_helper.py"), "w") as f:
+                f.write(f"FACTOR = {factor}\n")
+            sys.modules.pop("stage_helper", None)
+            pipeline = Pipeline(self.logger, StageCache(os.path.join(self.tmp_dir.name, "cache"), self.logger))
+            return pipeline.run("scaled", stage_module.scaled, [1.0, 2.0], self.logger)
+
+        sys.path.insert(0, code_dir)
+        try:
+            import stage_module
+            self.assertEqual(run(2), 6.0)
+            self.assertEqual(run(2), 6.0)
+            # The stage's own file is unchanged, but the module it imports is not
+            self.assertEqual(run(3), 9.0)
+        finally:
+            sys.path.remove(code_dir)
+            sys.modules.pop("stage_module", None)
+            sys.modules.pop("stage_helper", None)
+
+    def test_no_cache_runs_everything(self):
+        pipeline = Pipeline(self.logger)
+        pipeline.run("total", total, self.values, self.logger)
+        pipeline.run("total", total, self.values, self.logger)
+        self.assertEqual(CALLS, ["total", "total"])
+        self.assertEqual(os.listdir(self.tmp_dir.name), [])
+
+    def test_lru_eviction(self):
+        cache = StageCache(self.tmp_dir.name, self.logger)
+        cache.put("a", np.zeros(100))
+        # Room for three entries
+        cache.max_bytes = 3 * os.path.getsize(cache._path("a")) + 100
+        for i, key in enumerate(["a", "b", "c"]):
+            cache.put(key, np.zeros(100))
+            os.utime(cache._path(key), (i, i))
+        # Reading "a" makes it the most recently used, so "b" goes next
+        self.assertTrue(cache.get("a")[0])
+        cache.put("d", np.zeros(100))
+        names = sorted(os.path.basename(path) for _, _, path in cache.entries())
+        self.assertEqual(names, ["a.joblib", "c.joblib", "d.joblib"])
+
+
+if __name__ == '__main__':
+    unittest.main()
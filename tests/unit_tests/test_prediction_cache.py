@@ -0,0 +1,135 @@
+import os
+import unittest
+import logging
+import tempfile
+from unittest.mock import patch
+import numpy as np
+
+import sys
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(os.path.dirname(current_dir))
+src_dir = os.path.join(parent_dir, "src")
+sys.path.append(src_dir)
+
+from prediction_cache import PredictionCache, row_keys, model_fingerprint
+from forest import FlatForest
+from score import score_batches
+
+
+# Rows each CountingModel has predicted, by id; kept off the instance so that, like a fitted
+# estimator, predicting leaves its fingerprint unchanged
+ROWS_PREDICTED = {}
+
+
+class CountingModel:
+    def __init__(self, offset: float = 0.0):
+        self.offset = offset
+
+    @property
+    def rows_predicted(self) -> int:
+        return ROWS_PREDICTED.get(id(self), 0)
+
+    def predict(self, data):
+        ROWS_PREDICTED[id(self)] = self.rows_predicted + len(data)
+        return np.asarray(data, dtype=np.float64).sum(axis=1) + self.offset
+
+
+class TestPredictionCache(unittest.TestCase):
+    def setUp(self):
+        # ids are reused once a test's models are collected
+        ROWS_PREDICTED.clear()
+        rng = np.random.default_rng(0)
+        self.data = rng.normal(size=(50, 3)).astype(np.float32)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "cache.db")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_row_keys(self):
+        keys = row_keys(self.data)
+        self.assertEqual(keys.dtype, np.uint64)
+        self.assertEqual(len(np.unique(keys)), len(self.data))
+        # 12-byte rows are padded to whole words; equal rows hash equally wherever they are
+        np.testing.assert_array_equal(row_keys(self.data[::-1]), keys[::-1])
+        changed = self.data.copy()
+        changed[7, 2] = np.nextafter(changed[7, 2], np.float32(np.inf))
+        self.assertEqual(np.flatnonzero(row_keys(changed) != keys).tolist(), [7])
+
+    def test_repeated_rows_skip_the_model(self):
+        model = CountingModel()
+        cache = PredictionCache().bind(model)
+        batch = np.concatenate([self.data, self.data[:10]])
+
+        first = cache.predict(model, batch)
+        # Duplicates within the batch are predicted once
+        self.assertEqual(model.rows_predicted, len(self.data))
+        second = cache.predict(model, batch)
+        self.assertEqual(model.rows_predicted, len(self.data))
+        np.testing.assert_array_equal(first, model.predict(batch))
+        np.testing.assert_array_equal(second, first)
+        self.assertEqual(cache.stats()["hits"], len(batch))
+
+    def test_lru_and_ttl(self):
+        model = CountingModel()
+        cache = PredictionCache(max_entries=20, ttl=60.0).bind(model)
+        with patch("prediction_cache.time.time", return_value=1000.0):
+            cache.predict(model, self.data[:30])
+            cache.predict(model, self.data[30:])
+            self.assertEqual(cache.stats()["entries"], 20)
+            # The first batch was evicted, the second is still there
+            self.assertTrue(cache.get(row_keys(self.data[-20:]))[1].all())
+            self.assertFalse(cache.get(row_keys(self.data[:30]))[1].any())
+        with patch("prediction_cache.time.time", return_value=1061.0):
+            self.assertFalse(cache.get(row_keys(self.data[-20:]))[1].any())
+
+    def test_disk_tier_survives_restarts_until_the_model_changes(self):
+        model = CountingModel()
+        cache = PredictionCache(max_entries=5, path=self.db_path).bind(model)
+        expected = cache.predict(model, self.data)
+        cache.close()
+
+        restarted = PredictionCache(max_entries=5, path=self.db_path).bind(model)
+        np.testing.assert_array_equal(restarted.predict(model, self.data), expected)
+        self.assertEqual(model.rows_predicted, len(self.data))
+
+        retrained = CountingModel(offset=1.0)
+        restarted.bind(retrained)
+        np.testing.assert_array_equal(restarted.predict(retrained, self.data), expected + 1.0)
+        self.assertEqual(retrained.rows_predicted, len(self.data))
+        restarted.close()
+
+    def test_fingerprint_tracks_the_artifact(self):
+        forest = FlatForest(
+            feature=np.array([0, -2, -2]), threshold=np.array([0.5, 0, 0]), left=np.array([1, -1, -1]),
+            right=np.array([2, -1, -1]), value=np.array([0.0, 1.0, 2.0]), missing_left=np.zeros(3, dtype=bool),
+            roots=np.array([0]), max_depth=1, n_features=1,
+        )
+        fingerprint = model_fingerprint(forest)
+        forest.value = np.array([0.0, 1.0, 3.0])
+        self.assertNotEqual(model_fingerprint(forest), fingerprint)
+
+        class Artifact:
+            path = self.tmp_dir.name
+
+        manifest = os.path.join(self.tmp_dir.name, "artifact.json")
+        with open(manifest, "w") as f:
+            f.write("{}")
+        fingerprint = model_fingerprint(Artifact())
+        os.utime(manifest, ns=(0, 1))
+        self.assertNotEqual(model_fingerprint(Artifact()), fingerprint)
+
+    def test_score_batches_with_cache(self):
+        model = CountingModel()
+        labels = model.predict(self.data)
+        cache = PredictionCache()
+        logger = logging.getLogger("test_prediction_cache")
+        for _ in range(2):
+            result = score_batches(model, [(self.data, labels)], logger, chunk_size=16, cache=cache)
+        self.assertEqual(result["rmse"], 0.0)
+        self.assertEqual(result["cache"]["hits"], len(self.data))
+        self.assertEqual(model.rows_predicted, 2 * len(self.data))
+
+
+if __name__ == '__main__':
+    unittest.main()
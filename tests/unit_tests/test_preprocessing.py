@@ -0,0 +1,82 @@
+import unittest
+import pickle
+import numpy as np
+import pandas as pd
+
+import os
+import sys
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(os.path.dirname(current_dir))
+src_dir = os.path.join(parent_dir, "src")
+sys.path.append(src_dir)
+
+from preprocessing import HousingPreprocessor
+
+
+class TestHousingPreprocessor(unittest.TestCase):
+    def setUp(self):
+        self.train = pd.DataFrame({
+            'total_rooms': [500.0, np.nan, 1500.0, 2500.0],
+            'households': [100.0, 200.0, 300.0, 0.0],
+            'total_bedrooms': [50.0, 60.0, 100.0, 110.0],
+            'population': [1000.0, 1100.0, 2000.0, 2100.0],
+            'ocean_proximity': ['INLAND', 'NEAR BAY', 'NEAR OCEAN', 'INLAND'],
+            'median_house_value': [100000.0, 200000.0, 300000.0, 400000.0],
+        })
+        self.test = pd.DataFrame({
+            'total_rooms': [np.nan, 800.0],
+            'households': [10.0, 20.0],
+            'total_bedrooms': [5.0, 6.0],
+            'population': [40.0, 50.0],
+            'ocean_proximity': ['NEAR OCEAN', 'ISLAND'],
+            'median_house_value': [1.0, 2.0],
+        })
+
+    def test_fixed_column_layout(self):
+        preprocessor = HousingPreprocessor().fit(self.train)
+        data_prepared = preprocessor.transform(self.test)
+
+        self.assertEqual(data_prepared.dtype, np.float32)
+        self.assertTrue(data_prepared.flags.c_contiguous)
+        self.assertEqual(data_prepared.shape, (2, len(preprocessor.feature_names_)))
+        self.assertEqual(
+            preprocessor.feature_names_[-2:],
+            ['ocean_proximity_NEAR BAY', 'ocean_proximity_NEAR OCEAN'],
+        )
+        # Test rows are imputed with the training median, not their own
+        self.assertEqual(data_prepared[0, 0], 1500.0)
+        # Unseen categories encode as all zeros instead of adding a column
+        np.testing.assert_array_equal(data_prepared[:, -2:], [[0, 1], [0, 0]])
+
+    def test_matches_mapping_input(self):
+        preprocessor = HousingPreprocessor().fit(self.train)
+        records = {column: self.test[column].tolist() for column in self.test.columns}
+        np.testing.assert_array_equal(preprocessor.transform(records), preprocessor.transform(self.test))
+
+    def test_rows_match_sliced_frame(self):
+        rows = np.array([3, 0, 2])
+        preprocessor = HousingPreprocessor().fit(self.train, rows=rows)
+        sliced = self.train.iloc[rows]
+        np.testing.assert_array_equal(preprocessor.medians_, HousingPreprocessor().fit(sliced).medians_)
+        np.testing.assert_array_equal(preprocessor.transform(self.train, rows=rows), preprocessor.transform(sliced))
+
+    def test_category_codes(self):
+        onehot = HousingPreprocessor().fit(self.train)
+        compact = HousingPreprocessor(encoding="codes").fit(self.train)
+        data_prepared = compact.transform(self.test)
+
+        self.assertEqual(compact.feature_names_, onehot.feature_names_[:-2] + ['ocean_proximity'])
+        np.testing.assert_array_equal(data_prepared[:, :-1], onehot.transform(self.test)[:, :-2])
+        # NEAR OCEAN is the third training category; unseen ones get -1
+        np.testing.assert_array_equal(data_prepared[:, -1], [2, -1])
+        with self.assertRaises(ValueError):
+            HousingPreprocessor(encoding="ordinal").fit(self.train)
+
+    def test_pickle_round_trip(self):
+        preprocessor = HousingPreprocessor().fit(self.train)
+        restored = pickle.loads(pickle.dumps(preprocessor))
+        np.testing.assert_array_equal(restored.transform(self.train), preprocessor.transform(self.train))
+
+
+if __name__ == '__main__':
+    unittest.main()
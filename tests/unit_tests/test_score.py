@@ -45,5 +45,71 @@ class TestEvaluateModel(unittest.TestCase):
         self.mock_logger.info.assert_any_call("Evaluating model...")
         self.mock_logger.info.assert_any_call(f"Model evaluation completed. RMSE: {expected_rmse}")
 
+
+class TestBatchScoring(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.data = rng.uniform(size=(1000, 3))
+        self.labels = self.data @ np.array([1.0, 2.0, 3.0]) + rng.normal(size=1000)
+        self.model = Mock()
+        self.model.best_estimator_ = MagicMock()
+        self.model.best_estimator_.predict = lambda features: features.sum(axis=1)
+        self.mock_logger = Mock()
+
+    def test_running_metrics_match_full_batch(self):
+        from score import RunningMetrics
+        from sklearn.metrics import mean_absolute_error, r2_score
+        predictions = self.data.sum(axis=1)
+        metrics = RunningMetrics()
+        for start in range(0, 1000, 137):
+            metrics.update(self.labels[start:start + 137], predictions[start:start + 137])
+        result = metrics.result()
+
+        self.assertEqual(result['rows'], 1000)
+        self.assertAlmostEqual(result['rmse'], np.sqrt(mean_squared_error(self.labels, predictions)))
+        self.assertAlmostEqual(result['mae'], mean_absolute_error(self.labels, predictions))
+        self.assertAlmostEqual(result['r2'], r2_score(self.labels, predictions))
+
+    def test_score_batches_streams_predictions(self):
+        from score import score_batches
+        import tempfile
+        batches = [(self.data[:600], self.labels[:600]), (self.data[600:], self.labels[600:])]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_path = os.path.join(tmp_dir, "predictions.csv")
+            result = score_batches(self.model, batches, self.mock_logger, output_path=output_path, chunk_size=250, n_jobs=2)
+            written = pd.read_csv(output_path)["prediction"].to_numpy()
+
+        np.testing.assert_allclose(written, self.data.sum(axis=1), atol=1e-6)
+        self.assertAlmostEqual(result['rmse'], np.sqrt(mean_squared_error(self.labels, self.data.sum(axis=1))))
+
+    def test_score_batches_with_all_cpus(self):
+        from score import score_batches, effective_n_jobs
+        self.assertEqual(effective_n_jobs(-1, n_cpus=8), 8)
+        self.assertEqual(effective_n_jobs(-2, n_cpus=8), 7)
+        self.assertEqual(effective_n_jobs(-16, n_cpus=8), 1)
+        self.assertEqual(effective_n_jobs(0, n_cpus=8), 1)
+        # joblib-style values, as documented for train --n_jobs
+        result = score_batches(self.model, (self.data, self.labels), self.mock_logger, chunk_size=100, n_jobs=-1)
+        self.assertEqual(result['rows'], 1000)
+
+    def test_score_batches_from_csv_path(self):
+        from score import score_batches
+        import tempfile
+        frame = pd.DataFrame({'a': self.data[:, 0], 'median_house_value': self.labels})
+        preprocessor = Mock()
+        preprocessor.transform = lambda chunk: chunk[['a']].to_numpy()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = os.path.join(tmp_dir, "batch.csv")
+            frame.to_csv(csv_path, index=False)
+            result = score_batches(self.model, csv_path, self.mock_logger, preprocessor=preprocessor, chunk_size=300)
+
+        self.assertEqual(result['rows'], 1000)
+        self.assertAlmostEqual(result['rmse'], np.sqrt(mean_squared_error(self.labels, self.data[:, 0])), places=4)
+
+    def test_evaluate_model_chunked(self):
+        from score import evaluate_model
+        rmse = evaluate_model(self.model, self.data, self.labels, self.mock_logger, chunk_size=100)
+        self.assertAlmostEqual(rmse, np.sqrt(mean_squared_error(self.labels, self.data.sum(axis=1))))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,163 @@
+import unittest
+import tempfile
+import threading
+from multiprocessing.connection import Connection
+from unittest.mock import patch
+import numpy as np
+from scipy.stats import randint
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import RandomizedSearchCV
+from sklearn.tree import DecisionTreeRegressor
+
+import os
+import sys
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(os.path.dirname(current_dir))
+src_dir = os.path.join(parent_dir, "src")
+sys.path.append(src_dir)
+
+from search import FoldCache, CachedRandomSearch, SocketExecutor, LocalCluster, AUTHKEY_ENV, parse_address, serve_worker
+
+PARENT_PID = os.getpid()
+
+
+class FlakyTree(DecisionTreeRegressor):
+    # Kills the first worker process that fits it, once per flag file: a node dying mid-search
+    def __init__(self, max_features=None, random_state=None, flag_path=None):
+        super().__init__(max_features=max_features, random_state=random_state)
+        self.flag_path = flag_path
+
+    def fit(self, X, y, sample_weight=None):
+        if self.flag_path and os.getpid() != PARENT_PID:
+            try:
+                os.close(os.open(self.flag_path, os.O_CREAT | os.O_EXCL))
+                os._exit(1)
+            except FileExistsError:
+                pass
+        return super().fit(X, y, sample_weight=sample_weight)
+
+
+class TestCachedSearch(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.data = rng.uniform(size=(120, 4)).astype(np.float32)
+        self.labels = self.data[:, 0] * 10 + rng.normal(scale=0.5, size=120)
+        self.param_distribs = {
+            'n_estimators': randint(low=1, high=20),
+            'max_features': randint(low=1, high=5),
+        }
+
+    def test_fold_cache_memmap(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            fold_cache = FoldCache(self.data, self.labels, cv=5, mmap_dir=tmp_dir)
+            train_data, train_labels, test_data, test_labels = fold_cache.folds[0]
+            self.assertIsInstance(train_data, np.memmap)
+            self.assertFalse(train_data.flags.writeable)
+            self.assertTrue(train_data.flags.c_contiguous)
+            self.assertEqual(len(train_data) + len(test_data), len(self.data))
+            np.testing.assert_array_equal(test_data, self.data[fold_cache.splits[0][1]])
+
+    def test_matches_randomized_search(self):
+        forest_reg = RandomForestRegressor(random_state=42)
+        reference = RandomizedSearchCV(
+            forest_reg, self.param_distribs, n_iter=5, cv=5, scoring='neg_mean_squared_error', random_state=42
+        ).fit(self.data, self.labels)
+        cached = CachedRandomSearch(forest_reg, self.param_distribs, n_iter=5, cv=5, random_state=42).fit(
+            self.data, self.labels
+        )
+
+        self.assertEqual(cached.best_params_, reference.best_params_)
+        np.testing.assert_allclose(cached.cv_results_['mean_test_score'], reference.cv_results_['mean_test_score'])
+        np.testing.assert_array_equal(cached.cv_results_['rank_test_score'], reference.cv_results_['rank_test_score'])
+        np.testing.assert_allclose(cached.best_estimator_.predict(self.data), reference.best_estimator_.predict(self.data))
+
+
+class TestSocketExecutor(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.data = rng.uniform(size=(120, 4)).astype(np.float32)
+        self.labels = self.data[:, 0] * 10 + rng.normal(scale=0.5, size=120)
+        self.param_distribs = {'max_features': randint(low=1, high=5)}
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.flag_path = os.path.join(self.tmp_dir.name, "died")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _search(self, estimator, executor=None):
+        return CachedRandomSearch(estimator, self.param_distribs, n_iter=6, cv=5, executor=executor).fit(
+            self.data, self.labels
+        )
+
+    def test_matches_local_search(self):
+        forest_reg = RandomForestRegressor(n_estimators=5, random_state=42)
+        reference = self._search(forest_reg)
+        with LocalCluster(3) as cluster:
+            distributed = self._search(forest_reg, SocketExecutor(cluster.addresses))
+
+        self.assertEqual(distributed.best_params_, reference.best_params_)
+        for key in ('mean_test_score', 'split0_test_score', 'split4_test_score'):
+            np.testing.assert_array_equal(distributed.cv_results_[key], reference.cv_results_[key])
+
+    def test_survives_a_worker_dying(self):
+        reference = self._search(FlakyTree(random_state=42))
+        with LocalCluster(3) as cluster:
+            distributed = self._search(FlakyTree(random_state=42, flag_path=self.flag_path), SocketExecutor(cluster.addresses))
+            for process in cluster.processes:
+                process.join(timeout=0.1)
+            lost = [process for process in cluster.processes if not process.is_alive()]
+
+        self.assertTrue(os.path.exists(self.flag_path))
+        self.assertEqual(len(lost), 1)
+        # The dead worker's tasks were rerun elsewhere: every score is there and unchanged
+        np.testing.assert_array_equal(distributed.cv_results_['mean_test_score'], reference.cv_results_['mean_test_score'])
+
+    def test_fails_when_every_worker_is_lost(self):
+        with LocalCluster(1) as cluster:
+            with self.assertRaises(RuntimeError):
+                self._search(FlakyTree(random_state=42, flag_path=self.flag_path), SocketExecutor(cluster.addresses))
+
+    def test_fails_when_the_last_worker_cannot_take_tasks(self):
+        send = Connection.send
+
+        def broken_send(conn, message):
+            if message[0] == "task":
+                raise BrokenPipeError("worker gone")
+            return send(conn, message)
+
+        errors = []
+
+        def search(executor):
+            try:
+                self._search(DecisionTreeRegressor(random_state=42), executor)
+            except RuntimeError as e:
+                errors.append(e)
+
+        with LocalCluster(1) as cluster, patch.object(Connection, "send", broken_send):
+            thread = threading.Thread(target=search, args=(SocketExecutor(cluster.addresses),), daemon=True)
+            thread.start()
+            thread.join(timeout=30)
+
+        self.assertFalse(thread.is_alive(), "SocketExecutor.run() hung with no worker left")
+        self.assertIn("All CV workers were lost", str(errors[0]))
+
+    def test_default_authkey_only_on_loopback(self):
+        with patch.dict(os.environ):
+            os.environ.pop(AUTHKEY_ENV, None)
+            with self.assertRaises(ValueError):
+                serve_worker("0.0.0.0:0")
+            with self.assertRaises(ValueError):
+                SocketExecutor(["127.0.0.1:6000", "10.0.0.5:6000"])
+            SocketExecutor(["localhost:6000", ":6000"])
+            SocketExecutor(["10.0.0.5:6000"], authkey="secret")
+            os.environ[AUTHKEY_ENV] = "secret"
+            SocketExecutor(["10.0.0.5:6000"])
+
+    def test_parse_address(self):
+        self.assertEqual(parse_address("10.0.0.5:6000"), ("10.0.0.5", 6000))
+        self.assertEqual(parse_address(":6000"), ("127.0.0.1", 6000))
+        self.assertEqual(parse_address(("localhost", 7)), ("localhost", 7))
+
+
+if __name__ == '__main__':
+    unittest.main()
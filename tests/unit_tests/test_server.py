@@ -0,0 +1,109 @@
+import unittest
+from unittest.mock import MagicMock
+import json
+import threading
+import urllib.error
+import urllib.request
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+import os
+import sys
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(os.path.dirname(current_dir))
+src_dir = os.path.join(parent_dir, "src")
+sys.path.append(src_dir)
+
+from preprocessing import HousingPreprocessor
+from server import MicroBatcher, ScoringServer
+
+
+class SumModel:
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, features):
+        self.calls += 1
+        return features[:, :2].sum(axis=1)
+
+
+class TestScoringServer(unittest.TestCase):
+    def setUp(self):
+        train = pd.DataFrame({
+            'total_rooms': [500.0, 1500.0, 2500.0],
+            'households': [100.0, 300.0, 500.0],
+            'total_bedrooms': [50.0, 100.0, 150.0],
+            'population': [1000.0, 2000.0, 3000.0],
+            'ocean_proximity': ['INLAND', 'NEAR BAY', 'INLAND'],
+            'median_house_value': [1.0, 2.0, 3.0],
+        })
+        self.preprocessor = HousingPreprocessor().fit(train)
+        self.model = SumModel()
+        self.record = {'total_rooms': 1000.0, 'households': 10.0, 'total_bedrooms': 5.0, 'population': 40.0,
+                       'ocean_proximity': 'NEAR BAY'}
+
+    def test_micro_batcher_coalesces_concurrent_requests(self):
+        batcher = MicroBatcher(self.model, self.preprocessor, max_batch_size=64, max_wait_ms=50)
+        try:
+            with ThreadPoolExecutor(max_workers=16) as executor:
+                results = list(executor.map(lambda i: batcher.predict([dict(self.record, households=float(i))]), range(16)))
+        finally:
+            batcher.close()
+
+        self.assertEqual([result[0] for result in results], [1000.0 + i for i in range(16)])
+        self.assertLess(self.model.calls, 16)
+
+    def test_bad_request_does_not_fail_its_micro_batch(self):
+        batcher = MicroBatcher(self.model, self.preprocessor, max_batch_size=64, max_wait_ms=50)
+
+        def predict(i):
+            record = dict(self.record, total_rooms="abc") if i == 3 else dict(self.record, households=float(i))
+            try:
+                return batcher.predict([record])[0]
+            except ValueError as e:
+                return e
+
+        try:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                results = list(executor.map(predict, range(8)))
+        finally:
+            batcher.close()
+
+        self.assertIsInstance(results[3], ValueError)
+        self.assertEqual(results[:3] + results[4:], [1000.0 + i for i in range(8) if i != 3])
+
+    def test_http_predict_and_metrics(self):
+        server = ScoringServer(("127.0.0.1", 0), self.model, self.preprocessor, MagicMock(), max_wait_ms=0.5)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        def post(payload):
+            request = urllib.request.Request(f"{url}/predict", data=json.dumps(payload).encode(), method="POST")
+            with urllib.request.urlopen(request) as response:
+                return json.loads(response.read())
+
+        try:
+            self.assertEqual(post(self.record), {'prediction': 1010.0})
+            # Missing values are imputed with the training medians
+            batch = [self.record, dict(self.record, total_rooms=None)]
+            self.assertEqual(post({'records': batch}), {'predictions': [1010.0, 1510.0]})
+            # Malformed records are the client's error, reported before they reach a micro-batch
+            for payload in (dict(self.record, total_rooms="abc"), [self.record, 5], dict(self.record, ocean_proximity=1)):
+                with self.assertRaises(urllib.error.HTTPError) as raised:
+                    post(payload)
+                self.assertEqual(raised.exception.code, 400)
+            self.assertEqual(post(dict(self.record, total_rooms="1000")), {'prediction': 1010.0})
+            with urllib.request.urlopen(f"{url}/metrics") as response:
+                metrics = json.loads(response.read())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual(metrics['requests'], 3)
+        self.assertEqual(metrics['rows'], 4)
+        self.assertIsNotNone(metrics['p99_ms'])
+
+
+if __name__ == '__main__':
+    unittest.main()
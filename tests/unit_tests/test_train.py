@@ -4,8 +4,11 @@ import pandas as pd
 import numpy as np
 from sklearn.model_selection import StratifiedShuffleSplit
 from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.tree import DecisionTreeRegressor
 from scipy.stats import randint
 import logging
+import tempfile
 
 import os
 import sys
@@ -14,7 +17,9 @@ parent_dir = os.path.dirname(os.path.dirname(current_dir))
 src_dir = os.path.join(parent_dir, "src")
 sys.path.append(src_dir)
 
-from train import prepare_data, preprocess_data, train_model  # Assuming train.py is in the same directory
+from artifact import export_artifact
+from preprocessing import HousingPreprocessor
+from train import ModelZoo, train_model_zoo, resolve_zoo, supports_category_codes, check_compact_accuracy, IncrementalModel, prepare_data, split_indices, income_category, fit_preprocessor, preprocess_data, train_model, stream_split, QuantileSketch, compute_imputation_medians, stream_training_data, resolve_worker_layout, train_incremental, save_model, load_model  # Assuming train.py is in the same directory
 
 
 class TestPipeline(unittest.TestCase):
@@ -58,6 +63,39 @@ class TestPipeline(unittest.TestCase):
         self.mock_logger.info.assert_any_call("Data preparation completed.")
 
 
+    def test_split_indices_matches_prepare_data(self):
+        train_index, test_index = split_indices(self.housing, self.mock_logger)
+
+        # Same rows, same order as the frame-copying split, and the input is not modified
+        self.assertNotIn('income_cat', self.housing.columns)
+        strat_train_set, strat_test_set = prepare_data(self.housing.copy(), self.mock_logger)
+        np.testing.assert_array_equal(train_index, strat_train_set.index.to_numpy())
+        np.testing.assert_array_equal(test_index, strat_test_set.index.to_numpy())
+
+    def test_split_indices_int32(self):
+        train_index, test_index = split_indices(self.housing, self.mock_logger, dtype=np.int32)
+        self.assertEqual((train_index.dtype, test_index.dtype), (np.int32, np.int32))
+        np.testing.assert_array_equal(train_index, split_indices(self.housing, self.mock_logger)[0])
+        with self.assertRaises(ValueError):
+            split_indices(pd.concat([self.housing] * 6), self.mock_logger, dtype=np.int8)
+
+    def test_income_category_matches_cut(self):
+        income = pd.Series([0.4, 1.5, 1.6, 3.0, 4.5, 4.6, 6.0, 6.1, 15.0])
+        expected = pd.cut(income, bins=[0.0, 1.5, 3.0, 4.5, 6.0, np.inf], labels=[1, 2, 3, 4, 5])
+        np.testing.assert_array_equal(income_category(income), expected.cat.codes.to_numpy())
+
+    def test_fit_preprocessor_on_rows(self):
+        train_index, _ = split_indices(self.housing, self.mock_logger)
+        train_set = self.housing.iloc[train_index]
+
+        preprocessor = fit_preprocessor(self.housing, self.mock_logger, rows=train_index)
+        np.testing.assert_array_equal(
+            preprocessor.transform(self.housing, rows=train_index), fit_preprocessor(train_set, self.mock_logger).transform(train_set)
+        )
+        np.testing.assert_array_equal(
+            preprocessor.transform_target(self.housing, rows=train_index), train_set['median_house_value'].to_numpy(dtype=float)
+        )
+
     def test_imputer(self):
         """Test if the SimpleImputer is working as expected (filling missing values)."""
         data_with_missing = self.housing.copy()
@@ -114,7 +152,7 @@ class TestPipeline(unittest.TestCase):
         model = train_model(data_prepared, labels, self.mock_logger)
 
         # Assertions
-        MockRandomForestRegressor.assert_called_once_with(random_state=42)
+        MockRandomForestRegressor.assert_called_once_with(random_state=42, n_jobs=1)
         MockRandomizedSearchCV.assert_called_once()
 
         # Check if fit was called on the mock object with the correct data
@@ -127,5 +165,248 @@ class TestPipeline(unittest.TestCase):
         self.mock_logger.info.assert_any_call("Training model...")
         self.mock_logger.info.assert_any_call("Model training completed.")
 
+    def test_train_model_halving_search(self):
+        """Test that successive halving keeps the search result contract."""
+        strat_train_set, strat_test_set = prepare_data(self.housing.copy(), self.mock_logger)
+        data_prepared, labels = preprocess_data(strat_train_set, self.mock_logger)
+
+        model = train_model(data_prepared, labels, self.mock_logger, search="halving")
+
+        self.assertIn('max_features', model.best_params_)
+        self.assertEqual(model.best_estimator_.n_estimators, model.best_params_['n_estimators'])
+        self.assertIn('mean_test_score', model.cv_results_)
+        # The largest budget only goes to the survivors of the earlier rounds
+        self.assertLess(model.n_candidates_[-1], model.n_candidates_[0])
+        # ...and that last round, and so the refit best forest, uses (almost) the whole tree budget
+        self.assertEqual(model.n_resources_, [22, 66, 198])
+        self.assertEqual(model.best_estimator_.n_estimators, 198)
+
+    def test_train_model_unknown_search(self):
+        with self.assertRaises(ValueError):
+            train_model(np.zeros((10, 2)), np.zeros(10), self.mock_logger, search="grid")
+
+    def test_train_model_cv_workers_need_cached_search(self):
+        with self.assertRaises(ValueError):
+            train_model(np.zeros((10, 2)), np.zeros(10), self.mock_logger, search="random", cv_workers=["127.0.0.1:6000"])
+
+    def _fitted_search(self):
+        rng = np.random.default_rng(0)
+        data = rng.uniform(size=(200, 3))
+        labels = data[:, 0] * 10 + rng.normal(scale=0.1, size=200)
+        forest = RandomForestRegressor(n_estimators=10, max_features=2, random_state=42).fit(data, labels)
+        model = MagicMock(best_estimator_=forest, best_params_={'n_estimators': 10, 'max_features': 2}, cv_results_={})
+        model.best_score_ = -np.mean((forest.predict(data) - labels) ** 2) * 4
+        return model, data, labels
+
+    def test_train_model_zoo(self):
+        strat_train_set, _ = prepare_data(self.housing.copy(), self.mock_logger)
+        train_data, train_labels = preprocess_data(strat_train_set, self.mock_logger)
+        zoo = [
+            ("linear", LinearRegression(), None),
+            ("tree", DecisionTreeRegressor(random_state=42), None),
+            ("forest", RandomForestRegressor(random_state=42), [{'n_estimators': [3, 5]}]),
+        ]
+        with tempfile.TemporaryDirectory() as mmap_dir:
+            # Workers read the inputs from memory-mapped files in mmap_dir
+            model = train_model_zoo(train_data, train_labels, self.mock_logger, zoo=zoo, n_jobs=2, mmap_dir=mmap_dir)
+
+        self.assertIsInstance(model, ModelZoo)
+        self.assertEqual(sorted(model.leaderboard_["model"]), ["forest", "linear", "tree"])
+        self.assertEqual(model.leaderboard_.set_index("model").loc["forest", "candidates"], 2)
+        self.assertTrue(model.leaderboard_["cv_rmse"].is_monotonic_increasing)
+        self.assertEqual(model.best_name_, model.leaderboard_["model"].iloc[0])
+        self.assertIs(model.best_estimator_, model.models_[model.best_name_])
+        self.assertAlmostEqual(np.sqrt(-model.best_score_), model.leaderboard_["cv_rmse"].iloc[0])
+        self.assertEqual(len(model.best_estimator_.predict(np.asarray(train_data))), len(train_labels))
+        self.assertIsInstance(train_model(train_data, train_labels, self.mock_logger, zoo=["linear"]), ModelZoo)
+
+    def test_zoo_winner_without_trees_is_not_exported(self):
+        strat_train_set, _ = prepare_data(self.housing.copy(), self.mock_logger)
+        train_data, train_labels = preprocess_data(strat_train_set, self.mock_logger)
+        model = train_model(train_data, train_labels, self.mock_logger, zoo=["linear"])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with self.assertRaises(TypeError):
+                export_artifact(model, os.path.join(tmp_dir, "artifact"), self.mock_logger)
+            self.assertEqual(os.listdir(tmp_dir), [])
+
+    def test_resolve_zoo(self):
+        self.assertEqual([spec[0] for spec in resolve_zoo(None)], ["linear", "tree", "forest_random", "forest_grid"])
+        self.assertEqual([spec[0] for spec in resolve_zoo(["tree"])], ["tree"])
+        with self.assertRaises(ValueError):
+            resolve_zoo(["boosting"])
+        with self.assertRaises(ValueError):
+            resolve_zoo(["tree", "tree"])
+
+    def test_supports_category_codes(self):
+        self.assertTrue(supports_category_codes(None))
+        self.assertTrue(supports_category_codes(["tree", "forest_grid"]))
+        self.assertFalse(supports_category_codes(["tree", "linear"]))
+
+    def test_check_compact_accuracy(self):
+        train_index, test_index = split_indices(self.housing, self.mock_logger, dtype=np.int32)
+        preprocessor = fit_preprocessor(self.housing, self.mock_logger, rows=train_index, encoding="codes")
+        forest = RandomForestRegressor(n_estimators=5, random_state=42).fit(
+            preprocessor.transform(self.housing, rows=train_index), preprocessor.transform_target(self.housing, rows=train_index)
+        )
+        model = IncrementalModel(forest, {}, 0.0, {}, 0.0, "compact")
+
+        result = check_compact_accuracy(model, preprocessor, self.housing, train_index, test_index, self.mock_logger)
+        self.assertAlmostEqual(result["rmse_delta"], result["compact_rmse"] - result["reference_rmse"])
+        # float32 codes and int32 indices against float64 one-hot columns and int64 indices
+        n_rows = len(self.housing)
+        self.assertEqual(result["compact_bytes"], n_rows * (len(preprocessor.feature_names_) * 4 + 4))
+        self.assertEqual(result["reference_bytes"], n_rows * ((len(preprocessor.feature_names_) + 1) * 8 + 8))
+
+    def test_train_incremental_warm_start(self):
+        """Test that a small delta grows the previous forest instead of searching again."""
+        previous_model, data, labels = self._fitted_search()
+
+        with patch('train.train_model') as mock_train_model:
+            model = train_incremental(previous_model, data[:50], labels[:50], self.mock_logger, new_trees=5)
+
+        mock_train_model.assert_not_called()
+        self.assertEqual(model.mode_, "warm_start")
+        self.assertEqual(len(model.best_estimator_.estimators_), 15)
+        self.assertEqual(model.best_params_, {'n_estimators': 15, 'max_features': 2})
+        # The previous run's forest is left untouched
+        self.assertEqual(len(previous_model.best_estimator_.estimators_), 10)
+
+    def test_train_incremental_refits_on_drift(self):
+        """Test that drift above the threshold falls back to a full search."""
+        previous_model, data, labels = self._fitted_search()
+
+        with patch('train.train_model') as mock_train_model:
+            model = train_incremental(previous_model, data, labels + 100, self.mock_logger, search="halving")
+
+        mock_train_model.assert_called_once()
+        self.assertEqual(mock_train_model.call_args.kwargs, {'search': 'halving'})
+        self.assertEqual(model.mode_, "refit")
+
+    def test_train_incremental_without_trees_to_grow(self):
+        """Test that a zoo winner other than a forest is refitted, not warm-started."""
+        rng = np.random.default_rng(0)
+        data = rng.uniform(size=(200, 3))
+        labels = data[:, 0] * 10
+        linear = LinearRegression().fit(data, labels)
+        previous_model = MagicMock(best_estimator_=linear, best_params_={}, best_score_=-1.0, cv_results_={})
+
+        with self.assertRaises(ValueError):
+            train_incremental(previous_model, data[:50], labels[:50], self.mock_logger)
+        model = train_incremental(previous_model, data[:50], labels[:50], self.mock_logger, history=(data, labels))
+
+        self.assertEqual(model.mode_, "refit")
+        self.assertIsInstance(model.best_estimator_, LinearRegression)
+        self.assertIsNot(model.best_estimator_, linear)
+        self.mock_logger.warning.assert_called()
+
+    def test_train_incremental_refits_on_history_and_delta(self):
+        """Test that a refit trains on the previous training data plus the new rows."""
+        previous_model, data, labels = self._fitted_search()
+
+        with patch('train.train_model') as mock_train_model:
+            train_incremental(previous_model, data[:5], labels[:5] + 1e6, self.mock_logger, history=(data, labels))
+
+        refit_data, refit_labels = mock_train_model.call_args.args[:2]
+        np.testing.assert_array_equal(refit_data, np.concatenate([data, data[:5]]))
+        np.testing.assert_array_equal(refit_labels, np.concatenate([labels, labels[:5] + 1e6]))
+
+    def test_save_and_load_model(self):
+        previous_model, data, _ = self._fitted_search()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "models", "model.joblib")
+            save_model({'forest': previous_model.best_estimator_}, path, self.mock_logger, preprocessor="prep")
+            model, preprocessor = load_model(path, self.mock_logger)
+        self.assertEqual(preprocessor, "prep")
+        np.testing.assert_array_equal(model['forest'].predict(data), previous_model.best_estimator_.predict(data))
+
+    def test_resolve_worker_layout(self):
+        """Test that search and forest parallelism never oversubscribe the CPUs."""
+        self.assertEqual(resolve_worker_layout(1, 1, self.mock_logger, n_cpus=64), (1, 1))
+        self.assertEqual(resolve_worker_layout(-1, 1, self.mock_logger, n_cpus=64), (64, 1))
+        self.assertEqual(resolve_worker_layout(1, -1, self.mock_logger, n_cpus=64), (1, 64))
+        self.assertEqual(resolve_worker_layout(16, 8, self.mock_logger, n_cpus=64), (16, 4))
+        self.assertEqual(resolve_worker_layout(128, 2, self.mock_logger, n_cpus=64), (64, 1))
+        self.mock_logger.warning.assert_called()
+
+    def test_stream_split(self):
+        """Test that the streaming split keeps every stratum at the test share."""
+        rng = np.random.default_rng(0)
+        housing = pd.DataFrame({"median_income": rng.uniform(0.5, 8.0, 5000)})
+        chunks = (housing.iloc[start:start + 700] for start in range(0, len(housing), 700))
+
+        train_parts, test_parts = zip(*stream_split(chunks, self.mock_logger))
+        train, test = pd.concat(train_parts), pd.concat(test_parts)
+
+        self.assertEqual(len(train) + len(test), len(housing))
+        self.assertEqual(len(train.index.intersection(test.index)), 0)
+        bins = [0.0, 1.5, 3.0, 4.5, 6.0, np.inf]
+        overall = pd.cut(housing["median_income"], bins).value_counts()
+        in_test = pd.cut(test["median_income"], bins).value_counts()
+        for category, count in overall.items():
+            self.assertLessEqual(abs(in_test[category] - round(count * 0.2)), 1)
+
+    def test_quantile_sketch(self):
+        """Test the streaming median against the exact one."""
+        rng = np.random.default_rng(0)
+        values = rng.lognormal(size=200_000)
+        sketch = QuantileSketch(k=1024)
+        for chunk in np.array_split(values, 37):
+            sketch.update(chunk)
+        self.assertLess(sum(level.size for level in sketch.levels), 20_000)
+        rank = np.mean(values <= sketch.quantile(0.5))
+        self.assertAlmostEqual(rank, 0.5, delta=0.01)
+
+    def test_preprocess_data_with_streamed_medians(self):
+        """Test imputation with medians computed over chunks."""
+        data_with_missing = self.housing.copy()
+        data_with_missing.loc[0, 'total_rooms'] = None
+        chunks = [data_with_missing.iloc[:10], data_with_missing.iloc[10:]]
+
+        medians = compute_imputation_medians(chunks, self.mock_logger)
+        data_prepared, _ = preprocess_data(data_with_missing, self.mock_logger, medians=medians)
+
+        self.assertEqual(data_prepared['total_rooms'].iloc[0], data_with_missing['total_rooms'].median())
+
+    def test_stream_training_data(self):
+        """Test that streamed chunks give the same features as the in-memory preprocessor."""
+        rng = np.random.default_rng(0)
+        n = 3000
+        housing = pd.DataFrame({
+            "longitude": rng.uniform(-124, -114, n).astype(np.float32),
+            "latitude": rng.uniform(32, 42, n).astype(np.float32),
+            "housing_median_age": rng.uniform(1, 52, n).astype(np.float32),
+            "total_rooms": rng.uniform(100, 5000, n).astype(np.float32),
+            "total_bedrooms": rng.uniform(10, 1000, n).astype(np.float32),
+            "population": rng.uniform(50, 3000, n).astype(np.float32),
+            "households": rng.uniform(10, 1000, n).astype(np.float32),
+            "median_income": rng.uniform(0.5, 10, n).astype(np.float32),
+            "median_house_value": rng.uniform(1e4, 5e5, n).astype(np.float32),
+            "ocean_proximity": rng.choice(["INLAND", "NEAR BAY", "<1H OCEAN"], n),
+        })
+        housing.loc[::97, "total_bedrooms"] = np.nan
+        # Like read_csv(chunksize=...), each chunk infers its own categories
+        read_chunks = lambda: (
+            housing.iloc[start:start + 400].astype({"ocean_proximity": "category"}) for start in range(0, n, 400)
+        )
+
+        preprocessor, train_data, train_labels, test_data, test_labels = stream_training_data(read_chunks, self.mock_logger)
+
+        train_parts, test_parts = zip(*stream_split(read_chunks(), self.mock_logger))
+        train, test = pd.concat(train_parts), pd.concat(test_parts)
+        self.assertEqual((len(train_data), len(test_data)), (len(train), len(test)))
+        self.assertEqual(preprocessor.categories_, ["<1H OCEAN", "INLAND", "NEAR BAY"])
+        expected = HousingPreprocessor().fit(train, medians=train.drop(columns=["ocean_proximity", "median_house_value"]).median())
+        # Training rows are shuffled out of file order, each still paired with its label
+        file_order = train["median_house_value"].to_numpy()
+        self.assertFalse(np.array_equal(train_labels, file_order))
+        np.testing.assert_array_equal(np.sort(train_labels), np.sort(file_order))
+        np.testing.assert_allclose(
+            train_data[np.argsort(train_labels, kind="stable")],
+            expected.transform(train)[np.argsort(file_order, kind="stable")],
+            rtol=1e-3,
+        )
+        np.testing.assert_allclose(test_data, expected.transform(test), rtol=1e-3)
+        np.testing.assert_array_equal(test_labels, test["median_house_value"])
+
 if __name__ == '__main__':
     unittest.main()